@@ -1,18 +1,20 @@
-from flask import Flask, redirect, url_for
-from flask_socketio import SocketIO
+from flask import Flask, redirect, url_for, session
+from flask_socketio import SocketIO, emit, join_room
 from utils.logger import init_logger
 from routes.auth import auth_bp
 from routes.base_info import base_info_bp
 from routes.monitor import monitor_bp
 from routes.warning import warning_bp
 from routes.system import system_bp
-from utils.db import init_db
-from config import SECRET_KEY, DEBUG, HEARTBEAT_TIMEOUT
+from utils.db import init_db, enable_green_io
+from utils.auth import is_admin
+from config import SECRET_KEY, DEBUG, HEARTBEAT_FLUSH_INTERVAL, AUTO_HEARTBEAT_CONFIG
 import eventlet
-from apscheduler.schedulers.background import BackgroundScheduler
 
 # 解决 WebSocket 兼容性问题
 eventlet.monkey_patch()
+# psycopg2 为 C 扩展，不受 monkey_patch 影响：设置等待回调，查询等待期间让出给其他协程
+enable_green_io()
 
 # 初始化日志
 init_logger()
@@ -24,6 +26,10 @@ app.config['DEBUG'] = DEBUG
 
 # 方式1：直接设置debug（最简单）
 app.debug = True
+
+# 每个请求的数据库开销（Server-Timing 响应头）和慢查询日志
+from utils import profiler
+profiler.init_app(app)
 # 初始化数据库（纯原生 dmPython）
 init_db()
 
@@ -40,28 +46,81 @@ socketio = SocketIO(app, cors_allowed_origins="*")
 # 导入设备服务模块用于定时任务
 from services.equipment_service import EquipmentService
 
-# 创建定时任务调度器
-scheduler = BackgroundScheduler()
+# 定时任务调度器（绿色线程，同一任务不重叠执行，按类别限制并发，/system/jobs 查看运行指标）
+from utils.scheduler import job_scheduler
+
+# 每隔HEARTBEAT_FLUSH_INTERVAL秒把内存中的心跳批量写入数据库（含心跳超时设备的离线标记）
+job_scheduler.add_interval('flush_heartbeats', EquipmentService.flush_heartbeats, HEARTBEAT_FLUSH_INTERVAL)
+
+# 每天凌晨按保留天数清理过期的汇总数据
+from services.rollup_service import RollupService
+job_scheduler.add_daily('rollup_purge', RollupService.purge, hour=3, minute=10, jitter=60)
+
+# 每天凌晨把早于保留天数的原始采集数据移入冷数据归档（在删除过期分区之前）
+from services.archive_service import cold_archive
+job_scheduler.add_daily('cold_archive', cold_archive.archive, hour=3, minute=15, jitter=60)
+
+# 每天凌晨提前创建未来月份的采集数据分区，并删除超过保留期的分区
+from services.partition_service import partition_manager
+job_scheduler.add_daily('partition_maintain', partition_manager.maintain, hour=3, minute=20, jitter=60)
+
+
+# 实时看板：设备状态变化、最新采集数据、待处理预警数按WEBSOCKET_INTERVAL合并后推送
+from services.dashboard_service import dashboard_publisher, DASHBOARD_ROOM
+dashboard_publisher.start(socketio)
 
-# 添加定时任务，每隔HEARTBEAT_TIMEOUT秒检查一次设备在线状态
-scheduler.add_job(func=EquipmentService.check_equipment_online_status, trigger='interval', seconds=HEARTBEAT_TIMEOUT)
+# 心跳超时按设备到期时间触发离线判定，取代每HEARTBEAT_TIMEOUT秒一次的全表扫描
+EquipmentService.start_online_monitor(dashboard_publisher.publish_status)
+
+# 自动心跳（演示/联调用）：在本进程内定时为所有设备记录心跳，与在线判定共用同一份心跳表
+if AUTO_HEARTBEAT_CONFIG['enabled']:
+    from services.auto_heartbeat_service import AutoHeartbeatSender
+    AutoHeartbeatSender(interval=AUTO_HEARTBEAT_CONFIG['interval']).register(job_scheduler)
+
+# 后台加载各监测点最新采集值（设备详情页直接读内存；失败时首次查询会重试）
+from services.latest_service import latest_store
+job_scheduler.add_once('latest_values_warm', latest_store.warm, kwargs={'force': False}, job_class='warmup')
+
+# 异步导出任务：后台生成文件，进度通过Socket.IO推送；每小时清理过期的导出文件
+from services.export_job_service import export_jobs, export_room
+export_jobs.start(socketio)
+job_scheduler.add_interval('export_cleanup', export_jobs.cleanup, 3600, jitter=60, job_class='export')
 
 # 启动定时任务调度器
-scheduler.start()
+job_scheduler.start()
 
 # 首页重定向到登录页
 @app.route('/')
 def index():
     return redirect(url_for('auth.login'))
 
+# 实时监控页订阅看板推送
+@socketio.on('join_dashboard')
+def handle_join_dashboard():
+    # 未登录的连接不能订阅看板推送
+    if not session.get('user_id'):
+        return
+    join_room(DASHBOARD_ROOM)
+
+
+# 导出任务提交人订阅进度推送
+@socketio.on('join_export')
+def handle_join_export(job_id):
+    job = export_jobs.get(str(job_id))
+    if job and (job['owner'] == session.get('username') or is_admin()):
+        join_room(export_room(job['id']))
+
+
 # WebSocket 设备心跳检测
 @socketio.on('equipment_heartbeat')
 def handle_heartbeat(equipment_id):
-    print(f"收到设备心跳请求: {equipment_id}")
-    from services.equipment_service import EquipmentService
-    result = EquipmentService.update_equipment_heartbeat(equipment_id)
-    print(f"心跳更新结果: {result}, 设备ID: {equipment_id}")
-    socketio.emit('heartbeat_response', {'status': 'success', 'equipment_id': equipment_id})
+    # 只记录到内存心跳表，不访问数据库；响应只发给发送心跳的客户端
+    try:
+        EquipmentService.update_equipment_heartbeat(equipment_id)
+    except (TypeError, ValueError):
+        emit('heartbeat_response', {'status': 'error', 'equipment_id': equipment_id})
+        return
+    emit('heartbeat_response', {'status': 'success', 'equipment_id': equipment_id})
 
 if __name__ == "__main__":
     # 启动服务（支持 WebSocket）
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+冷数据归档命令行工具
+- run：把早于N天的原始采集数据移入 Parquet 归档文件（未指定 --days 时使用 ARCHIVE_CONFIG，app.py 中每天自动执行）
+- list：列出各月份的归档文件数和大小
+"""
+
+import argparse
+import logging
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='冷数据归档工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='归档早于N天的数据')
+    run_parser.add_argument('--days', type=int, help='归档早于该天数的数据（默认取配置）')
+
+    subparsers.add_parser('list', help='列出归档文件')
+
+    args = parser.parse_args()
+
+    from services.archive_service import cold_archive
+    try:
+        if args.command == 'run':
+            if args.days:
+                cold_archive.older_than_days = args.days
+            if not cold_archive.older_than_days:
+                logger.error("未配置归档天数，请使用 --days 指定或设置 ARCHIVE_CONFIG['older_than_days']")
+                sys.exit(1)
+            result = cold_archive.archive()
+            logger.info(f"归档完成：{result}")
+        else:
+            logger.info(f"归档目录：{cold_archive.root}")
+            for month, files, size in cold_archive.stats():
+                logger.info(f"{month}: {files}个文件，{size / 1024 / 1024:.2f} MB")
+    except Exception as e:
+        logger.error(f"执行失败: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ PERMANENT_SESSION_LIFETIME = 3600  # Session有效期1小时
 
 # 监控配置
 HEARTBEAT_TIMEOUT = 30  # 设备离线判定时间（秒）
+HEARTBEAT_FLUSH_INTERVAL = 5  # 内存中的心跳批量写入数据库的间隔（秒）
 WEBSOCKET_INTERVAL = 3  # 实时数据推送间隔（秒）
 
 # 日志配置
@@ -24,4 +25,86 @@ LOG_CONFIG = {
     'level': 'INFO',
     'filename': 'logs/machine_monitor.log',
     'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-}
\ No newline at end of file
+}
+
+# 数据库连接池配置
+DB_POOL_CONFIG = {
+    'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),  # 启动时预建的连接数
+    'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),  # 连接数上限
+    'acquire_timeout': 10,  # 借用连接的最长等待时间（秒）
+    'health_check_idle': 30,  # 连接空闲超过该秒数，借出前先执行 SELECT 1 检查
+    'max_lifetime': 1800  # 连接最长存活时间（秒），超过后丢弃重建
+}
+
+# 采集数据批量写入配置
+INGEST_API_TOKEN = os.environ.get('INGEST_API_TOKEN', '')  # 网关推送数据使用的令牌（请求头 X-Api-Token），为空则仅允许已登录用户
+INGEST_MAX_BATCH = 100000  # 单次请求最多写入的采集记录数
+
+# 阈值报警配置
+THRESHOLD_CONFIG = {
+    'debounce_count': 3,  # 连续越限N次才产生预警（去抖）
+    'clear_count': 3,  # 连续回到恢复区间N次才解除预警
+    'hysteresis_ratio': 0.05  # 回差：解除预警需回到 [Min+h, Max-h]，h = (Max-Min) * ratio
+}
+
+# 基础数据缓存配置（车间、人员、传感类型、监测点、正常值范围）
+REFERENCE_CACHE_CONFIG = {
+    'max_size': 4096,  # 最多缓存的条目数，超出后淘汰最久未使用的
+    'ttl': 300  # 条目有效期（秒），到期后重新查询
+}
+
+# 采集数据汇总表配置
+ROLLUP_CONFIG = {
+    'retention_days': {'1m': 30, '1h': 730, '1d': None},  # 各粒度汇总数据保留天数，None表示永久保留
+    'max_points': 500  # 趋势查询默认返回的最大点数
+}
+
+# 采集数据表按月分区配置
+PARTITION_CONFIG = {
+    'months_ahead': 3,  # 提前创建未来几个月的分区
+    'retention_months': 24  # 原始采集数据保留月数（整月分区过期后删除），None表示永久保留
+}
+
+# 统计数缓存配置（首页/仪表盘的用户、车间、设备、部件、预警数量）
+COUNTER_CACHE_TTL = 30  # 分组统计结果缓存秒数，期间预警变化直接增减缓存
+
+# 异步导出任务配置
+EXPORT_CONFIG = {
+    'spool_dir': os.environ.get('EXPORT_SPOOL_DIR', 'exports'),  # 导出文件暂存目录
+    'workers': 2,  # 同时生成文件的任务数，其余任务排队
+    'ttl': 3600,  # 导出文件保留秒数，过期后删除
+    'progress_interval': 1  # 进度推送的最小间隔（秒）
+}
+
+# 冷数据归档配置（早于N天的原始采集数据移入 Parquet 列式文件，历史查询/导出透明读取）
+ARCHIVE_CONFIG = {
+    'dir': os.environ.get('ARCHIVE_DIR', 'archive'),  # 归档文件目录，按 <YYYYMM>/<监测点ID>.parquet 存放
+    'older_than_days': None,  # 归档早于该天数的数据，None表示不归档；应大于 1分钟汇总的保留天数
+    'compression': 'zstd'  # Parquet 压缩算法
+}
+
+# 数据库查询统计配置
+PROFILING_CONFIG = {
+    'enabled': True,  # 统计每个请求的查询次数、数据库耗时、取回行数、借用连接数
+    'server_timing': True,  # 结果写入 Server-Timing 响应头
+    'slow_query_ms': 500  # 单条SQL耗时超过该毫秒数记录慢查询日志（WARNING），None表示不记录
+}
+
+# 定时任务调度配置
+JOB_SCHEDULER_CONFIG = {
+    # 各类任务同时执行数上限：default=心跳写库等短任务，maintenance=夜间维护，warmup=启动预热，export=导出文件清理
+    'class_limits': {'default': 2, 'maintenance': 1, 'warmup': 1, 'export': 1}
+}
+
+# ID分配配置（序列 hi/lo 分段，段长即序列的 INCREMENT BY，修改后需重新执行 python id_sequence_cli.py migrate）
+ID_ALLOCATOR_CONFIG = {
+    # 批量写入的表用大段，一次访问数据库可分配一整段；基础信息表逐条新增，段长为1保持ID连续
+    'block_sizes': {'Dev_Moni_Data': 1000, 'Dev_Warning': 100, 'Dev_Moni_Point': 50, 'Dev_Normal_Val': 50},
+    'default_block_size': 1
+}
+
+# 自动心跳配置（演示/联调用：定时为所有设备记录心跳，使其保持在线）
+AUTO_HEARTBEAT_CONFIG = {
+    'enabled': False,  # 为True时由 app.py 的定时任务调度器执行，也可单独运行 python auto_heartbeat_sender.py
+    'interval': 10  # 发送间隔（秒）
+}
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库协程化基准测试
+在 eventlet 下并发执行若干条长查询（SELECT pg_sleep），同时运行一个按固定间隔「心跳」的协程，
+统计心跳的调度延迟（实际唤醒时间 - 预期唤醒时间）。Socket.IO 心跳处理只访问内存，
+其响应延迟即为该调度延迟。
+- --mode green：设置 psycopg2 等待回调（与 app.py 相同），长查询期间心跳延迟应保持平稳（毫秒级）
+- --mode blocking：不设置等待回调，长查询阻塞整个进程，心跳延迟接近查询时长
+- --mode both（默认）：依次执行两种模式并对比
+用法：python green_io_benchmark.py --queries 4 --seconds 2 --interval 50
+"""
+
+import argparse
+import logging
+import sys
+import os
+import time
+
+import eventlet
+eventlet.monkey_patch()
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def long_query(seconds):
+    """占用一个连接执行 pg_sleep"""
+    from utils.db import get_db_connection
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_sleep(?)", (seconds,))
+        cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def heartbeat(interval, until, lags):
+    """每 interval 秒唤醒一次，记录唤醒延迟（毫秒）"""
+    expected = time.perf_counter() + interval
+    while expected < until:
+        eventlet.sleep(max(0.0, expected - time.perf_counter()))
+        now = time.perf_counter()
+        lags.append((now - expected) * 1000)
+        expected = now + interval
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def run(mode, queries, seconds, interval):
+    from psycopg2 import extensions
+    from utils.db import enable_green_io
+
+    if mode == 'green':
+        enable_green_io()
+    else:
+        extensions.set_wait_callback(None)
+
+    lags = []
+    started = time.perf_counter()
+    beat = eventlet.spawn(heartbeat, interval, started + seconds + 1, lags)
+    eventlet.sleep(0.2)  # 先记录空闲时的基线
+    pool = eventlet.GreenPool(queries)
+    for _ in range(queries):
+        pool.spawn(long_query, seconds)
+    pool.waitall()
+    query_elapsed = time.perf_counter() - started - 0.2
+    beat.wait()
+
+    result = {
+        'mode': mode,
+        'queries': queries,
+        'query_elapsed_s': round(query_elapsed, 2),
+        'beats': len(lags),
+        'lag_p50_ms': round(percentile(lags, 50), 2),
+        'lag_p99_ms': round(percentile(lags, 99), 2),
+        'lag_max_ms': round(max(lags), 2)
+    }
+    logger.info(f"{result}")
+    return result
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='数据库协程化基准测试')
+    parser.add_argument('--mode', choices=['green', 'blocking', 'both'], default='both', help='测试模式')
+    parser.add_argument('--queries', type=int, default=4, help='并发长查询数（不超过连接池上限）')
+    parser.add_argument('--seconds', type=float, default=2, help='每条长查询的时长（秒）')
+    parser.add_argument('--interval', type=float, default=50, help='心跳间隔（毫秒）')
+    args = parser.parse_args()
+
+    from utils.db import init_db
+    try:
+        init_db()
+        modes = ['blocking', 'green'] if args.mode == 'both' else [args.mode]
+        for mode in modes:
+            run(mode, args.queries, args.seconds, args.interval / 1000)
+    except Exception as e:
+        logger.error(f"执行失败: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -30,6 +30,7 @@ def send_heartbeat(equipment_id):
         
         # 调用心跳更新函数
         result = EquipmentService.update_equipment_heartbeat(equipment_id)
+        EquipmentService.flush_heartbeats()
         
         if result:
             logger.info(f"设备 {equipment_id} 心跳发送成功")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ID序列维护命令行工具
+- migrate：为各表创建ID序列（起始值为 MAX(ID)+1），设为 ID 列默认值；修改段长配置后重新执行即可
+- list：列出各序列的段长和当前值
+"""
+
+import argparse
+import logging
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def list_sequences():
+    """各表序列的段长和当前值"""
+    from utils.db import get_db_connection
+    from utils.id_allocator import SEQUENCES
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        for table, sequence in SEQUENCES.items():
+            schema, name = sequence.lower().split('.')
+            cursor.execute(
+                "SELECT increment_by, last_value FROM pg_sequences WHERE schemaname = ? AND sequencename = ?",
+                (schema, name)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                logger.info(f"{table}: 序列不存在，可执行 migrate 创建")
+            else:
+                logger.info(f"{table}: {sequence}，段长{row[0]}，当前值{row[1] if row[1] is not None else '未使用'}")
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='ID序列维护工具')
+    parser.add_argument('command', choices=['migrate', 'list'], help='执行的操作')
+    args = parser.parse_args()
+
+    from utils.id_allocator import id_allocator
+    try:
+        if args.command == 'migrate':
+            id_allocator.migrate()
+            logger.info("迁移完成")
+        else:
+            list_sequences()
+    except Exception as e:
+        logger.error(f"执行失败: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from utils.db import get_db_connection
+from utils.id_allocator import id_allocator
 from datetime import datetime
 
 
@@ -10,15 +11,24 @@ class DataCollection:
         self.mon_value = mon_value  # 采集值
         self.collector_id = collector_id  # 采集人ID
 
+        # 关联信息（由 Hydrator.data_collections 批量预加载）
+        self.preloaded = False
+        self.point = None
+        self.normal_range = None
+        self.collector = None
+
     def to_dict(self):
-        """包含异常判定、关联信息"""
+        """包含异常判定、关联信息；未预加载时逐项查询"""
         from models.monitor_point import MonitorPoint
         from models.normal_range import NormalRange
         from models.staff import Staff
 
-        point = MonitorPoint.get_by_id(self.mon_id)
-        normal_range = NormalRange.get_by_monitor_id(self.mon_id)
-        collector = Staff.get_by_id(self.collector_id)
+        if self.preloaded:
+            point, normal_range, collector = self.point, self.normal_range, self.collector
+        else:
+            point = MonitorPoint.get_by_id(self.mon_id)
+            normal_range = NormalRange.get_by_monitor_id(self.mon_id)
+            collector = Staff.get_by_id(self.collector_id)
 
         # 判定是否正常
         is_normal = True
@@ -46,14 +56,20 @@ class DataCollection:
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
-            sql = "INSERT INTO DEV.Dev_Moni_Data (Mon_Date, Mon_ID, Mon_value, Collector_ID) VALUES (CURRENT_TIMESTAMP, ?, ?, ?)"
-            cursor.execute(sql, (mon_id, mon_value, collector_id))
+            mon_date = datetime.now()
+            data_id = id_allocator.next_id('Dev_Moni_Data', cursor)
+            sql = "INSERT INTO DEV.Dev_Moni_Data (ID, Mon_Date, Mon_ID, Mon_value, Collector_ID) VALUES (?, ?, ?, ?, ?)"
+            cursor.execute(sql, (data_id, mon_date, mon_id, mon_value, collector_id))
             conn.commit()
-            return True
         finally:
             cursor.close()
             conn.close()
 
+        # 阈值报警判定
+        from services.ingest_service import IngestService
+        IngestService.after_insert([(data_id, mon_id, mon_date, mon_value, collector_id)])
+        return True
+
     @staticmethod
     def get_all(mon_id=None, start_time=None, end_time=None):
         """获取采集数据（支持筛选）"""
@@ -13,21 +13,31 @@ class EarlyWarning:
         self.happen_time = happen_time  # 发生时间
         self.handle_time = handle_time  # 处理时间
 
+        # 关联名称（由 Hydrator.warnings 批量预加载，None表示未预加载）
+        self.mon_name = None
+        self.handler_name = None
+
     def to_dict(self):
-        """关联监测点名称、处理人名称"""
+        """关联监测点名称、处理人名称；已预加载时不再查询"""
         from models.monitor_point import MonitorPoint
         from models.staff import Staff
 
-        point = MonitorPoint.get_by_id(self.mon_id)
-        handler = Staff.get_by_id(self.per_id)
+        mon_name = self.mon_name
+        if mon_name is None:
+            point = MonitorPoint.get_by_id(self.mon_id)
+            mon_name = point.name if point else ''
+        handler_name = self.handler_name
+        if handler_name is None:
+            handler = Staff.get_by_id(self.per_id)
+            handler_name = handler.name if handler else '未分配'
 
         return {
             'id': self.id,
             'mon_id': self.mon_id,
-            'mon_name': point.name if point else '',
+            'mon_name': mon_name,
             'msg_text': self.msg_text,
             'per_id': self.per_id,
-            'handler_name': handler.name if handler else '未分配',
+            'handler_name': handler_name,
             'msg_state': self.msg_state.strip() if self.msg_state else '待处理',
             'happen_time': self.happen_time.strftime('%Y-%m-%d %H:%M:%S') if hasattr(self.happen_time, 'strftime') and self.happen_time else '',
             'handle_time': self.handle_time.strftime('%Y-%m-%d %H:%M:%S') if hasattr(self.handle_time, 'strftime') and self.handle_time else '未处理'
@@ -42,6 +52,8 @@ class EarlyWarning:
             sql = "INSERT INTO DEV.DEV_WARNING (Mon_ID, Msg_Text, Msg_State, Happen_Time) VALUES (?, ?, '待处理', CURRENT_TIMESTAMP)"
             cursor.execute(sql, (mon_id, msg_text))
             conn.commit()
+            from services.counter_service import counters
+            counters.adjust_warnings(None, '待处理')
             return True
         finally:
             cursor.close()
@@ -140,6 +152,8 @@ class EarlyWarning:
             sql = "DELETE FROM DEV.DEV_WARNING WHERE ID = ?"
             cursor.execute(sql, (warn_id,))
             conn.commit()
+            from services.counter_service import counters
+            counters.invalidate()
             return True
         finally:
             cursor.close()
@@ -1,4 +1,6 @@
 from utils.db import get_db_connection
+from utils.id_allocator import id_allocator
+from utils.cache import invalidate
 from datetime import datetime
 
 
@@ -16,16 +18,21 @@ class Equipment:
         self.online_status = online_status  # 在线状态
         self.last_heartbeat = last_heartbeat  # 最后心跳时间
 
-        self.workshop_name = None  # 安装车间名称
-        self.person_name = None    # 负责人姓名
+        self.workshop_name = None  # 安装车间名称（None表示未预加载）
+        self.person_name = None    # 负责人姓名（None表示未预加载）
 
     def to_dict(self):
-        """关联车间名称、负责人姓名（适配项目表0.2+表0.3）"""
+        """关联车间名称、负责人姓名（适配项目表0.2+表0.3）；名称已预加载（JOIN或批量加载）时不再查询"""
         from models.workshop import Workshop
         from models.staff import Staff
-        workshop = Workshop.get_by_id(self.pos_id)
-        staff = Staff.get_by_id(self.person_id)
-        workshop_name = self.workshop_name if self.workshop_name else (workshop.name if workshop else '')
+        workshop_name = self.workshop_name
+        if workshop_name is None:
+            workshop = Workshop.get_by_id(self.pos_id)
+            workshop_name = workshop.name if workshop else ''
+        person_name = self.person_name
+        if person_name is None:
+            staff = Staff.get_by_id(self.person_id)
+            person_name = staff.name if staff else ''
         return {
             'id': self.id,
             'equip_code': self.equip_code,
@@ -34,7 +41,7 @@ class Equipment:
             'pos_name': workshop_name,  # 兼容旧版模板
             'workshop_name': workshop_name,  # 兼容新版模板
             'person_id': self.person_id,
-            'person_name': self.person_name if self.person_name else (staff.name if staff else ''),
+            'person_name': person_name,
             'pur_date': self.pur_date.strftime('%Y-%m-%d') if hasattr(self.pur_date, 'strftime') and self.pur_date else '',
             'first_time': self.first_time.strftime('%Y-%m-%d') if hasattr(self.first_time, 'strftime') and self.first_time else '',
             'use_state': self.use_state,  # 在用/在库（项目表0.3）
@@ -42,6 +49,36 @@ class Equipment:
             'last_heartbeat': self.last_heartbeat.strftime('%Y-%m-%d %H:%M:%S') if hasattr(self.last_heartbeat, 'strftime') and self.last_heartbeat else '无'
         }
 
+    @staticmethod
+    def get_by_ids(ids):
+        """按ID批量获取设备（一次 ANY 查询），返回 {ID: Equipment对象}"""
+        ids = [i for i in set(ids) if i is not None]
+        if not ids:
+            return {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, Equip_Code, Name, Pos_ID, Person_ID, Pur_Date, First_Time, Use_State, Online_Status, Last_Heartbeat FROM DEV.Dev_Main_Dev WHERE ID = ANY(?)"
+            cursor.execute(sql, (ids,))
+            result = {}
+            for row in cursor.fetchall():
+                result[row[0]] = Equipment(
+                    id=row[0],
+                    equip_code=row[1],
+                    name=row[2],
+                    pos_id=row[3],
+                    person_id=row[4],
+                    pur_date=row[5],
+                    first_time=row[6],
+                    use_state=row[7],
+                    online_status=row[8],
+                    last_heartbeat=row[9]
+                )
+            return result
+        finally:
+            cursor.close()
+            conn.close()
+
     @staticmethod
     def get_by_principal_id(principal_id):
         """根据负责人ID查询设备（适配项目表0.3的“负责人”关联）"""
@@ -282,8 +319,8 @@ class Equipment:
                     last_heartbeat=row[11]
                 )
                 # 赋值临时属性（关联查询的名称）
-                equip.workshop_name = row[4]  # 安装车间名称
-                equip.person_name = row[6]  # 负责人姓名
+                equip.workshop_name = row[4] or ''  # 安装车间名称
+                equip.person_name = row[6] or ''  # 负责人姓名
                 equipments.append(equip)
             return equipments, total_count
         finally:
@@ -303,6 +340,84 @@ class Equipment:
             cursor.close()
             conn.close()
 
+    @staticmethod
+    def bulk_update_heartbeats(heartbeats):
+        """
+        批量更新心跳时间并标记在线（一条UPDATE语句）
+        :param heartbeats: dict {设备ID: 最后心跳时间}
+        :return: 更新的行数
+        """
+        if not heartbeats:
+            return 0
+        from psycopg2.extras import execute_values
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            execute_values(
+                cursor,
+                """
+                UPDATE DEV.Dev_Main_Dev d
+                SET Last_Heartbeat = v.last_heartbeat, Online_Status = '在线'
+                FROM (VALUES %s) AS v(id, last_heartbeat)
+                WHERE d.ID = v.id
+                """,
+                list(heartbeats.items()),
+                page_size=len(heartbeats)  # 一条语句写完，rowcount 才是全部更新行数
+            )
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def bulk_set_offline(equipment_ids):
+        """批量标记设备离线"""
+        if not equipment_ids:
+            return 0
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "UPDATE DEV.Dev_Main_Dev SET Online_Status = '离线' WHERE ID = ANY(?)"
+            cursor.execute(sql, (list(equipment_ids),))
+            conn.commit()
+            return cursor.rowcount
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def get_recent_heartbeats(since):
+        """查询 since 之后有心跳的设备，返回 [(ID, Last_Heartbeat)]（含其他进程写入的心跳）"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, Last_Heartbeat FROM DEV.Dev_Main_Dev WHERE Last_Heartbeat > ?"
+            cursor.execute(sql, (since,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def get_heartbeat_states():
+        """查询所有设备的心跳状态，返回 [(ID, Last_Heartbeat, Online_Status)]"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, Last_Heartbeat, Online_Status FROM DEV.Dev_Main_Dev"
+            cursor.execute(sql)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
     @staticmethod
     def check_online_status():
         conn = get_db_connection()
@@ -338,15 +453,14 @@ class Equipment:
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
-            # 查询最大ID
-            cursor.execute("SELECT MAX(ID) FROM DEV.Dev_Main_Dev")
-            max_id = cursor.fetchone()[0]
-            new_id = max_id + 1 if max_id is not None else 1
-            
+            new_id = id_allocator.next_id('Dev_Main_Dev', cursor)
             # 插入新设备
             sql = "INSERT INTO DEV.Dev_Main_Dev (ID, Equip_Code, Name, Pos_ID, Person_ID, Pur_Date, First_Time, Use_State, Online_Status) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
             cursor.execute(sql, (new_id, equip_code, name, pos_id, person_id, pur_date, first_time, use_state, '离线'))
             conn.commit()
+            invalidate('equipment')
+            from services.counter_service import counters
+            counters.invalidate()
             return True
         except Exception as e:
             conn.rollback()
@@ -363,6 +477,9 @@ class Equipment:
             sql = "UPDATE DEV.Dev_Main_Dev SET Name = ?, Pos_ID = ?, Person_ID = ?, Pur_Date = ?, First_Time = ?, Use_State = ? WHERE ID = ?"
             cursor.execute(sql, (name, pos_id, person_id, pur_date, first_time, use_state, equipment_id))
             conn.commit()
+            invalidate('equipment')
+            from services.counter_service import counters
+            counters.invalidate()
             return True
         except Exception as e:
             conn.rollback()
@@ -379,6 +496,9 @@ class Equipment:
             sql = "DELETE FROM DEV.Dev_Main_Dev WHERE ID = ?"
             cursor.execute(sql, (equipment_id,))
             conn.commit()
+            invalidate('equipment')
+            from services.counter_service import counters
+            counters.invalidate()
             return True
         except Exception as e:
             conn.rollback()
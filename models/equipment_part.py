@@ -1,4 +1,6 @@
 from utils.db import get_db_connection  # 仅保留连接函数，删除db导入
+from utils.id_allocator import id_allocator
+from utils.cache import invalidate
 
 
 class EquipmentPart:
@@ -8,28 +10,37 @@ class EquipmentPart:
         self.part_name = part_name
         self.description = description
 
+        # 关联信息（由 Hydrator.parts 批量预加载，None表示未预加载）
+        self.equipment_name = None
+        self.monitor_points = None
+
     def to_dict(self):
-        """转换为字典（关联设备名称和监测点，增强数据可读性）"""
+        """转换为字典（关联设备名称和监测点，增强数据可读性）；已预加载时不再查询"""
         from models.equipment import Equipment
         from models.monitor_point import MonitorPoint
-        equipment = None
-        monitor_points = []
-        try:
-            # 避免设备查询失败导致整体报错
-            equipment = Equipment.get_by_id(self.mid)
-        except Exception as e:
-            print(f"查询部件{self.id}关联设备失败：{str(e)}")
-        
-        try:
-            # 查询部件关联的监测点
-            monitor_points = MonitorPoint.get_all(part_id=self.id)
-        except Exception as e:
-            print(f"查询部件{self.id}关联监测点失败：{str(e)}")
+        equipment_name = self.equipment_name
+        if equipment_name is None:
+            equipment = None
+            try:
+                # 避免设备查询失败导致整体报错
+                equipment = Equipment.get_by_id(self.mid)
+            except Exception as e:
+                print(f"查询部件{self.id}关联设备失败：{str(e)}")
+            equipment_name = equipment.name if equipment else '未知设备'
+
+        monitor_points = self.monitor_points
+        if monitor_points is None:
+            monitor_points = []
+            try:
+                # 查询部件关联的监测点
+                monitor_points = MonitorPoint.get_all(part_id=self.id)
+            except Exception as e:
+                print(f"查询部件{self.id}关联监测点失败：{str(e)}")
 
         return {
             'ID': self.id,
             'mid': self.mid,
-            'equipment_name': equipment.name if equipment else '未知设备',
+            'equipment_name': equipment_name,
             'Part_Name': self.part_name or '',
             'Description': self.description or '无',
             'monitor_points': monitor_points
@@ -125,6 +136,30 @@ class EquipmentPart:
             cursor.close()
             conn.close()
 
+    @staticmethod
+    def get_by_ids(ids):
+        """按ID批量获取部件（一次 ANY 查询），返回 {ID: EquipmentPart对象}"""
+        ids = [i for i in set(ids) if i is not None]
+        if not ids:
+            return {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, MID, Part_Name, Description FROM DEV.Dev_Part WHERE ID = ANY(?)"
+            cursor.execute(sql, (ids,))
+            result = {}
+            for row in cursor.fetchall():
+                result[row[0]] = EquipmentPart(
+                    id=row[0],
+                    mid=row[1],
+                    part_name=row[2],
+                    description=row[3]
+                )
+            return result
+        finally:
+            cursor.close()
+            conn.close()
+
     def add(self):
         """
         新增设备部件（调用对象的实例方法，需先初始化属性）
@@ -138,15 +173,18 @@ class EquipmentPart:
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
-            # 假设ID为自增主键（若不是，需传入ID）
+            # ID从序列分配
+            new_id = id_allocator.next_id('Dev_Part', cursor)
             sql = """
-                INSERT INTO DEV.Dev_Part (MID, Part_Name, Description)
-                VALUES (?, ?, ?)
+                INSERT INTO DEV.Dev_Part (ID, MID, Part_Name, Description)
+                VALUES (?, ?, ?, ?)
             """
-            cursor.execute(sql, [self.mid, self.part_name, self.description or ''])
+            cursor.execute(sql, [new_id, self.mid, self.part_name, self.description or ''])
             conn.commit()  # 提交事务
-            # 获取自增ID（若需要）
-            self.id = cursor.lastrowid if hasattr(cursor, 'lastrowid') else None
+            invalidate('part')
+            from services.counter_service import counters
+            counters.invalidate()
+            self.id = new_id
             print(f"新增部件成功：ID={self.id}，名称={self.part_name}")
             return True
         except Exception as e:
@@ -180,6 +218,7 @@ class EquipmentPart:
             """
             cursor.execute(sql, [self.mid, self.part_name, self.description or '', self.id])
             conn.commit()
+            invalidate('part')
 
             # 检查是否有数据被更新
             if cursor.rowcount == 0:
@@ -223,6 +262,9 @@ class EquipmentPart:
             sql = "DELETE FROM DEV.Dev_Part WHERE ID = ?"
             cursor.execute(sql, [part_id])
             conn.commit()
+            invalidate('part')
+            from services.counter_service import counters
+            counters.invalidate()
 
             if cursor.rowcount == 0:
                 print(f"删除部件失败：未找到ID={part_id}的部件")
@@ -0,0 +1,97 @@
+class Hydrator:
+    """
+    批量预加载模型对象的关联名称
+    - 先收集一批对象的外键，每种关联表只用一次 WHERE ID = ANY(?) 查询
+    - 结果写回对象的预加载属性，to_dict() 发现已预加载就不再逐条 get_by_id
+    - 各方法返回传入的列表，便于链式使用：[w.to_dict() for w in Hydrator.warnings(warnings)]
+    """
+
+    @staticmethod
+    def equipments(equipments):
+        """设备：车间名称、负责人姓名"""
+        from models.workshop import Workshop
+        from models.staff import Staff
+        pending = [eq for eq in equipments if eq.workshop_name is None or eq.person_name is None]
+        if not pending:
+            return equipments
+        workshops = Workshop.get_by_ids(eq.pos_id for eq in pending)
+        staff = Staff.get_by_ids(eq.person_id for eq in pending)
+        for eq in pending:
+            if eq.workshop_name is None:
+                workshop = workshops.get(eq.pos_id)
+                eq.workshop_name = workshop.name if workshop else ''
+            if eq.person_name is None:
+                person = staff.get(eq.person_id)
+                eq.person_name = person.name if person else ''
+        return equipments
+
+    @staticmethod
+    def monitor_points(points):
+        """监测点：部件名称、传感类型名称、管理员姓名"""
+        from models.equipment_part import EquipmentPart
+        from models.sensor_type import SensorType
+        from models.staff import Staff
+        if not points:
+            return points
+        parts = EquipmentPart.get_by_ids(p.part_id for p in points)
+        sensors = SensorType.get_by_ids(p.sense_type for p in points)
+        admins = Staff.get_by_ids(p.admin_peron for p in points)
+        for point in points:
+            part = parts.get(point.part_id)
+            sensor = sensors.get(point.sense_type)
+            admin = admins.get(point.admin_peron)
+            point.part_name = part.part_name if part else ''
+            point.sense_name = sensor.name if sensor else ''
+            point.admin_name = admin.name if admin else ''
+        return points
+
+    @staticmethod
+    def warnings(warnings):
+        """预警：监测点名称、处理人姓名"""
+        from models.monitor_point import MonitorPoint
+        from models.staff import Staff
+        if not warnings:
+            return warnings
+        points = MonitorPoint.get_by_ids(w.mon_id for w in warnings)
+        handlers = Staff.get_by_ids(w.per_id for w in warnings)
+        for warning in warnings:
+            point = points.get(warning.mon_id)
+            handler = handlers.get(warning.per_id)
+            warning.mon_name = point.name if point else ''
+            warning.handler_name = handler.name if handler else '未分配'
+        return warnings
+
+    @staticmethod
+    def data_collections(collections):
+        """采集数据：监测点、正常值范围、采集人（None项跳过）"""
+        from models.monitor_point import MonitorPoint
+        from models.normal_range import NormalRange
+        from models.staff import Staff
+        items = [c for c in collections if c is not None]
+        if not items:
+            return collections
+        mon_ids = [c.mon_id for c in items]
+        points = MonitorPoint.get_by_ids(mon_ids)
+        ranges = NormalRange.get_by_monitor_ids(mon_ids)
+        collectors = Staff.get_by_ids(c.collector_id for c in items)
+        for item in items:
+            item.point = points.get(item.mon_id)
+            item.normal_range = ranges.get(item.mon_id)
+            item.collector = collectors.get(item.collector_id)
+            item.preloaded = True
+        return collections
+
+    @staticmethod
+    def parts(parts):
+        """部件：所属设备名称、关联监测点"""
+        from models.equipment import Equipment
+        from models.monitor_point import MonitorPoint
+        if not parts:
+            return parts
+        equipments = Equipment.get_by_ids(p.mid for p in parts)
+        points = MonitorPoint.get_by_part_ids(p.id for p in parts)
+        for part in parts:
+            equipment = equipments.get(part.mid)
+            part.equipment_name = equipment.name if equipment else '未知设备'
+            part.monitor_points = points.get(part.id, [])
+        return parts
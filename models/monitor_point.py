@@ -1,4 +1,5 @@
 from utils.db import get_db_connection
+from utils.cache import cached, cached_many
 
 
 class MonitorPoint:
@@ -14,27 +15,41 @@ class MonitorPoint:
         self.unit = unit  # 单位
         self.admin_peron = admin_peron  # 管理员ID
 
+        # 关联名称（由 Hydrator.monitor_points 批量预加载，None表示未预加载）
+        self.part_name = None
+        self.sense_name = None
+        self.admin_name = None
+
     def to_dict(self):
-        """关联部件名称、传感类型名称、管理员名称"""
+        """关联部件名称、传感类型名称、管理员名称；已预加载时不再查询"""
         from models.equipment_part import EquipmentPart
         from models.sensor_type import SensorType
         from models.staff import Staff
-        part = EquipmentPart.get_by_id(self.part_id)
-        sensor = SensorType.get_by_id(self.sense_type)
-        admin = Staff.get_by_id(self.admin_peron)
+        part_name = self.part_name
+        if part_name is None:
+            part = EquipmentPart.get_by_id(self.part_id)
+            part_name = part.part_name if part else ''
+        sense_name = self.sense_name
+        if sense_name is None:
+            sensor = SensorType.get_by_id(self.sense_type)
+            sense_name = sensor.name if sensor else ''
+        admin_name = self.admin_name
+        if admin_name is None:
+            admin = Staff.get_by_id(self.admin_peron)
+            admin_name = admin.name if admin else ''
         return {
             'id': self.id,
             'name': self.name,
             'part_id': self.part_id,
-            'part_name': part.part_name if part else '',
+            'part_name': part_name,
             'sense_type': self.sense_type,
-            'sense_name': sensor.name if sensor else '',
+            'sense_name': sense_name,
             'sample_period': self.sample_period,
             'sample_freq': self.sample_freq,
             'sample_long': self.sample_long,
             'unit': self.unit,
             'admin_peron': self.admin_peron,
-            'admin_name': admin.name if admin else ''
+            'admin_name': admin_name
         }
 
     @staticmethod
@@ -81,6 +96,83 @@ class MonitorPoint:
             cursor.close()
             conn.close()
 
+    @staticmethod
+    @cached_many('monitor_point', 'get_by_id')
+    def get_by_ids(ids):
+        """按ID批量获取监测点（一次 ANY 查询），返回 {ID: MonitorPoint对象}"""
+        ids = [i for i in set(ids) if i is not None]
+        if not ids:
+            return {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, Name, PART_ID, Sense_Type, Sample_Period, Sample_Freq, Sample_Long, unit, Admin_Peron FROM DEV.Dev_Moni_Point WHERE ID = ANY(?)"
+            cursor.execute(sql, (ids,))
+            result = {}
+            for row in cursor.fetchall():
+                result[row[0]] = MonitorPoint(
+                    id=row[0],
+                    name=row[1],
+                    part_id=row[2],
+                    sense_type=row[3],
+                    sample_period=row[4],
+                    sample_freq=row[5],
+                    sample_long=row[6],
+                    unit=row[7],
+                    admin_peron=row[8]
+                )
+            return result
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def get_by_part_ids(part_ids):
+        """按部件ID批量获取监测点（一次 ANY 查询），返回 {部件ID: [MonitorPoint对象]}"""
+        part_ids = [i for i in set(part_ids) if i is not None]
+        if not part_ids:
+            return {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, Name, PART_ID, Sense_Type, Sample_Period, Sample_Freq, Sample_Long, unit, Admin_Peron FROM DEV.Dev_Moni_Point WHERE PART_ID = ANY(?) ORDER BY ID"
+            cursor.execute(sql, (part_ids,))
+            result = {}
+            for row in cursor.fetchall():
+                result.setdefault(row[2], []).append(MonitorPoint(
+                    id=row[0],
+                    name=row[1],
+                    part_id=row[2],
+                    sense_type=row[3],
+                    sample_period=row[4],
+                    sample_freq=row[5],
+                    sample_long=row[6],
+                    unit=row[7],
+                    admin_peron=row[8]
+                ))
+            return result
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def get_equipment_map():
+        """所有监测点所属设备（一次JOIN查询），返回 {监测点ID: (设备ID, 监测点名称, 单位)}"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = """
+            SELECT mp.ID, p.MID, mp.Name, mp.unit
+            FROM DEV.Dev_Moni_Point mp
+            JOIN DEV.Dev_Part p ON mp.PART_ID = p.ID
+            """
+            cursor.execute(sql)
+            return {row[0]: (row[1], row[2].strip() if row[2] else '', row[3].strip() if row[3] else '')
+                    for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
     @staticmethod
     def get_by_part_id(part_id):
         """根据部件ID获取所有关联的监测点"""
@@ -110,6 +202,7 @@ class MonitorPoint:
             conn.close()
 
     @staticmethod
+    @cached('monitor_point')
     def get_by_id(point_id):
         """根据ID获取监测点"""
         conn = get_db_connection()
@@ -1,4 +1,5 @@
 from utils.db import get_db_connection  # 仅保留原生连接函数
+from utils.cache import cached, cached_many
 # 移除：from utils.db import db
 
 class NormalRange:
@@ -23,6 +24,7 @@ class NormalRange:
         }
 
     @staticmethod
+    @cached('normal_range')
     def get_by_monitor_id(mon_id):
         """根据监测点ID获取正常值范围（表0.7核心查询）"""
         conn = get_db_connection()
@@ -45,6 +47,33 @@ class NormalRange:
             conn.close()
 
     @staticmethod
+    @cached_many('normal_range', 'get_by_monitor_id')
+    def get_by_monitor_ids(ids):
+        """按监测点ID批量获取正常值范围（一次 ANY 查询），返回 {监测点ID: NormalRange对象}"""
+        ids = [i for i in set(ids) if i is not None]
+        if not ids:
+            return {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, Mon_ID, Min_Val, Max_Val, Note FROM DEV.Dev_Normal_Val WHERE Mon_ID = ANY(?)"
+            cursor.execute(sql, (ids,))
+            result = {}
+            for row in cursor.fetchall():
+                result[row[1]] = NormalRange(
+                    id=row[0],
+                    mon_id=row[1],
+                    min_val=row[2],
+                    max_val=row[3],
+                    note=row[4]
+                )
+            return result
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    @cached('normal_range')
     def get_all():
         """获取所有正常值范围（表0.7全量查询）"""
         conn = get_db_connection()
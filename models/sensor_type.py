@@ -1,4 +1,5 @@
 from utils.db import get_db_connection
+from utils.cache import cached, cached_many
 
 class SensorType:
     def __init__(self, id=None, name=None):
@@ -12,6 +13,7 @@ class SensorType:
         }
 
     @staticmethod
+    @cached('sensor_type')
     def get_all():
         """获取所有传感类型"""
         conn = get_db_connection()
@@ -32,6 +34,7 @@ class SensorType:
             conn.close()
 
     @staticmethod
+    @cached('sensor_type')
     def get_by_id(type_id):
         """根据ID获取传感类型"""
         conn = get_db_connection()
@@ -48,4 +51,27 @@ class SensorType:
             )
         finally:
             cursor.close()
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+    @staticmethod
+    @cached_many('sensor_type', 'get_by_id')
+    def get_by_ids(ids):
+        """按ID批量获取传感类型（一次 ANY 查询），返回 {ID: SensorType对象}"""
+        ids = [i for i in set(ids) if i is not None]
+        if not ids:
+            return {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, name FROM DEV.Dev_Sense_Type WHERE ID = ANY(?)"
+            cursor.execute(sql, (ids,))
+            result = {}
+            for row in cursor.fetchall():
+                result[row[0]] = SensorType(
+                    id=row[0],
+                    name=row[1]
+                )
+            return result
+        finally:
+            cursor.close()
+            conn.close()
@@ -1,4 +1,6 @@
 from utils.db import get_db_connection
+from utils.id_allocator import id_allocator
+from utils.cache import cached, cached_many, invalidate
 
 
 class Staff:
@@ -13,8 +15,9 @@ class Staff:
         """关联用户信息和负责设备信息（适配项目表0.1+表0.3）"""
         from models.user import User
         from models.equipment import Equipment
+        from models.hydrator import Hydrator
         user = User.get_by_person_id(self.id)
-        responsible_equipments = Equipment.get_by_principal_id(self.id)
+        responsible_equipments = Hydrator.equipments(Equipment.get_by_principal_id(self.id))
         return {
             'id': self.id,
             'name': self.name,
@@ -27,6 +30,7 @@ class Staff:
         }
 
     @staticmethod
+    @cached('staff')
     def get_by_id(staff_id):
         """根据ID获取职工（核心查询）"""
         conn = get_db_connection()
@@ -48,6 +52,32 @@ class Staff:
             cursor.close()
             conn.close()
 
+    @staticmethod
+    @cached_many('staff', 'get_by_id')
+    def get_by_ids(ids):
+        """按ID批量获取职工（一次 ANY 查询），返回 {ID: Staff对象}"""
+        ids = [i for i in set(ids) if i is not None]
+        if not ids:
+            return {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, Name, Mail_Box, M_Tel, Per_pos FROM DEV.Dev_Person WHERE ID = ANY(?)"
+            cursor.execute(sql, (ids,))
+            result = {}
+            for row in cursor.fetchall():
+                result[row[0]] = Staff(
+                    id=row[0],
+                    name=row[1],
+                    mail_box=row[2],
+                    m_tel=row[3],
+                    per_pos=row[4]
+                )
+            return result
+        finally:
+            cursor.close()
+            conn.close()
+
     @staticmethod
     def get_all_by_position(position):
         """按岗位查询职工（适配项目表0.1的“岗位”筛选）"""
@@ -80,17 +110,19 @@ class Staff:
             # 校验手机号唯一（项目表0.1手机号唯一）
             if Staff.get_by_phone(m_tel):
                 raise ValueError(f"手机号{m_tel}已被注册")
-            sql = "INSERT INTO DEV.Dev_Person (Name, Mail_Box, M_Tel, Per_pos) VALUES (?, ?, ?, ?)"
-            cursor.execute(sql, (name, mail_box, m_tel, per_pos))
+            new_id = id_allocator.next_id('Dev_Person', cursor)
+            sql = "INSERT INTO DEV.Dev_Person (ID, Name, Mail_Box, M_Tel, Per_pos) VALUES (?, ?, ?, ?, ?)"
+            cursor.execute(sql, (new_id, name, mail_box, m_tel, per_pos))
             conn.commit()
+            invalidate('staff')
             # 返回新增职工ID
-            cursor.execute("SELECT MAX(ID) FROM DEV.Dev_Person")
-            return cursor.fetchone()[0]
+            return new_id
         finally:
             cursor.close()
             conn.close()
 
     @staticmethod
+    @cached('staff')
     def get_all_staff():
         """获取所有人员列表"""
         conn = get_db_connection()
@@ -150,6 +182,7 @@ class Staff:
             params.append(staff_id)
             cursor.execute(sql, params)
             conn.commit()
+            invalidate('staff')
             return True
         finally:
             cursor.close()
@@ -174,6 +207,7 @@ class Staff:
             sql = "DELETE FROM DEV.Dev_Person WHERE ID = ?"
             cursor.execute(sql, (staff_id,))
             conn.commit()
+            invalidate('staff')
             return True
         finally:
             cursor.close()
@@ -225,6 +259,7 @@ class Staff:
 
     # 原有基础方法保留（get_all）
     @staticmethod
+    @cached('staff')
     def get_all():
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -161,6 +161,8 @@ class User:
             """
             cursor.execute(sql, (username, encrypted_pwd, person_id, role))
             conn.commit()
+            from services.counter_service import counters
+            counters.invalidate()
             return True
         except ValueError as e:
             print(f"注册失败：{str(e)}")
@@ -397,6 +399,8 @@ class User:
             """
             cursor.execute(sql, (username, password, person_id, role))
             conn.commit()
+            from services.counter_service import counters
+            counters.invalidate()
             return True
         except Exception as e:
             print(f"添加用户失败（用户名：{username}）：{str(e)}")
@@ -429,6 +433,8 @@ class User:
 
             # 4. 提交事务
             conn.commit()
+            from services.counter_service import counters
+            counters.invalidate()
             # 5. 校验是否删除成功（影响行数>0表示删除成功）
             if cursor.rowcount > 0:
                 print(f"用户ID {user_id} 删除成功，影响行数：{cursor.rowcount}")
@@ -1,4 +1,6 @@
 from utils.db import get_db_connection
+from utils.id_allocator import id_allocator
+from utils.cache import cached, cached_many, invalidate
 
 class Workshop:
     def __init__(self, id=None, name=None):
@@ -12,6 +14,7 @@ class Workshop:
         }
 
     @staticmethod
+    @cached('workshop')
     def get_all():
         """获取所有车间"""
         conn = get_db_connection()
@@ -73,6 +76,7 @@ class Workshop:
             if conn:
                 conn.close()
     @staticmethod
+    @cached('workshop')
     def get_by_id(workshop_id):
         """根据ID获取车间"""
         conn = get_db_connection()
@@ -91,21 +95,41 @@ class Workshop:
             cursor.close()
             conn.close()
 
+    @staticmethod
+    @cached_many('workshop', 'get_by_id')
+    def get_by_ids(ids):
+        """按ID批量获取车间（一次 ANY 查询），返回 {ID: Workshop对象}"""
+        ids = [i for i in set(ids) if i is not None]
+        if not ids:
+            return {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = "SELECT ID, name FROM DEV.Dev_Place WHERE ID = ANY(?)"
+            cursor.execute(sql, (ids,))
+            result = {}
+            for row in cursor.fetchall():
+                result[row[0]] = Workshop(
+                    id=row[0],
+                    name=row[1]
+                )
+            return result
+        finally:
+            cursor.close()
+            conn.close()
+
     @staticmethod
     def add(workshop_name):
         """新增车间"""
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
-            # 查询最大ID
-            cursor.execute("SELECT MAX(ID) FROM DEV.Dev_Place")
-            max_id = cursor.fetchone()[0]
-            new_id = max_id + 1 if max_id is not None else 1
-            
+            new_id = id_allocator.next_id('Dev_Place', cursor)
             # 插入新车间
             sql = "INSERT INTO DEV.Dev_Place (ID, name) VALUES (?, ?)"
             cursor.execute(sql, (new_id, workshop_name))
             conn.commit()
+            invalidate('workshop')
             return True
         finally:
             cursor.close()
@@ -120,6 +144,7 @@ class Workshop:
             sql = "UPDATE DEV.Dev_Place SET name = ? WHERE ID = ?"
             cursor.execute(sql, (new_name, workshop_id))
             conn.commit()
+            invalidate('workshop')
             return True
         finally:
             cursor.close()
@@ -134,6 +159,7 @@ class Workshop:
             sql = "DELETE FROM DEV.Dev_Place WHERE ID = ?"
             cursor.execute(sql, (workshop_id,))
             conn.commit()
+            invalidate('workshop')
             return True
         finally:
             cursor.close()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集数据分区维护命令行工具
+- migrate：把普通表 Dev_Moni_Data 在线转换为按月分区表（只需执行一次）
+- maintain：提前创建未来月份的分区，删除超过保留期的分区（app.py 中每天自动执行）
+- list：列出现有分区及其时间范围
+"""
+
+import argparse
+import logging
+import sys
+import os
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='采集数据分区维护工具')
+    parser.add_argument('command', choices=['migrate', 'maintain', 'list'], help='执行的操作')
+    args = parser.parse_args()
+
+    from services.partition_service import partition_manager
+    try:
+        if args.command == 'migrate':
+            if partition_manager.migrate():
+                logger.info("迁移完成")
+        elif args.command == 'maintain':
+            result = partition_manager.maintain()
+            logger.info(f"新建分区：{result['created']}，删除分区：{result['dropped']}")
+        else:
+            if not partition_manager.is_partitioned():
+                logger.info("采集数据表尚未分区，可执行 migrate 转换")
+            for name, lower, upper in partition_manager.list_partitions():
+                logger.info(f"{name}: {lower or 'MINVALUE'} ~ {upper or 'MAXVALUE'}")
+    except Exception as e:
+        logger.error(f"执行失败: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
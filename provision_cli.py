@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基础信息批量导入命令行工具
+导入 JSON 树形结构（车间 → 设备 → 部件 → 监测点 → 正常值范围）或 CSV 文件（每行一个监测点），
+整体校验通过后在一个事务内写入，格式见 services/provision_service.py
+用法：python provision_cli.py line3.json [--dry-run]
+"""
+
+import argparse
+import logging
+import sys
+import os
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='基础信息批量导入工具')
+    parser.add_argument('file', help='JSON 或 CSV 文件路径')
+    parser.add_argument('--dry-run', action='store_true', help='只校验不写入')
+    args = parser.parse_args()
+
+    from services.provision_service import ProvisionService
+    try:
+        started = time.perf_counter()
+        with open(args.file, 'rb') as f:
+            tree = ProvisionService.read_file(f)
+        result = ProvisionService.provision(tree, dry_run=args.dry_run)
+        elapsed = time.perf_counter() - started
+    except Exception as e:
+        logger.error(f"执行失败: {e}", exc_info=True)
+        sys.exit(1)
+
+    for error in result['errors']:
+        logger.error(f"{error['path']}：{error['reason']}")
+    if result['errors']:
+        logger.error(f"校验失败：{len(result['errors'])}处错误，未写入任何数据")
+        sys.exit(1)
+    action = '校验通过（未写入）' if args.dry_run else '导入完成'
+    logger.info(f"{action}：{result['counts']}，耗时{elapsed:.2f}秒")
+
+
+if __name__ == "__main__":
+    main()
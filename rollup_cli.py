@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+汇总数据维护命令行工具
+- rebuild：从原始采集数据重算指定时间范围的 1分钟/1小时/1天 汇总（首次上线补算历史数据或修复）
+- purge：按 ROLLUP_CONFIG 的保留天数清理过期汇总数据
+"""
+
+import argparse
+import logging
+import sys
+import os
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# 配置日志
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_date(value):
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f'时间格式错误：{value}（应为 YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS）')
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='汇总数据维护工具')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    rebuild_parser = subparsers.add_parser('rebuild', help='从原始数据重算汇总')
+    rebuild_parser.add_argument('--start', type=parse_date, required=True, help='开始日期')
+    rebuild_parser.add_argument('--end', type=parse_date, required=True, help='结束日期（不含，按整天对齐）')
+    rebuild_parser.add_argument('--mon-id', help='只重算指定监测点')
+
+    subparsers.add_parser('purge', help='清理过期汇总数据')
+
+    args = parser.parse_args()
+
+    from services.rollup_service import RollupService
+    try:
+        if args.command == 'rebuild':
+            result = RollupService.rebuild(args.start, args.end, args.mon_id)
+            logger.info(f"重算完成：{result}")
+        else:
+            result = RollupService.purge()
+            logger.info(f"清理完成：{result}")
+    except Exception as e:
+        logger.error(f"执行失败: {e}", exc_info=True)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, make_response
 from services.equipment_service import EquipmentService
 from models.workshop import Workshop
 from models.equipment import Equipment
 from models.equipment_part import EquipmentPart
+from models.hydrator import Hydrator
 from utils.auth import login_required, admin_required
+from utils.logger import logger
 from werkzeug.exceptions import BadRequest
 from datetime import datetime
 
@@ -16,20 +18,16 @@ base_info_bp = Blueprint('base_info', __name__, url_prefix='/base-info')
 @login_required
 def base_info_main():
     """基础信息主页面，展示模块概览和统计信息"""
-    from models.equipment import Equipment
-    from models.equipment_part import EquipmentPart
-    
-    # 获取统计数据
-    workshop_count = len(EquipmentService.get_all_workshops())
-    equipment_count = Equipment.count_all()
-    online_count = Equipment.count_online()
-    part_count = EquipmentPart.count_all()
-    
+    from services.counter_service import counters
+
+    # 获取统计数据（分组统计并短暂缓存）
+    summary = counters.summary()
+
     return render_template('base_info/base_info_main.html', 
-                          workshop_count=workshop_count,
-                          equipment_count=equipment_count,
-                          online_count=online_count,
-                          part_count=part_count)
+                          workshop_count=summary['workshop_count'],
+                          equipment_count=summary['equipment_count'],
+                          online_count=summary['online_count'],
+                          part_count=summary['part_count'])
 
 
 # ---------------------- 车间管理 ----------------------
@@ -37,14 +35,16 @@ def base_info_main():
 @login_required
 def workshop_list():
     """车间列表（关联设备数量统计，适配表0.2+表0.3）"""
+    from services.counter_service import counters
+
     workshops = EquipmentService.get_all_workshops()
+    # 各车间设备数：一次 GROUP BY 统计
+    equip_counts = counters.equipment_count_by_workshop()
     workshop_data = []
     for ws in workshops:
-        # 调用模型原生方法查询，替代ORM
-        equip_count = len(Equipment.get_by_workshop_id(ws.id))
         workshop_data.append({
             'workshop': ws,
-            'equip_count': equip_count
+            'equip_count': equip_counts.get(ws.id, 0)
         })
     return render_template('base_info/workshop_list_new.html', workshop_data=workshop_data)
 
@@ -161,7 +161,7 @@ def equipment_list():
     workshops = EquipmentService.get_all_workshops()
 
     # 转换为字典格式，便于前端渲染
-    equip_list = [eq.to_dict() for eq in equipments]
+    equip_list = [eq.to_dict() for eq in Hydrator.equipments(equipments)]
 
     # 计算总页数
     total_pages = (total_count + page_size - 1) // page_size
@@ -191,12 +191,14 @@ def equipment_detail(eq_id):
     monitor_points = DataService.get_monitor_points_by_equipment_id(equipment_id=eq_id)
     print(f"设备{eq_id}的监测点列表：{[p.name for p in monitor_points]}")  # 优化打印，便于调试
 
-    latest_data = {}
-    for point in monitor_points:
-        # a = point.to_dict()
-        # print(a)
-        data = DataService.get_latest_data_by_monitor_point(point.id)
-        latest_data[point.id] = data.to_dict() if data else None
+    # 全部监测点的最新值一次从内存取出
+    latest = DataService.get_latest_data_by_equipment(eq_id)
+    # 关联名称按类型批量加载，to_dict() 不再逐条查询
+    Hydrator.monitor_points(monitor_points)
+    Hydrator.parts(parts)
+    Hydrator.equipments([equipment])
+    latest_data = {point.id: latest[point.id].to_dict() if point.id in latest else None
+                   for point in monitor_points}
     return render_template(
         'base_info/equipment_detail.html',
         equipment=equipment.to_dict(),
@@ -206,14 +208,79 @@ def equipment_detail(eq_id):
     )
 
 
+@base_info_bp.route('/api/equipment/tree')
+@login_required
+def equipment_tree():
+    """
+    设备层级JSON：设备 → 部件 → 监测点（名称、正常范围、最新值）
+    - 参数 ids：逗号分隔的设备ID，不传返回全部设备
+    - 响应带 ETag（由基础数据、最新值、心跳表的版本号组成），客户端轮询时携带 If-None-Match，
+      未变化时不查询数据库，直接返回 304（无响应体）
+    """
+    ids = request.args.get('ids', '').strip()
+    try:
+        equipment_ids = [int(i) for i in ids.split(',') if i.strip()] if ids else None
+    except ValueError:
+        return jsonify({'code': 400, 'msg': f'设备ID格式错误：{ids}'}), 400
+
+    # 先取 ETag 再查询：查询期间发生的变化会改变下一次的 ETag，客户端不会一直拿着旧内容
+    etag = EquipmentService.equipment_tree_etag(equipment_ids)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        try:
+            tree = EquipmentService.get_equipment_tree(equipment_ids)
+        except Exception as e:
+            return jsonify({'code': 500, 'msg': f'查询设备层级失败：{str(e)}'}), 500
+        response = jsonify({'code': 200, 'data': tree})
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@base_info_bp.route('/api/provision', methods=['POST'])
+@login_required
+@admin_required
+def provision():
+    """
+    批量导入基础信息：车间 → 设备 → 部件 → 监测点 → 正常值范围
+    - 请求体为 JSON 树形结构，或上传 JSON/CSV 文件（字段 file），格式见 ProvisionService
+    - 参数 dry_run=1 只校验不写入
+    - 整体校验通过才写入（一个事务），否则返回 400 和全部错误
+    """
+    from services.provision_service import ProvisionService
+
+    dry_run = request.args.get('dry_run', '').strip().lower() in ('1', 'true', 'yes')
+    try:
+        if 'file' in request.files and request.files['file'].filename:
+            tree = ProvisionService.read_file(request.files['file'])
+        else:
+            tree = request.get_json(silent=True)
+            if tree is None:
+                return jsonify({'code': 400, 'msg': '请提交JSON数据或上传JSON/CSV文件'}), 400
+        result = ProvisionService.provision(tree, dry_run=dry_run)
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
+    except Exception as e:
+        logger.error(f"批量导入基础信息失败：{str(e)}")
+        return jsonify({'code': 500, 'msg': f'批量导入失败：{str(e)}'}), 500
+
+    if result['errors']:
+        return jsonify({'code': 400, 'msg': f'校验失败：{len(result["errors"])}处错误', 'data': result}), 400
+    return jsonify({'code': 200, 'msg': '校验通过' if dry_run else '导入成功', 'data': result})
+
+
 @base_info_bp.route('/equipment/add', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def equipment_add():
     """新增设备（适配表0.3，纯原生实现）"""
-    workshops = EquipmentService.get_all_workshops()
-    from models.staff import Staff
-    staffs = Staff.get_all()  # 负责人列表（调用模型原生方法）
+    def render_form():
+        # 车间、负责人下拉列表只在显示表单时查询，提交成功直接跳转
+        from models.staff import Staff
+        workshops = EquipmentService.get_all_workshops()
+        staffs = Staff.get_all()  # 负责人列表（调用模型原生方法）
+        return render_template('base_info/equipment_add.html', workshops=workshops, staffs=staffs)
 
     if request.method == 'POST':
         equip_code = request.form.get('equip_code').strip()
@@ -227,7 +294,7 @@ def equipment_add():
         # 校验必填字段
         if not all([equip_code, name, pos_id, person_id, pur_date, first_time]):
             flash('所有带*字段不能为空！', 'error')
-            return render_template('base_info/equipment_add.html', workshops=workshops, staffs=staffs)
+            return render_form()
 
         # 校验日期格式
         try:
@@ -235,12 +302,12 @@ def equipment_add():
             datetime.strptime(first_time, '%Y-%m-%d')
         except ValueError:
             flash('日期格式错误！请使用YYYY-MM-DD格式', 'error')
-            return render_template('base_info/equipment_add.html', workshops=workshops, staffs=staffs)
+            return render_form()
 
         # 校验设备编码唯一
         if Equipment.get_by_equip_code(equip_code):
             flash('设备编码已存在！', 'error')
-            return render_template('base_info/equipment_add.html', workshops=workshops, staffs=staffs)
+            return render_form()
 
         # 新增设备（调用模型add方法）
         try:
@@ -257,9 +324,9 @@ def equipment_add():
             return redirect(url_for('base_info.equipment_list'))
         except Exception as e:
             flash(f'新增失败：{str(e)}', 'error')
-            return render_template('base_info/equipment_add.html', workshops=workshops, staffs=staffs)
+            return render_form()
 
-    return render_template('base_info/equipment_add.html', workshops=workshops, staffs=staffs)
+    return render_form()
 
 
 @base_info_bp.route('/equipment/edit/<int:eq_id>', methods=['GET', 'POST'])
@@ -372,7 +439,7 @@ def part_list():
 
     return render_template(
         'base_info/part_list_new.html',
-        parts=[p.to_dict() for p in parts],
+        parts=[p.to_dict() for p in Hydrator.parts(parts)],
         equipments=equipments,
         selected_equipment=equipment_id,
         page=page,
@@ -389,8 +456,11 @@ def part_list():
 @admin_required
 def part_add():
     """新增部件（适配表0.4）"""
-    # 获取所有设备，不使用分页
-    equipments, _ = Equipment.get_all(page=1, page_size=1000)
+    def render_form():
+        # 设备下拉列表只在显示表单时查询，提交成功直接跳转
+        equipments, _ = Equipment.get_all(page=1, page_size=1000)
+        return render_template('base_info/part_add.html', equipments=equipments)
+
     if request.method == 'POST':
         mid = request.form.get('mid')
         part_name = request.form.get('part_name').strip()
@@ -398,27 +468,24 @@ def part_add():
 
         if not all([mid, part_name]):
             flash('设备和部件名称不能为空！', 'error')
-            return render_template('base_info/part_add.html', equipments=equipments)
+            return render_form()
 
         # 校验同一设备下部件名称唯一
         if EquipmentPart.get_by_equipment_and_name(mid, part_name):
             flash('该设备下已存在同名部件！', 'error')
-            return render_template('base_info/part_add.html', equipments=equipments)
+            return render_form()
 
         # 新增部件（调用模型add方法）
         try:
-            EquipmentPart.add(
-                mid=mid,
-                part_name=part_name,
-                description=description
-            )
+            if not EquipmentPart(mid=mid, part_name=part_name, description=description).add():
+                raise ValueError('写入数据库失败')
             flash('部件新增成功！', 'success')
             return redirect(url_for('base_info.part_list'))
         except Exception as e:
             flash(f'新增失败：{str(e)}', 'error')
-            return render_template('base_info/part_add.html', equipments=equipments)
+            return render_form()
 
-    return render_template('base_info/part_add.html', equipments=equipments)
+    return render_form()
 
 
 @base_info_bp.route('/part/edit/<int:part_id>', methods=['GET', 'POST'])
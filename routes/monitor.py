@@ -1,10 +1,11 @@
 # routes/monitor.py
-from flask import Blueprint, render_template, session, request, jsonify
-from utils.auth import login_required  # 登录权限装饰器
+from flask import Blueprint, render_template, session, request, jsonify, url_for
+from utils.auth import login_required, api_token_required, is_admin  # 登录权限装饰器
 from services.warning_service import WarningService  # 预警服务（原生SQL版）
 from services.equipment_service import EquipmentService  # 设备服务（需确保为原生SQL版）
 from services.workshop_service import WorkshopService  # 新增导入
 import logging
+from datetime import datetime
 from services.data_service import DataService
 # 创建监控蓝图
 monitor_bp = Blueprint('monitor', __name__, url_prefix='/monitor')
@@ -39,17 +40,13 @@ def realtime():
         # 3. 查询所有设备信息（适配原生SQL的EquipmentService，包含分页）
         equipments, equipment_count = EquipmentService.get_all_equipments(page=page, page_size=page_size)
 
-        # 4. 查询待处理预警数量（修复后的WarningService，无ORM依赖）
-        warning_count = len(WarningService.get_all_warnings(msg_state='待处理'))
+        # 4. 查询待处理预警数量（按状态分组的缓存计数，不加载预警明细）
+        warning_count = WarningService.count_warnings(msg_state='待处理')
 
-        # 5. 统计在线/离线设备（假设设备表有Online_State字段）
-        online_count = 0
-        offline_count = 0
-        for eq in equipments:
-            if eq.online_status == '在线':
-                online_count += 1
-            else:
-                offline_count += 1
+        # 5. 统计全部设备的在线/离线数量（在线数取自内存心跳表）
+        from services.counter_service import counters
+        online_count = counters.summary()['online_count']
+        offline_count = max(0, equipment_count - online_count)
 
         # 6. 计算总页数
         total_pages = (equipment_count + page_size - 1) // page_size  # 计算总页数
@@ -164,7 +161,7 @@ def history():
     """
     历史数据页面（适配模板中的 monitor.history 端点）
     - 展示设备历史采集数据、历史预警
-    - 支持分页功能
+    - 在数据库中按 (Mon_Date, ID) 键集分页，翻页传递游标
     """
     try:
         # 1. 获取筛选条件（时间范围、监测点ID）
@@ -172,41 +169,43 @@ def history():
         end_date = request.args.get('end_time', '')
         mon_id = request.args.get('mon_id', '')
         
-        # 2. 获取分页参数
+        # 2. 获取分页参数（键集分页：游标+翻页方向，page仅用于序号显示）
+        cursor = request.args.get('cursor', '')
+        direction = request.args.get('direction', 'next')
         page = request.args.get('page', 1, type=int)
         page_size = 10
 
         # 3. 查询所有监测点（用于筛选下拉框）
         monitors = DataService.get_all_monitor_points()
-        # 4. 查询历史数据（包含分页）
-        history_data = DataService.get_history_data(start_date, end_date, mon_id)
-        
-        # 5. 实现分页逻辑
-        total_count = len(history_data)
-        total_pages = (total_count + page_size - 1) // page_size
-        
-        # 确保页码在有效范围内
-        if page < 1:
+        # 4. 在数据库中分页查询历史数据（只取当前页）
+        history_page = DataService.get_history_page(
+            start_date, end_date, mon_id,
+            cursor=cursor or None,
+            direction=direction,
+            page_size=page_size
+        )
+
+        # 5. 分页信息（总数可能为执行计划预估值）
+        total_count = history_page['total_count']
+        total_pages = max(1, (total_count + page_size - 1) // page_size)
+        if not cursor or not history_page['prev_cursor']:
             page = 1
-        elif page > total_pages:
-            page = total_pages
-        
-        # 计算数据切片范围
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        paginated_data = history_data[start_index:end_index]
+        page = max(1, page)
 
         # 6. 渲染历史数据页面
         return render_template(
             'monitor/history.html',
             monitor_points=monitors,
-            history_data=paginated_data,
+            history_data=history_page['rows'],
             start_date=start_date,
             end_date=end_date,
             selected_mon_id=mon_id,
             current_page=page,
             total_pages=total_pages,
             total_count=total_count,
+            total_is_estimate=history_page['total_is_estimate'],
+            next_cursor=history_page['next_cursor'],
+            prev_cursor=history_page['prev_cursor'],
             page_size=page_size
         )
     except Exception as e:
@@ -217,46 +216,125 @@ def history():
 @login_required
 def export_excel():
     """
-    导出历史数据为Excel文件
+    导出历史数据（流式）
+    - format=xlsx（默认）：只写模式逐行写入临时文件，分块返回
+    - format=csv：边查询边输出，首字节无需等待全部数据
+    数据通过服务端游标分批读取，导出百万行数据内存占用保持恒定
+    生成期间占用请求线程，页面导出使用 /export/jobs 异步任务，此接口保留给脚本调用
     """
     try:
-        import pandas as pd
-        from io import BytesIO
         from datetime import datetime
-        from flask import make_response
+        from flask import Response
         import urllib.parse
-        
+        from services.export_service import ExportService
+
         # 获取筛选条件（与history路由相同）
         start_date = request.args.get('start_time', '')
         end_date = request.args.get('end_time', '')
         mon_id = request.args.get('mon_id', '')
-        
-        # 查询历史数据
-        history_data = DataService.get_history_data(start_date, end_date, mon_id)
-        
-        # 转换为pandas DataFrame
-        df = pd.DataFrame(history_data)
-        
-        # 创建Excel文件
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='历史数据')
-        
-        # 设置响应头
-        output.seek(0)
-        filename = f'历史数据_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        
-        # 创建响应对象
-        response = make_response(output.read())
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        export_format = request.args.get('format', 'xlsx').lower()
+
+        # 历史数据生成器（按块从数据库读取）
+        rows = DataService.iter_history_data(start_date, end_date, mon_id)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        if export_format == 'csv':
+            filename = f'历史数据_{timestamp}.csv'
+            response = Response(ExportService.iter_csv(rows), mimetype='text/csv; charset=utf-8')
+        else:
+            filename = f'历史数据_{timestamp}.xlsx'
+            chunks, size = ExportService.iter_xlsx(rows)
+            response = Response(
+                chunks,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+            response.headers['Content-Length'] = str(size)
+
         # 修复文件名编码问题
         response.headers['Content-Disposition'] = f'attachment; filename*=UTF-8\'\'{urllib.parse.quote(filename)}'
-        
+
         return response
     except Exception as e:
         logger.error(f"导出Excel失败：{str(e)}")
         return jsonify({'code': 500, 'msg': f'导出Excel失败：{str(e)}'})
 
+def _get_export_job(job_id):
+    """读取导出任务并校验权限（提交人或管理员），无权限按不存在处理"""
+    from services.export_job_service import export_jobs
+    job = export_jobs.get(job_id)
+    if job is None:
+        return None
+    if job['owner'] != session.get('username') and not is_admin():
+        return None
+    return job
+
+
+@monitor_bp.route('/export/jobs', methods=['POST'])
+@login_required
+def export_job_submit():
+    """
+    提交异步导出任务，立即返回任务ID
+    - 参数（表单或JSON）：start_time、end_time、mon_id、format（xlsx/csv）
+    - 进度：Socket.IO 发送 join_export(job_id) 后接收 export_progress，或轮询任务状态接口
+    """
+    from services.export_job_service import export_jobs
+
+    params = request.get_json(silent=True) or request.form
+    try:
+        job_id = export_jobs.submit(
+            params.get('start_time', ''),
+            params.get('end_time', ''),
+            params.get('mon_id', ''),
+            export_format=(params.get('format') or 'xlsx').lower(),
+            owner=session.get('username')
+        )
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
+    return jsonify({
+        'code': 200,
+        'job_id': job_id,
+        'status_url': url_for('monitor.export_job_status', job_id=job_id),
+        'download_url': url_for('monitor.export_job_download', job_id=job_id)
+    })
+
+
+@monitor_bp.route('/export/jobs/<job_id>')
+@login_required
+def export_job_status(job_id):
+    """导出任务状态：queued/running/done/failed、已写入行数、总行数"""
+    from services.export_job_service import ExportJobQueue
+    job = _get_export_job(job_id)
+    if job is None:
+        return jsonify({'code': 404, 'msg': '导出任务不存在或已过期'}), 404
+    return jsonify({'code': 200, 'data': ExportJobQueue.to_public(job)})
+
+
+@monitor_bp.route('/export/jobs/<job_id>/download')
+@login_required
+def export_job_download(job_id):
+    """
+    下载已完成的导出文件
+    支持 Range / If-Range 断点续传（send_file conditional），中断后可从已下载位置继续
+    """
+    from flask import send_file
+    from services.export_job_service import EXPORT_FORMATS
+
+    job = _get_export_job(job_id)
+    if job is None:
+        return jsonify({'code': 404, 'msg': '导出任务不存在或已过期'}), 404
+    if job['status'] != 'done':
+        return jsonify({'code': 409, 'msg': f"导出任务尚未完成（{job['status']}）"}), 409
+    return send_file(
+        job['path'],
+        mimetype=EXPORT_FORMATS[job['format']][1],
+        as_attachment=True,
+        download_name=job['filename'],
+        conditional=True,
+        etag=job_id,
+        max_age=0
+    )
+
+
 @monitor_bp.route('/download_template')
 @login_required
 def download_template():
@@ -306,54 +384,122 @@ def download_template():
 @login_required
 def import_excel():
     """
-    导入Excel文件数据
+    导入Excel/CSV文件数据
+    - 监测点名称、采集人按名称各一次查询转换为ID
+    - 时间、数值按列校验，合法行批量写入 Dev_Moni_Data
+    - 返回逐行错误报告
     """
     try:
-        import pandas as pd
-        from datetime import datetime
-        
+        from services.import_service import ImportService
+
         # 检查是否有文件上传
         if 'file' not in request.files:
             return jsonify({'error': '请选择要上传的Excel文件'})
-        
+
         file = request.files['file']
-        
+
         # 检查文件名
         if file.filename == '':
             return jsonify({'error': '请选择要上传的Excel文件'})
-        
-        # 读取Excel文件
-        df = pd.read_excel(file)
-        
-        # 检查必要的列
-        required_columns = ['监测时间', '监测点名称', '传感器类型', '监测值', '单位', '正常范围', '采集人']
-        for col in required_columns:
-            if col not in df.columns:
-                return jsonify({'error': f'Excel文件缺少必要的列：{col}'})
-        
-        # 处理数据（这里仅作示例，实际需要根据数据库结构进行处理）
-        success_count = 0
-        error_count = 0
-        
-        for index, row in df.iterrows():
-            try:
-                # 解析监测时间
-                mon_date = datetime.strptime(str(row['监测时间']), '%Y-%m-%d %H:%M:%S')
-                
-                # 这里需要根据实际数据库结构进行插入操作
-                # 由于没有具体的数据库插入逻辑，这里仅作示例
-                logger.info(f"处理第{index+1}行数据：{row['监测时间']} - {row['监测点名称']} - {row['监测值']}")
-                
-                success_count += 1
-            except Exception as e:
-                logger.error(f"处理第{index+1}行数据失败：{str(e)}")
-                error_count += 1
-        
-        # 返回与前端期望一致的响应格式
+
+        # 读取并导入
+        df = ImportService.read_file(file)
+        result = ImportService.import_dataframe(df)
+
+        # 返回与前端期望一致的响应格式（附带错误明细）
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)})
+    except Exception as e:
+        logger.error(f"导入Excel失败：{str(e)}")
+        return jsonify({'code': 500, 'msg': f'导入Excel失败：{str(e)}'})
+
+
+def _parse_trend_time(value, name):
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    raise ValueError(f'{name}格式错误：{value}')
+
+
+@monitor_bp.route('/api/trend')
+@login_required
+def trend_data():
+    """
+    监测点趋势数据（供图表使用）
+    - 参数：mon_id、start、end，可选 points（最多返回点数）或 resolution（每个点的秒数）
+    - 按所需分辨率自动选择 1分钟/1小时/1天 汇总表，跨度较小时聚合原始数据
+    """
+    try:
+        mon_id = request.args.get('mon_id', '').strip()
+        start_dt = _parse_trend_time(request.args.get('start', ''), '开始时间')
+        end_dt = _parse_trend_time(request.args.get('end', ''), '结束时间')
+        points = request.args.get('points', type=int)
+        resolution = request.args.get('resolution', type=int)
+        data = DataService.get_trend(mon_id, start_dt, end_dt, max_points=points, resolution=resolution)
+        return jsonify({'code': 200, 'data': data})
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
+    except Exception as e:
+        logger.error(f"查询趋势数据失败：{str(e)}")
+        return jsonify({'code': 500, 'msg': f'查询趋势数据失败：{str(e)}'}), 500
+
+
+@monitor_bp.route('/api/analytics')
+@login_required
+def analytics_data():
+    """
+    监测点统计分析（滚动均值/标准差、z-score 离群点、变化率突变、超出正常范围比例）
+    - 参数：mon_id、start、end，可选 window（滚动窗口点数，默认60）、z（离群阈值，默认3）、
+      spike（变化率阈值/秒，默认按数据自动确定）
+    """
+    try:
+        from services.analytics_service import AnalyticsService
+
+        mon_id = request.args.get('mon_id', '').strip()
+        start_dt = _parse_trend_time(request.args.get('start', ''), '开始时间')
+        end_dt = _parse_trend_time(request.args.get('end', ''), '结束时间')
+        if len(request.args.get('end', '')) <= 10:
+            end_dt = end_dt.replace(hour=23, minute=59, second=59)  # 只传日期时包含当天
+        data = AnalyticsService.get_point_stats(
+            mon_id, start_dt, end_dt,
+            window=request.args.get('window', 60, type=int),
+            z_threshold=request.args.get('z', 3.0, type=float),
+            spike_threshold=request.args.get('spike', type=float)
+        )
+        return jsonify({'code': 200, 'data': data})
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
+    except Exception as e:
+        logger.error(f"统计分析失败：{str(e)}")
+        return jsonify({'code': 500, 'msg': f'统计分析失败：{str(e)}'}), 500
+
+
+@monitor_bp.route('/api/readings', methods=['POST'])
+@api_token_required
+def ingest_readings():
+    """
+    批量写入采集数据（供数据网关推送）
+    - Content-Type: application/json，内容为数组或 {"readings": [...]}
+    - Content-Type: application/x-ndjson，每行一条记录
+    - 每条记录：mon_id、mon_date（ISO 8601/时间戳）、value，可选 collector_id
+    - 合法记录在一个事务内写入，返回被拒绝的记录序号及原因
+    """
+    try:
+        from services.ingest_service import IngestService
+
+        readings, parse_rejects = IngestService.parse_payload(request.get_data(), request.content_type)
+        result = IngestService.ingest(readings, parse_rejects)
         return jsonify({
-            'success': success_count,
-            'skipped': error_count
+            'code': 200,
+            'msg': f"写入{result['accepted']}条，拒绝{len(result['rejected'])}条",
+            'accepted': result['accepted'],
+            'rejected': result['rejected']
         })
+    except ValueError as e:
+        return jsonify({'code': 400, 'msg': str(e)}), 400
     except Exception as e:
-        logger.error(f"导入Excel失败：{str(e)}")
-        return jsonify({'code': 500, 'msg': f'导入Excel失败：{str(e)}'})
\ No newline at end of file
+        logger.error(f"批量写入采集数据失败：{str(e)}")
+        return jsonify({'code': 500, 'msg': f'批量写入失败：{str(e)}'}), 500
@@ -7,6 +7,10 @@ from models.early_warning import EarlyWarning
 from models.workshop import Workshop
 from models.equipment import Equipment
 import hashlib
+from utils.cache import get_cache_stats
+from utils.db import get_pool_stats
+from utils.logger import logger
+from services.counter_service import counters
 
 # 创建蓝图
 system_bp = Blueprint('system', __name__, url_prefix='/system')
@@ -75,32 +79,26 @@ def log_list():
 @admin_required
 def dashboard():
     """系统概览仪表盘"""
-    # 统计数据
-    user_count = User.query.count()
-    workshop_count = Workshop.query.count()
-    equipment_count = Equipment.query.count()
-    online_equip_count = len(Equipment.query.filter_by(Online_Status='在线').all())
-    warning_count = EarlyWarning.query.count()
-    pending_warning_count = len(EarlyWarning.query.filter_by(Msg_State='待处理').all())
+    # 统计数据（分组统计并短暂缓存，见 services/counter_service.py）
+    summary = counters.summary()
+    equipment_count = summary['equipment_count']
+    online_equip_count = summary['online_count']
+    warnings_by_state = summary['warnings_by_state']
 
     # 设备在线率
     online_rate = (online_equip_count / equipment_count * 100) if equipment_count > 0 else 0
 
-    # 预警状态统计
-    processing_warning_count = len(EarlyWarning.query.filter_by(Msg_State='处理中').all())
-    done_warning_count = len(EarlyWarning.query.filter_by(Msg_State='已处理').all())
-
     return render_template(
         'system/dashboard.html',
-        user_count=user_count,
-        workshop_count=workshop_count,
+        user_count=summary['user_count'],
+        workshop_count=summary['workshop_count'],
         equipment_count=equipment_count,
         online_equip_count=online_equip_count,
         online_rate=f'{online_rate:.1f}%',
-        warning_count=warning_count,
-        pending_warning_count=pending_warning_count,
-        processing_warning_count=processing_warning_count,
-        done_warning_count=done_warning_count
+        warning_count=summary['warning_count'],
+        pending_warning_count=warnings_by_state.get('待处理', 0),
+        processing_warning_count=warnings_by_state.get('处理中', 0),
+        done_warning_count=warnings_by_state.get('已处理', 0)
     )
 
 
@@ -265,4 +263,42 @@ def check_username():
         return jsonify({'exists': user is not None})
     except Exception as e:
         print(f"检查用户名失败：{str(e)}")
-        return jsonify({'exists': False})
\ No newline at end of file
+        return jsonify({'exists': False})
+
+
+@system_bp.route('/jobs')
+@login_required
+@admin_required
+def jobs():
+    """定时任务运行指标：执行/失败/跳过次数、上次耗时、启动延迟、下次执行时间"""
+    from utils.scheduler import job_scheduler
+    return jsonify({'code': 200, 'data': job_scheduler.stats()})
+
+
+@system_bp.route('/jobs/<name>/run', methods=['POST'])
+@login_required
+@admin_required
+def run_job(name):
+    """立即执行一次定时任务（上次执行未结束时跳过）"""
+    from utils.scheduler import job_scheduler
+    if not job_scheduler.run_now(name):
+        return jsonify({'code': 404, 'msg': f'定时任务不存在：{name}'}), 404
+    logger.info(f"管理员 {session.get('username')} 手动执行定时任务：{name}")
+    return jsonify({'code': 200, 'msg': '已提交执行'})
+
+
+@system_bp.route('/runtime-stats')
+@login_required
+@admin_required
+def runtime_stats():
+    """运行指标：基础数据缓存命中/未命中、数据库连接池使用情况、监测点最新值、查询统计、ID分配"""
+    from services.latest_service import latest_store
+    from utils import profiler
+    from utils.id_allocator import id_allocator
+    return jsonify({
+        'reference_cache': get_cache_stats(),
+        'db_pool': get_pool_stats(),
+        'latest_values': latest_store.stats(),
+        'profiling': profiler.stats(),
+        'id_allocator': id_allocator.stats()
+    })
@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, session, redirect, url_for, flash
 from services.warning_service import WarningService
-from utils.auth import login_required
+from utils.auth import login_required, is_admin
 from datetime import datetime
 from models.early_warning import EarlyWarning
 from models.staff import Staff
@@ -13,29 +13,44 @@ warning_bp = Blueprint('warning', __name__, url_prefix='/warning')
 @warning_bp.route('/list')
 @login_required
 def warning_list():
-    """预警信息列表"""
+    """
+    预警信息列表
+    - 在数据库中按 (Happen_Time, ID) 键集分页，翻页传递游标；监测点、处理人名称由 JOIN 取回
+    - 各状态数量一次 GROUP BY Msg_State 统计（无筛选条件时读取缓存计数）
+    """
     # 获取筛选参数
     msg_state = request.args.get('msg_state')
     start_time = request.args.get('start_time')
     end_time = request.args.get('end_time')
 
+    # 分页参数（键集分页：游标+翻页方向，page仅用于序号显示）
+    cursor = request.args.get('cursor', '')
+    direction = request.args.get('direction', 'next')
+    page = request.args.get('page', 1, type=int)
+    page_size = 20
+
     # 时间处理
     start_date = datetime.strptime(start_time, '%Y-%m-%d') if start_time else None
     end_date = datetime.strptime(end_time, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if end_time else None
 
-    # 查询预警数据
-    warnings = WarningService.get_all_warnings(
+    # 查询当前页预警
+    warning_page = WarningService.get_warning_page(
         msg_state=msg_state,
         start_time=start_date,
-        end_time=end_date
+        end_time=end_date,
+        cursor=cursor or None,
+        direction=direction,
+        page_size=page_size
     )
-    warning_list = [warn.to_dict() for warn in warnings]
+    warning_list = [warn.to_dict() for warn in warning_page['warnings']]
 
     # 统计各状态预警数
-    total_count = len(warning_list)
-    pending_count = len([w for w in warning_list if w['msg_state'] == '待处理'])
-    processing_count = len([w for w in warning_list if w['msg_state'] == '处理中'])
-    done_count = len([w for w in warning_list if w['msg_state'] == '已处理'])
+    state_counts = WarningService.count_by_state(msg_state, start_date, end_date)
+    total_count = sum(state_counts.values())
+    total_pages = max(1, (total_count + page_size - 1) // page_size)
+    if not cursor or not warning_page['prev_cursor']:
+        page = 1
+    page = max(1, page)
 
     return render_template(
         'warning/warning_list.html',
@@ -44,9 +59,13 @@ def warning_list():
         selected_start=start_time,
         selected_end=end_time,
         total_count=total_count,
-        pending_count=pending_count,
-        processing_count=processing_count,
-        done_count=done_count
+        pending_count=state_counts.get('待处理', 0),
+        processing_count=state_counts.get('处理中', 0),
+        done_count=state_counts.get('已处理', 0),
+        current_page=page,
+        total_pages=total_pages,
+        next_cursor=warning_page['next_cursor'],
+        prev_cursor=warning_page['prev_cursor']
     )
 
 
@@ -88,18 +107,12 @@ def warning_handle(warn_id):
 
         if not handle_note:
             flash('处理备注不能为空！', 'error')
-            # 获取所有人员列表
-            staff_list = Staff.get_all_staff()
-            staff_dict = [{'ID': staff.id, 'Staff_Name': staff.name} for staff in staff_list]
             return render_template('warning/warning_handle.html', warning=warning.to_dict(), staff_list=staff_dict)
 
         handler_id = request.form.get('handler')  # 使用正确的表单字段名
         print(handler_id)
         if not handler_id:
             flash('请选择处理人！', 'error')
-            # 获取所有人员列表
-            staff_list = Staff.get_all_staff()
-            staff_dict = [{'ID': staff.id, 'Staff_Name': staff.name} for staff in staff_list]
             return render_template('warning/warning_handle.html', warning=warning.to_dict(), staff_list=staff_dict)
 
         try:
@@ -117,21 +130,11 @@ def warning_handle(warn_id):
                 return redirect(url_for('warning.warning_list'))
             else:
                 flash('处理失败：更新预警状态失败', 'error')
-            # 获取所有人员列表
-            staff_list = Staff.get_all_staff()
-            staff_dict = [{'ID': staff.id, 'Staff_Name': staff.name} for staff in staff_list]
             return render_template('warning/warning_handle.html', warning=warning.to_dict(), staff_list=staff_dict)
         except Exception as e:
             flash(f'处理失败：{str(e)}', 'error')
-            # 获取所有人员列表
-            staff_list = Staff.get_all_staff()
-            staff_dict = [{'ID': staff.id, 'Staff_Name': staff.name} for staff in staff_list]
             return render_template('warning/warning_handle.html', warning=warning.to_dict(), staff_list=staff_dict)
 
-    # 获取所有人员列表
-    staff_list = Staff.get_all_staff()
-    staff_dict = [{'ID': staff.id, 'Staff_Name': staff.name} for staff in staff_list]
-    
     return render_template('warning/warning_handle.html', warning=warning.to_dict(), staff_list=staff_dict)
 
 
@@ -139,7 +142,7 @@ def warning_handle(warn_id):
 @login_required
 def warning_cancel(warn_id):
     """取消预警（仅管理员可操作）"""
-    if not session.get('is_admin'):
+    if not is_admin():
         flash('权限不足！', 'error')
         return redirect(url_for('warning.warning_list'))
 
@@ -153,6 +156,8 @@ def warning_cancel(warn_id):
                 flash('预警不存在！', 'error')
                 return redirect(url_for('warning.warning_list'))
             conn.commit()
+            from services.counter_service import counters
+            counters.invalidate()
             flash('预警取消成功！', 'success')
             return redirect(url_for('warning.warning_list'))
         finally:
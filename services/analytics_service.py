@@ -0,0 +1,212 @@
+# services/analytics_service.py
+from datetime import datetime, timedelta
+import numpy as np
+from utils.db import get_db_connection
+from utils.logger import logger
+
+# 返回给前端的异常事件、曲线点数上限
+MAX_EVENTS = 100
+MAX_SERIES_POINTS = 500
+_EPOCH = datetime(1970, 1, 1)
+
+
+def rolling_mean_std(values, window):
+    """
+    尾随窗口（含当前点的前 window 个点）的滚动均值和标准差，累加和实现，O(n)
+    窗口未填满的前 window-1 个点按已有的点计算
+    """
+    n = values.size
+    if n == 0:
+        return np.empty(0), np.empty(0)
+    # 减去整体均值后再累加，避免平方和相减时精度损失
+    offset = values.mean()
+    centered = values - offset
+    csum = np.concatenate(([0.0], np.cumsum(centered)))
+    csum2 = np.concatenate(([0.0], np.cumsum(centered * centered)))
+    idx = np.arange(1, n + 1)
+    start = np.maximum(idx - window, 0)
+    counts = idx - start
+    sums = csum[idx] - csum[start]
+    sums2 = csum2[idx] - csum2[start]
+    mean = sums / counts
+    var = np.maximum(sums2 / counts - mean * mean, 0.0)
+    return mean + offset, np.sqrt(var)
+
+
+def _format_epoch(seconds):
+    return (_EPOCH + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _downsample(times, *series, max_points=MAX_SERIES_POINTS):
+    """按等长分段取每段最后一个点，曲线点数不超过 max_points"""
+    n = times.size
+    if n <= max_points:
+        return (times,) + series
+    picks = np.linspace(0, n - 1, max_points).astype(np.int64)
+    return (times[picks],) + tuple(s[picks] for s in series)
+
+
+class AnalyticsService:
+    """
+    监测点历史数据统计分析（NumPy 向量化）
+    - load_window() 用 array_agg 把时间窗口内的数据聚合成一行两个 float8 数组取回，
+      不逐行构造元组（eventlet 等待回调下不能用 COPY，该方式在 Web 进程内同样适用）
+    - analyze() 计算滚动均值/标准差、z-score 离群点、变化率突变、超出正常范围的比例，
+      全部为数组运算，不逐行循环
+    """
+
+    @staticmethod
+    def load_window(mon_id, start_dt, end_dt):
+        """
+        读取监测点在 [start_dt, end_dt] 内的数据（含冷数据归档），按采集时间升序
+        :return: (times, values) - Unix时间戳秒数、采集值，均为 float64 数组
+        """
+        from services.archive_service import cold_archive
+
+        archived_times, archived_values = cold_archive.read_values(mon_id, start_dt, end_dt)
+        times, values = AnalyticsService._load_live_window(mon_id, start_dt, end_dt)
+        if archived_times.size == 0:
+            return times, values
+        times = np.concatenate((archived_times, times))
+        values = np.concatenate((archived_values, values))
+        order = np.argsort(times, kind='stable')
+        return times[order], values[order]
+
+    @staticmethod
+    def _load_live_window(mon_id, start_dt, end_dt):
+        """Dev_Moni_Data 中的数据：一条查询返回一行（时间数组, 值数组），驱动直接解析为 float 列表"""
+        sql = """
+            SELECT array_agg(extract(epoch FROM Mon_Date)::float8 ORDER BY Mon_Date, ID),
+                   array_agg(Mon_value::float8 ORDER BY Mon_Date, ID)
+            FROM DEV.Dev_Moni_Data
+            WHERE Mon_ID = ? AND Mon_Date >= ? AND Mon_Date <= ?
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, (mon_id, start_dt, end_dt))
+            times, values = cursor.fetchone()
+        finally:
+            cursor.close()
+            conn.close()
+        if not times:
+            return np.empty(0), np.empty(0)
+        return np.array(times, dtype=np.float64), np.array(values, dtype=np.float64)
+
+    @staticmethod
+    def analyze(times, values, window=60, z_threshold=3.0, spike_threshold=None,
+                min_val=None, max_val=None):
+        """
+        向量化统计
+        :param window: 滚动窗口点数
+        :param z_threshold: |z| 超过该值视为离群点（z 按前一窗口的均值/标准差计算）
+        :param spike_threshold: 变化率（每秒）绝对值超过该值视为突变；None 时取 中位数 + 6×MAD
+                                （MAD 为 0 时即中位数：平稳序列中任何超过多数点变化率的跳变都算突变）
+        :param min_val/max_val: 正常范围，None 表示未配置
+        """
+        n = values.size
+        result = {'count': int(n)}
+        if n == 0:
+            return result
+
+        window = max(2, int(window))
+        mean, std = rolling_mean_std(values, window)
+        # 与前一个点为止的窗口比较，当前点不参与自己的基准
+        base_mean = np.concatenate(([mean[0]], mean[:-1]))
+        base_std = np.concatenate(([std[0]], std[:-1]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = np.where(base_std > 0, (values - base_mean) / base_std, 0.0)
+        z[:min(window, n)] = 0.0  # 窗口未填满时不判定
+        outliers = np.flatnonzero(np.abs(z) > z_threshold)
+
+        spikes = np.empty(0, dtype=np.int64)
+        rate = np.empty(0)
+        if n > 1:
+            dt = np.diff(times)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rate = np.where(dt > 0, np.diff(values) / dt, 0.0)
+            abs_rate = np.abs(rate)
+            if spike_threshold is None:
+                median = np.median(abs_rate)
+                mad = np.median(np.abs(abs_rate - median))
+                spike_threshold = float(median + 6 * mad)
+            if spike_threshold is not None:
+                spikes = np.flatnonzero(abs_rate > spike_threshold) + 1  # 突变归到后一个点
+
+        out_of_range = None
+        if min_val is not None and max_val is not None:
+            mask = (values < float(min_val)) | (values > float(max_val))
+            out_of_range = {
+                'count': int(mask.sum()),
+                'percent': round(float(mask.mean() * 100), 4),
+                'min_val': float(min_val),
+                'max_val': float(max_val)
+            }
+
+        p = np.percentile(values, [5, 50, 95])
+        result.update({
+            'start': float(times[0]),
+            'end': float(times[-1]),
+            'mean': round(float(values.mean()), 4),
+            'std': round(float(values.std()), 4),
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'p5': round(float(p[0]), 4),
+            'p50': round(float(p[1]), 4),
+            'p95': round(float(p[2]), 4),
+            'window': window,
+            'z_threshold': z_threshold,
+            'outlier_count': int(outliers.size),
+            'spike_threshold': spike_threshold,
+            'spike_count': int(spikes.size),
+            'out_of_range': out_of_range
+        })
+
+        # 偏离最大的前 MAX_EVENTS 个离群点/突变
+        top_outliers = outliers[np.argsort(-np.abs(z[outliers]))[:MAX_EVENTS]] if outliers.size else outliers
+        top_spikes = spikes[np.argsort(-np.abs(rate[spikes - 1]))[:MAX_EVENTS]] if spikes.size else spikes
+        result['outliers'] = [
+            {'time': float(times[i]), 'value': float(values[i]), 'z': round(float(z[i]), 3)}
+            for i in np.sort(top_outliers)
+        ]
+        result['spikes'] = [
+            {'time': float(times[i]), 'value': float(values[i]), 'rate': round(float(rate[i - 1]), 4)}
+            for i in np.sort(top_spikes)
+        ]
+
+        t, v, m, s = _downsample(times, values, mean, std)
+        result['series'] = {
+            'time': t.tolist(),
+            'value': v.tolist(),
+            'rolling_mean': np.round(m, 4).tolist(),
+            'rolling_std': np.round(s, 4).tolist()
+        }
+        return result
+
+    @staticmethod
+    def get_point_stats(mon_id, start_dt, end_dt, window=60, z_threshold=3.0, spike_threshold=None):
+        """读取监测点窗口数据并统计，正常范围取自 Dev_Normal_Val"""
+        from models.normal_range import NormalRange
+
+        if not mon_id:
+            raise ValueError('监测点不能为空')
+        if end_dt <= start_dt:
+            raise ValueError('结束时间必须晚于开始时间')
+        times, values = AnalyticsService.load_window(mon_id, start_dt, end_dt)
+        normal_range = NormalRange.get_by_monitor_id(mon_id)
+        result = AnalyticsService.analyze(
+            times, values,
+            window=window,
+            z_threshold=z_threshold,
+            spike_threshold=spike_threshold,
+            min_val=normal_range.min_val if normal_range else None,
+            max_val=normal_range.max_val if normal_range else None
+        )
+        # 采集时间为不带时区的本地时间，epoch 按 UTC 换算回原值显示
+        if result['count']:
+            result['start'] = _format_epoch(result['start'])
+            result['end'] = _format_epoch(result['end'])
+            for event in result['outliers'] + result['spikes']:
+                event['time'] = _format_epoch(event['time'])
+        logger.debug(f"监测点{mon_id}统计分析完成：{result['count']}条数据")
+        return result
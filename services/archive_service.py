@@ -0,0 +1,379 @@
+# services/archive_service.py
+import heapq
+import io
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from utils.db import get_db_connection, copy_supported
+from utils.logger import logger
+from config import ARCHIVE_CONFIG
+
+# 归档文件的列（与 Dev_Moni_Data 相同），行格式 (ID, Mon_Date, Mon_ID, Mon_value, Collector_ID)
+ARCHIVE_COLUMNS = ['ID', 'Mon_Date', 'Mon_ID', 'Mon_value', 'Collector_ID']
+# 归档文件的行组大小：按时间倒序读取时以行组为单位，行组越小一页查询读入的数据越少
+ROW_GROUP_SIZE = 8192
+# 每次转换为 Python 对象的行数：分页只取到凑够一页为止
+BATCH_ROWS = 1024
+# 各月份各监测点的归档行数（archive() 写入），count() 不必逐个打开文件
+MANIFEST_NAME = 'manifest.json'
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def _next_month(month):
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('ID', pa.int64()),
+        ('Mon_Date', pa.timestamp('us')),
+        ('Mon_ID', pa.int64()),
+        ('Mon_value', pa.decimal128(10, 4)),
+        ('Collector_ID', pa.int64())
+    ])
+
+
+class ColdArchive:
+    """
+    冷数据归档（Parquet 列式文件）
+    - archive() 把早于 older_than_days 天的 Dev_Moni_Data 记录移入 <目录>/<YYYYMM>/<监测点ID>.parquet，
+      每个监测点每月一个文件，按 (Mon_Date, ID) 升序，zstd 压缩
+    - 移动以「监测点 + 月」为单位：一个事务内 DELETE ... RETURNING 取出记录，与已有文件合并后写入 .part 文件，
+      改名完成后才提交删除；中途失败时记录仍在数据库中，重新执行时按ID去重
+    - iter_rows()/count() 供历史查询、导出读取：内存映射方式打开文件，按行组读取（行组统计信息不在时间范围内的跳过），
+      每次只转换 BATCH_ROWS 行；同月多个文件按 (Mon_Date, ID) 归并，分页查询只读到凑够一页为止
+    - 归档数据都早于 archived_until()，更新的查询范围不读取归档；整月的记录数取自 manifest.json
+    未配置 older_than_days 时不归档；没有归档文件时读取方法不访问磁盘以外的任何资源，也不导入 pyarrow
+    """
+
+    def __init__(self, root='archive', older_than_days=None, compression='zstd'):
+        self.root = os.path.abspath(root)
+        self.older_than_days = older_than_days
+        self.compression = compression
+        self._write_lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._manifest = None  # (文件修改时间, {YYYYMM: {监测点ID: 行数}})
+
+    # ---------- 文件布局 ----------
+    def path(self, month, mon_id):
+        return os.path.join(self.root, month.strftime('%Y%m'), f'{int(mon_id)}.parquet')
+
+    def months(self):
+        """已有归档的月份（升序）"""
+        if not os.path.isdir(self.root):
+            return []
+        months = []
+        for name in os.listdir(self.root):
+            if len(name) == 6 and name.isdigit() and os.path.isdir(os.path.join(self.root, name)):
+                months.append(datetime(int(name[:4]), int(name[4:]), 1))
+        return sorted(months)
+
+    def _files(self, month, mon_id=None):
+        if mon_id is not None and str(mon_id).strip() != '':
+            path = self.path(month, mon_id)
+            return [path] if os.path.isfile(path) else []
+        directory = os.path.join(self.root, month.strftime('%Y%m'))
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.endswith('.parquet'))
+
+    def archived_until(self):
+        """归档数据的时间上界（最新归档月份的月末，不含），没有归档时返回 None"""
+        months = self.months()
+        return _next_month(months[-1]) if months else None
+
+    def _overlapping_months(self, start_dt, end_dt):
+        return [m for m in self.months()
+                if (end_dt is None or m <= end_dt) and (start_dt is None or _next_month(m) > start_dt)]
+
+    # ---------- 清单 ----------
+    def _manifest_path(self):
+        return os.path.join(self.root, MANIFEST_NAME)
+
+    def _read_manifest(self):
+        """{YYYYMM: {监测点ID字符串: 行数}}，文件未变化时使用内存中的副本"""
+        path = self._manifest_path()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return {}
+        with self._manifest_lock:
+            if self._manifest is not None and self._manifest[0] == mtime:
+                return self._manifest[1]
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"归档清单读取失败，改为读取文件元数据：{str(e)}")
+            return {}
+        with self._manifest_lock:
+            self._manifest = (mtime, manifest)
+        return manifest
+
+    def _update_manifest(self, month, mon_id, rows):
+        """记录一个归档文件的行数（写入临时文件后改名，由 archive() 在写锁内调用）"""
+        manifest = {key: dict(value) for key, value in self._read_manifest().items()}
+        manifest.setdefault(month.strftime('%Y%m'), {})[str(int(mon_id))] = rows
+        path = self._manifest_path()
+        with open(path + '.part', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(path + '.part', path)
+
+    # ---------- 读取 ----------
+    @staticmethod
+    def _read_file(path, start_dt, end_dt, columns):
+        """内存映射读取单个文件，只读 columns 列，Mon_Date 条件下推到行组统计信息"""
+        import pyarrow.parquet as pq
+
+        filters = []
+        if start_dt is not None:
+            filters.append(('Mon_Date', '>=', start_dt))
+        if end_dt is not None:
+            filters.append(('Mon_Date', '<=', end_dt))
+        return pq.read_table(path, columns=columns, filters=filters or None, memory_map=True)
+
+    @staticmethod
+    def _filter(table, start_dt, end_dt, key, descending):
+        """时间范围和键集位置过滤（一个行组）"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        dates, ids = table['Mon_Date'], table['ID']
+        masks = []
+        if start_dt is not None:
+            masks.append(pc.greater_equal(dates, pa.scalar(start_dt, type=pa.timestamp('us'))))
+        if end_dt is not None:
+            masks.append(pc.less_equal(dates, pa.scalar(end_dt, type=pa.timestamp('us'))))
+        if key is not None:
+            key_date = pa.scalar(key[0], type=pa.timestamp('us'))
+            if descending:
+                masks.append(pc.or_(pc.less(dates, key_date),
+                                    pc.and_(pc.equal(dates, key_date), pc.less(ids, key[1]))))
+            else:
+                masks.append(pc.or_(pc.greater(dates, key_date),
+                                    pc.and_(pc.equal(dates, key_date), pc.greater(ids, key[1]))))
+        if not masks:
+            return table
+        mask = masks[0]
+        for other in masks[1:]:
+            mask = pc.and_(mask, other)
+        return table.filter(mask)
+
+    def _iter_file(self, path, start_dt, end_dt, key, descending):
+        """
+        单个文件（已按 (Mon_Date, ID) 升序）按顺序产出记录：逐个行组读取，倒序时从最后一个行组开始；
+        行组统计信息不在时间范围内的不读取，每次只把 BATCH_ROWS 行转换为 Python 对象
+        """
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path, memory_map=True)
+        date_index = parquet.schema_arrow.get_field_index('Mon_Date')
+        groups = range(parquet.num_row_groups)
+        for group in (reversed(groups) if descending else groups):
+            statistics = parquet.metadata.row_group(group).column(date_index).statistics
+            if statistics is not None and statistics.has_min_max:
+                if start_dt is not None and statistics.max < start_dt:
+                    if descending:
+                        break  # 更早的行组都在范围之前
+                    continue
+                if end_dt is not None and statistics.min > end_dt:
+                    if descending:
+                        continue
+                    break
+            table = self._filter(parquet.read_row_group(group, columns=ARCHIVE_COLUMNS),
+                                 start_dt, end_dt, key, descending)
+            offsets = range(0, table.num_rows, BATCH_ROWS)
+            for offset in (reversed(offsets) if descending else offsets):
+                batch = table.slice(offset, BATCH_ROWS)
+                rows = list(zip(*(batch[name].to_pylist() for name in ARCHIVE_COLUMNS)))
+                if descending:
+                    rows.reverse()
+                yield from rows
+
+    def _iter_month(self, month, start_dt, end_dt, mon_id, key, descending):
+        """一个月份的归档记录：多个监测点文件按 (Mon_Date, ID) 归并"""
+        files = [self._iter_file(path, start_dt, end_dt, key, descending)
+                 for path in self._files(month, mon_id)]
+        if len(files) == 1:
+            return files[0]
+        return heapq.merge(*files, key=lambda r: (r[1], r[0]), reverse=descending)
+
+    def iter_rows(self, start_dt=None, end_dt=None, mon_id=None, key=None, descending=True):
+        """
+        按 (Mon_Date, ID) 顺序产出归档记录 (ID, Mon_Date, Mon_ID, Mon_value, Collector_ID)
+        :param key: 键集分页位置 (Mon_Date, ID)，只产出其后（descending 时为更早）的记录
+        """
+        if key is not None:
+            if descending:
+                end_dt = key[0] if end_dt is None else min(end_dt, key[0])
+            else:
+                start_dt = key[0] if start_dt is None else max(start_dt, key[0])
+        months = self._overlapping_months(start_dt, end_dt)
+        if descending:
+            months.reverse()
+        # 各月份时间不重叠，逐月读取即为整体有序
+        for month in months:
+            yield from self._iter_month(month, start_dt, end_dt, mon_id, key, descending)
+
+    def count(self, start_dt=None, end_dt=None, mon_id=None):
+        """
+        符合条件的归档记录数：整月都在范围内的文件取 manifest.json 中的行数（清单中没有的读文件元数据），
+        只有范围两端的月份需要读取 Mon_Date 列
+        """
+        total = 0
+        manifest = None
+        for month in self._overlapping_months(start_dt, end_dt):
+            import pyarrow.parquet as pq  # 有归档文件时才导入
+            whole_month = ((start_dt is None or start_dt <= month) and
+                           (end_dt is None or end_dt >= _next_month(month) - timedelta(microseconds=1)))
+            if whole_month and manifest is None:
+                manifest = self._read_manifest()
+            for path in self._files(month, mon_id):
+                if whole_month:
+                    rows = manifest.get(month.strftime('%Y%m'), {}).get(os.path.basename(path)[:-len('.parquet')])
+                    total += rows if rows is not None else pq.ParquetFile(path, memory_map=True).metadata.num_rows
+                else:
+                    total += self._read_file(path, start_dt, end_dt, ['Mon_Date']).num_rows
+        return total
+
+    def read_values(self, mon_id, start_dt, end_dt):
+        """单个监测点的 (Unix时间戳秒数, 采集值) float64 数组，按时间升序（统计分析用）"""
+        import numpy as np
+
+        paths = [path for month in self._overlapping_months(start_dt, end_dt)
+                 for path in self._files(month, mon_id)]
+        if not paths:
+            return np.empty(0), np.empty(0)
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        tables = [self._read_file(path, start_dt, end_dt, ['ID', 'Mon_Date', 'Mon_value']) for path in paths]
+        tables = [t for t in tables if t.num_rows]
+        if not tables:
+            return np.empty(0), np.empty(0)
+        table = pa.concat_tables(tables).sort_by([('Mon_Date', 'ascending'), ('ID', 'ascending')])
+        times = pc.cast(table['Mon_Date'], pa.int64()).to_numpy() / 1e6
+        values = pc.cast(table['Mon_value'], pa.float64()).to_numpy()
+        return times, values
+
+    # ---------- 归档 ----------
+    @staticmethod
+    def _delete_returning(cursor, mon_id, month, end, schema):
+        """删除 [month, end) 内的记录并以 Arrow 表返回（事务由调用方提交），无记录返回 None"""
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        sql = ("DELETE FROM DEV.Dev_Moni_Data WHERE Mon_ID = ? AND Mon_Date >= ? AND Mon_Date < ? "
+               "RETURNING ID, Mon_Date, Mon_ID, Mon_value, Collector_ID")
+        if not copy_supported():
+            # 启用 eventlet 等待回调后不支持 COPY，直接取回元组
+            cursor.execute(sql, (mon_id, month, end))
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+            return pa.Table.from_arrays([pa.array(col, type=schema.field(i).type)
+                                         for i, col in enumerate(zip(*rows))], schema=schema)
+
+        query = cursor.mogrify(sql, (mon_id, month, end))
+        if isinstance(query, bytes):
+            query = query.decode('utf-8')
+        buffer = io.BytesIO()
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv)", buffer)
+        if buffer.tell() == 0:
+            return None
+        buffer.seek(0)
+        return pa_csv.read_csv(
+            buffer,
+            read_options=pa_csv.ReadOptions(column_names=ARCHIVE_COLUMNS),
+            convert_options=pa_csv.ConvertOptions(column_types=schema)
+        ).cast(schema)
+
+    def _move_group(self, mon_id, month, end):
+        """把一个监测点在 [month, end) 内的记录移入归档文件，返回移动的行数"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        schema = _schema()
+        path = self.path(month, mon_id)
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            moved = self._delete_returning(cursor, mon_id, month, end, schema)
+            if moved is None:
+                conn.rollback()
+                return 0
+
+            table = moved
+            if os.path.isfile(path):
+                existing = pq.read_table(path, memory_map=True).cast(schema)
+                # 上次归档写完文件但删除未提交时，记录会同时在两边
+                table = pa.concat_tables([existing, moved.filter(pc.invert(pc.is_in(moved['ID'], existing['ID'])))])
+            table = table.sort_by([('Mon_Date', 'ascending'), ('ID', 'ascending')])
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            part_path = path + '.part'
+            pq.write_table(table, part_path, compression=self.compression, row_group_size=ROW_GROUP_SIZE)
+            os.replace(part_path, path)
+            self._update_manifest(month, mon_id, table.num_rows)
+            conn.commit()
+            return moved.num_rows
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    def archive(self, now=None):
+        """
+        定时任务：把早于 older_than_days 天的原始采集数据移入归档文件
+        :return: dict - cutoff（截止时间）、groups（处理的 监测点+月 数）、rows（移动的行数）
+        """
+        if not self.older_than_days:
+            return {'cutoff': None, 'groups': 0, 'rows': 0}
+        now = now or datetime.now()
+        cutoff = datetime(now.year, now.month, now.day) - timedelta(days=self.older_than_days)
+
+        with self._write_lock:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT DISTINCT Mon_ID, date_trunc('month', Mon_Date) FROM DEV.Dev_Moni_Data "
+                    "WHERE Mon_Date < ? ORDER BY 2, 1",
+                    (cutoff,)
+                )
+                groups = cursor.fetchall()
+            finally:
+                cursor.close()
+                conn.close()
+
+            rows = 0
+            for mon_id, month in groups:
+                try:
+                    rows += self._move_group(mon_id, month, min(cutoff, _next_month(month)))
+                except Exception as e:
+                    logger.error(f"归档监测点{mon_id} {month:%Y-%m} 数据失败：{str(e)}")
+        logger.info(f"冷数据归档完成：早于{cutoff:%Y-%m-%d}，{len(groups)}组，{rows}条")
+        return {'cutoff': cutoff, 'groups': len(groups), 'rows': rows}
+
+    def stats(self):
+        """各月份归档文件数和字节数 [(月份, 文件数, 字节数)]"""
+        result = []
+        for month in self.months():
+            files = self._files(month)
+            result.append((month.strftime('%Y-%m'), len(files), sum(os.path.getsize(p) for p in files)))
+        return result
+
+
+# 全局冷数据归档（进程内单例）
+cold_archive = ColdArchive(
+    root=ARCHIVE_CONFIG['dir'],
+    older_than_days=ARCHIVE_CONFIG['older_than_days'],
+    compression=ARCHIVE_CONFIG['compression']
+)
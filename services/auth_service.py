@@ -4,6 +4,8 @@ from models.staff import Staff
 from utils.logger import logger
 from werkzeug.exceptions import BadRequest
 from utils.db import get_db_connection
+from utils.id_allocator import id_allocator
+from utils.cache import invalidate
 
 
 class AuthService:
@@ -41,10 +43,8 @@ class AuthService:
         conn = get_db_connection()
         cursor = conn.cursor()
         try:
-            # 获取当前最大职工ID，为新记录生成ID
-            cursor.execute("SELECT MAX(ID) FROM DEV.Dev_Person")
-            max_id = cursor.fetchone()[0]
-            person_id = max_id + 1 if max_id else 1
+            # 从序列分配职工ID
+            person_id = id_allocator.next_id('Dev_Person', cursor)
             
             # 先创建职工记录
             sql_staff = "INSERT INTO DEV.Dev_Person (ID, Name, Mail_Box, M_Tel, Per_pos) VALUES (?, ?, ?, ?, ?)"
@@ -63,6 +63,7 @@ class AuthService:
             
             # 统一提交事务
             conn.commit()
+            invalidate('staff')
 
             logger.info(f"注册新用户：{username}（角色：{position}）")
             return user
@@ -0,0 +1,56 @@
+# services/auto_heartbeat_service.py
+from services.equipment_service import EquipmentService
+from utils.logger import logger
+
+
+class AutoHeartbeatSender:
+    """
+    定时给所有设备发送心跳（演示/联调用）
+    - 在 Web 进程内作为定时任务 auto_heartbeat 执行（AUTO_HEARTBEAT_CONFIG['enabled']），
+      心跳直接记入本进程的心跳表，与在线判定共用同一份内存状态
+    - auto_heartbeat_sender.py 只是单独运行时的启动入口
+    """
+
+    def __init__(self, interval=10):
+        """
+        :param interval: 发送间隔（秒），默认10秒
+        """
+        self.interval = interval
+        self.total_heartbeats = 0
+        self.success_count = 0
+
+    def send_heartbeat_for_all_equipments(self):
+        """为所有设备发送心跳包"""
+        try:
+            # 获取所有设备（不分页）
+            equipments, total = EquipmentService.get_all_equipments(page=1, page_size=1000)
+
+            if not equipments:
+                logger.warning("未获取到任何设备信息")
+                return
+
+            logger.info(f"开始为{total}台设备发送心跳包...")
+
+            # 整轮心跳先记入内存，再用一条UPDATE批量写库
+            try:
+                EquipmentService.update_equipment_heartbeats([equipment.id for equipment in equipments])
+                success, _ = EquipmentService.flush_heartbeats()
+                failed = len(equipments) - success
+            except Exception as e:
+                success = 0
+                failed = len(equipments)
+                logger.error(f"批量发送心跳异常: {str(e)}")
+
+            self.total_heartbeats += total
+            self.success_count += success
+
+            logger.info(f"心跳包发送完成: 成功{success}台，失败{failed}台，总发送次数{self.total_heartbeats}，总成功率{self.success_count/self.total_heartbeats*100:.2f}%")
+
+        except Exception as e:
+            logger.error(f"发送心跳包时发生异常: {str(e)}")
+
+    def register(self, scheduler):
+        """注册定时任务：立即执行一次，之后每 interval 秒执行（上一轮未结束时跳过本轮）"""
+        scheduler.add_interval('auto_heartbeat', self.send_heartbeat_for_all_equipments,
+                               self.interval, run_immediately=True)
+        logger.info(f"自动心跳已启用，发送间隔：{self.interval}秒")
@@ -0,0 +1,126 @@
+# services/counter_service.py
+import threading
+import time
+from utils.cache import reference_cache
+from utils.db import get_db_connection
+from config import COUNTER_CACHE_TTL
+
+
+class DashboardCounters:
+    """
+    首页/仪表盘统计数
+    - 用户、车间、部件总数和按车间、按预警状态的分组数，各用一条 COUNT/GROUP BY 查询
+    - 结果缓存 ttl 秒；预警新增、状态变化时直接在缓存上增减，不必重新查询
+    - 设备、车间、部件、用户增删改后调用 invalidate()，下次读取时重新统计
+    - 在线设备数取自内存心跳表，与实时状态一致
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._expires_at = 0
+        self._version = 0  # 每次增减/失效加1，统计期间发生变化的结果不写入缓存
+
+    def _load(self):
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT (SELECT COUNT(*) FROM DEV.Dev_Users),
+                       (SELECT COUNT(*) FROM DEV.Dev_Place),
+                       (SELECT COUNT(*) FROM DEV.Dev_Part)
+            """)
+            user_count, workshop_count, part_count = cursor.fetchone()
+            cursor.execute("SELECT Pos_ID, COUNT(*) FROM DEV.Dev_Main_Dev GROUP BY Pos_ID")
+            equipment_by_workshop = {row[0]: row[1] for row in cursor.fetchall()}
+            cursor.execute("SELECT Msg_State, COUNT(*) FROM DEV.DEV_WARNING GROUP BY Msg_State")
+            warnings_by_state = {}
+            for state, count in cursor.fetchall():
+                key = state.strip() if state else ''
+                warnings_by_state[key] = warnings_by_state.get(key, 0) + count
+        finally:
+            cursor.close()
+            conn.close()
+        return {
+            'user_count': user_count,
+            'workshop_count': workshop_count,
+            'part_count': part_count,
+            'equipment_by_workshop': equipment_by_workshop,
+            'warnings_by_state': warnings_by_state
+        }
+
+    def _get(self):
+        with self._lock:
+            if self._snapshot is not None and time.monotonic() < self._expires_at:
+                return self._snapshot
+            version = self._version
+        snapshot = self._load()
+        with self._lock:
+            if self._version == version:
+                self._snapshot = snapshot
+                self._expires_at = time.monotonic() + self.ttl
+        return snapshot
+
+    def summary(self):
+        """全部统计数（dict 副本）"""
+        from services.heartbeat_service import heartbeat_tracker
+        snapshot = self._get()
+        with self._lock:
+            equipment_by_workshop = dict(snapshot['equipment_by_workshop'])
+            warnings_by_state = dict(snapshot['warnings_by_state'])
+            result = {
+                'user_count': snapshot['user_count'],
+                'workshop_count': snapshot['workshop_count'],
+                'part_count': snapshot['part_count']
+            }
+        result['equipment_by_workshop'] = equipment_by_workshop
+        result['equipment_count'] = sum(equipment_by_workshop.values())
+        result['online_count'] = heartbeat_tracker.online_count()
+        result['warnings_by_state'] = warnings_by_state
+        result['warning_count'] = sum(warnings_by_state.values())
+        return result
+
+    def warning_count(self, msg_state=None):
+        """预警数量，msg_state 为空时返回总数"""
+        snapshot = self._get()
+        with self._lock:
+            by_state = snapshot['warnings_by_state']
+            return by_state.get(msg_state, 0) if msg_state else sum(by_state.values())
+
+    def equipment_count_by_workshop(self):
+        """{车间ID: 设备数}"""
+        snapshot = self._get()
+        with self._lock:
+            return dict(snapshot['equipment_by_workshop'])
+
+    def adjust_warnings(self, old_state, new_state, count=1):
+        """
+        预警新增（old_state=None）或状态变化后增量更新缓存
+        缓存已过期或未加载时不做任何事，下次读取重新统计
+        """
+        if count <= 0:
+            return
+        with self._lock:
+            self._version += 1
+            if self._snapshot is None:
+                return
+            by_state = self._snapshot['warnings_by_state']
+            if old_state:
+                by_state[old_state] = max(0, by_state.get(old_state, 0) - count)
+            if new_state:
+                by_state[new_state] = by_state.get(new_state, 0) + count
+
+    def invalidate(self):
+        """基础数据增删改后调用"""
+        with self._lock:
+            self._snapshot = None
+            self._expires_at = 0
+            self._version += 1
+
+
+# 全局统计数（进程内单例）
+counters = DashboardCounters(ttl=COUNTER_CACHE_TTL)
+
+# 车间增删改时重新统计
+reference_cache.add_listener('workshop', counters.invalidate)
@@ -0,0 +1,124 @@
+# services/dashboard_service.py
+import threading
+from utils.cache import reference_cache
+from utils.logger import logger
+from config import WEBSOCKET_INTERVAL
+
+# 实时看板 Socket.IO 房间名
+DASHBOARD_ROOM = 'dashboard'
+
+
+class DashboardPublisher:
+    """
+    实时看板增量推送
+    - 设备状态变化、最新采集数据、预警变化先合并在内存中
+    - 每 interval 秒最多向 dashboard 房间推送一次 dashboard_update，只包含期间变化的部分
+    - 同一设备/监测点在一个周期内多次变化只推送最后一次；待处理预警数每周期最多查询一次
+    - 推送量只与数据变化有关，与打开的页面数无关（浏览器不再定时整页刷新）
+    """
+
+    def __init__(self, interval=WEBSOCKET_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._socketio = None
+        self._status = {}  # 设备ID -> {'equipment_id', 'online_status', 'last_heartbeat'}
+        self._readings = {}  # 监测点ID -> (采集时间, 采集值)
+        self._warnings_changed = False
+        self._points = None  # 监测点ID -> (设备ID, 监测点名称, 单位)
+
+    def start(self, socketio):
+        """绑定 SocketIO 并启动推送任务（未启动时 publish_* 不积累数据）"""
+        if self._socketio is not None:
+            return
+        self._socketio = socketio
+        socketio.start_background_task(self._run)
+        logger.info(f"实时看板推送已启动，合并间隔：{self.interval}秒")
+
+    def publish_status(self, equipment_id, online_status, last_heartbeat=None):
+        """设备在线状态变化"""
+        if self._socketio is None:
+            return
+        with self._lock:
+            self._status[equipment_id] = {
+                'equipment_id': equipment_id,
+                'online_status': online_status,
+                'last_heartbeat': last_heartbeat.strftime('%Y-%m-%d %H:%M:%S') if last_heartbeat else '无'
+            }
+
+    def publish_readings(self, readings):
+        """新写入的采集数据 [(mon_id, mon_date, mon_value)]，每个监测点只保留最新一条"""
+        if self._socketio is None:
+            return
+        with self._lock:
+            for mon_id, mon_date, mon_value in readings:
+                current = self._readings.get(mon_id)
+                if current is None or mon_date >= current[0]:
+                    self._readings[mon_id] = (mon_date, mon_value)
+
+    def mark_warnings_changed(self):
+        """预警新增/处理后调用，下个周期推送最新的待处理预警数"""
+        if self._socketio is None:
+            return
+        with self._lock:
+            self._warnings_changed = True
+
+    def _collect(self):
+        """取出本周期的变化，组装推送内容；无变化返回 None"""
+        with self._lock:
+            status = self._status
+            readings = self._readings
+            warnings_changed = self._warnings_changed
+            self._status = {}
+            self._readings = {}
+            self._warnings_changed = False
+        if not status and not readings and not warnings_changed:
+            return None
+
+        payload = {}
+        if status:
+            payload['equipment'] = list(status.values())
+        if readings:
+            payload['readings'] = self._format_readings(readings)
+        if warnings_changed:
+            from services.warning_service import WarningService
+            payload['pending_warnings'] = WarningService.count_warnings(msg_state='待处理')
+        return payload
+
+    def reset_points(self):
+        """监测点变更后调用：下次推送时重新加载监测点→设备映射"""
+        self._points = None
+
+    def _format_readings(self, readings):
+        from models.monitor_point import MonitorPoint
+        if self._points is None or any(mon_id not in self._points for mon_id in readings):
+            # 首次使用或出现新监测点时重新加载监测点→设备映射
+            self._points = MonitorPoint.get_equipment_map()
+        result = []
+        for mon_id, (mon_date, mon_value) in readings.items():
+            equipment_id, name, unit = self._points.get(mon_id, (None, '', ''))
+            result.append({
+                'mon_id': mon_id,
+                'equipment_id': equipment_id,
+                'mon_name': name,
+                'unit': unit,
+                'mon_value': float(mon_value),
+                'mon_date': mon_date.strftime('%Y-%m-%d %H:%M:%S')
+            })
+        return result
+
+    def _run(self):
+        while True:
+            self._socketio.sleep(self.interval)
+            try:
+                payload = self._collect()
+                if payload:
+                    self._socketio.emit('dashboard_update', payload, to=DASHBOARD_ROOM)
+            except Exception as e:
+                logger.error(f"实时看板推送失败：{str(e)}")
+
+
+# 全局看板推送（进程内单例）
+dashboard_publisher = DashboardPublisher()
+
+# 监测点变更时重新加载监测点→设备映射
+reference_cache.add_listener('monitor_point', dashboard_publisher.reset_points)
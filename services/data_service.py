@@ -2,7 +2,32 @@
 from utils.db import get_db_connection
 from models.monitor_point import MonitorPoint  # 需确保模型类字段与新表匹配
 from utils.db import logger
-from datetime import datetime,date,time
+from datetime import datetime,date,time,timedelta
+import heapq
+import itertools
+import json
+from config import ROLLUP_CONFIG
+
+class DataItem:
+    """监测点最新采集数据（保持原有字段名，兼容前端/模板）"""
+
+    def __init__(self, id, mon_id, mon_date, mon_value, collector_id):
+        self.id = id  # 采集记录ID
+        self.point_id = mon_id  # 兼容原有代码的point_id字段名
+        self.collect_time = mon_date  # 兼容原有代码的collect_time字段名
+        self.value = mon_value  # 兼容原有代码的value字段名
+        self.collector_id = collector_id  # 采集人ID
+
+    def to_dict(self):
+        """转换为字典，保持原有字段名兼容前端/模板"""
+        return {
+            'id': self.id,
+            'point_id': self.point_id,  # 仍用point_id，避免调用方修改
+            'collect_time': self.collect_time,  # 仍用collect_time，兼容原有逻辑
+            'value': self.value,  # 仍用value，兼容原有逻辑
+            'collector_id': self.collector_id
+        }
+
 
 class DataService:
     @staticmethod
@@ -139,7 +164,7 @@ class DataService:
     @staticmethod
     def get_latest_data_by_monitor_point(point_id):
         """
-        获取单个监测点的最新采集数据（适配 Dev_Moni_Data 表结构）
+        获取单个监测点的最新采集数据（读取内存中的最新值，不查询 Dev_Moni_Data）
         :param point_id: 监测点ID（Dev_Moni_Point表的主键）
         :return: DataItem对象/None - 包含最新采集数据，无数据返回None
         """
@@ -152,70 +177,30 @@ class DataService:
             print(f"监测点ID参数无效：空字符串")
             return None
 
-        conn = None
-        cursor = None
+        from services.latest_service import latest_store
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-
-            # 核心SQL：适配 Dev_Moni_Data 表的字段名
-            sql = """
-                SELECT ID, Mon_ID, Mon_Date, Mon_value, Collector_ID 
-                FROM DEV.Dev_Moni_Data
-                WHERE Mon_ID = ?  -- Mon_ID 关联监测点表的ID
-                ORDER BY Mon_Date DESC  -- 按采集时间降序
-                LIMIT 1  -- 只取最新一条
-            """
-            cursor.execute(sql, [point_id])
-            row = cursor.fetchone()
-
-            # 无数据时返回None
-            if not row:
-                print(f"监测点{point_id}暂无采集数据")
-                return None
-
-            # 封装为数据对象（保持to_dict方法，适配原有调用逻辑）
-            class DataItem:
-                def __init__(self, id, mon_id, mon_date, mon_value, collector_id):
-                    self.id = id  # 采集记录ID
-                    self.point_id = mon_id  # 兼容原有代码的point_id字段名
-                    self.collect_time = mon_date  # 兼容原有代码的collect_time字段名
-                    self.value = mon_value  # 兼容原有代码的value字段名
-                    self.collector_id = collector_id  # 新增：采集人ID
-
-                def to_dict(self):
-                    """转换为字典，保持原有字段名兼容前端/模板"""
-                    return {
-                        'id': self.id,
-                        'point_id': self.point_id,  # 仍用point_id，避免调用方修改
-                        'collect_time': self.collect_time,  # 仍用collect_time，兼容原有逻辑
-                        'value': self.value,  # 仍用value，兼容原有逻辑
-                        'collector_id': self.collector_id  # 新增字段：采集人ID
-                    }
-
-            # 映射表字段到对象（注意row的索引顺序和SQL查询字段一致）
-            return DataItem(
-                id=row[0],
-                mon_id=row[1],
-                mon_date=row[2],
-                mon_value=row[3],
-                collector_id=row[4]
-            )
+            value = latest_store.get(int(point_id))
         except Exception as e:
             print(f"获取监测点{point_id}最新数据失败：{str(e)}")
             return None
-        finally:
-            # 安全释放数据库资源（无论成功/失败都执行）
-            if cursor:
-                try:
-                    cursor.close()
-                except:
-                    pass
-            if conn:
-                try:
-                    conn.close()
-                except:
-                    pass
+        if value is None:
+            return None
+        return DataItem(value[0], int(point_id), value[1], value[2], value[3])
+
+    @staticmethod
+    def get_latest_data_by_equipment(equipment_id):
+        """
+        设备下全部监测点的最新采集数据（一次内存查找）
+        :return: dict - {监测点ID: DataItem}，无数据的监测点不在结果中
+        """
+        from services.latest_service import latest_store
+        try:
+            values = latest_store.get_by_equipment(equipment_id)
+        except Exception as e:
+            logger.error(f"获取设备{equipment_id}最新数据失败：{str(e)}")
+            return {}
+        return {mon_id: DataItem(value[0], mon_id, value[1], value[2], value[3])
+                for mon_id, value in values.items()}
 
     @staticmethod
     def get_monitor_points_by_equipment_id(equipment_id):
@@ -297,21 +282,357 @@ class DataService:
                 except:
                     pass
 
+    # 历史数据查询公共部分（get_history_data / get_history_page 共用）
+    HISTORY_SELECT_SQL = """
+        SELECT 
+            d.ID AS data_id,
+            d.Mon_Date AS mon_date,
+            mp.Name AS mon_name,
+            st.name AS sense_name,
+            d.Mon_value AS mon_value,
+            mp.unit AS unit,
+            CONCAT(nv.Min_Val, '-', nv.Max_Val) AS normal_range,
+            nv.Min_Val AS min_val,
+            nv.Max_Val AS max_val,
+            p.Name AS collector_name,
+            CASE WHEN nv.Min_Val IS NULL OR nv.Max_Val IS NULL THEN TRUE
+                 ELSE d.Mon_value BETWEEN nv.Min_Val AND nv.Max_Val END AS is_normal
+        FROM DEV.Dev_Moni_Data d
+        LEFT JOIN DEV.Dev_Moni_Point mp ON d.Mon_ID = mp.ID
+        LEFT JOIN DEV.Dev_Sense_Type st ON mp.Sense_Type = st.ID
+        LEFT JOIN DEV.Dev_Normal_Val nv ON d.Mon_ID = nv.Mon_ID
+        LEFT JOIN DEV.Dev_Person p ON d.Collector_ID = p.ID
+        WHERE 1=1
+    """
+
+    # 预估行数低于该值时改为精确 COUNT(*)
+    HISTORY_EXACT_COUNT_LIMIT = 10000
+
+    @staticmethod
+    def _parse_history_dates(start_date, end_date):
+        """解析 YYYY-MM-DD 日期筛选条件，格式错误抛出 ValueError"""
+        start_dt = None
+        end_dt = None
+        if start_date and start_date.strip():
+            start_dt = datetime.strptime(start_date.strip(), "%Y-%m-%d")
+            start_dt = start_dt.replace(hour=0, minute=0, second=0)
+        if end_date and end_date.strip():
+            end_dt = datetime.strptime(end_date.strip(), "%Y-%m-%d")
+            end_dt = end_dt.replace(hour=23, minute=59, second=59)
+        return start_dt, end_dt
+
+    @staticmethod
+    def _build_history_filters(start_dt, end_dt, mon_id):
+        """构建 Dev_Moni_Data（别名d）的筛选条件，返回 (SQL片段, 参数列表)"""
+        sql = ""
+        params = []
+        if start_dt:
+            sql += " AND d.Mon_Date >= ?"
+            params.append(start_dt)
+        if end_dt:
+            sql += " AND d.Mon_Date <= ?"
+            params.append(end_dt)
+        if mon_id and str(mon_id).strip() != "":
+            sql += " AND d.Mon_ID = ?"
+            params.append(str(mon_id).strip())
+        return sql, params
+
+    @staticmethod
+    def _format_history_row(row):
+        """
+        按SQL查询的字段顺序解析元组：
+        0:data_id, 1:mon_date, 2:mon_name, 3:sense_name, 4:mon_value,
+        5:unit, 6:normal_range, 7:min_val, 8:max_val, 9:collector_name, 10:is_normal
+        """
+        # 处理采集时间
+        mon_date_str = ""
+        if row[1]:
+            try:
+                if isinstance(row[1], datetime):
+                    mon_date_str = row[1].strftime("%Y-%m-%d %H:%M:%S")
+                elif isinstance(row[1], str):
+                    mon_date_str = row[1][:19]
+            except:
+                mon_date_str = str(row[1])[:20]
+
+        # 是否正常由数据库判定（未配置正常范围视为正常）
+        is_normal = bool(row[10]) if row[10] is not None else True
+
+        return {
+            "mon_date": mon_date_str,
+            "mon_name": row[2].strip() if row[2] else "未知监测点",
+            "sense_name": row[3].strip() if row[3] else "未知传感类型",
+            "mon_value": row[4] or "",
+            "unit": row[5].strip() if row[5] else "",
+            "normal_range": row[6].strip() if row[6] else "未配置正常范围",
+            "is_normal": is_normal,
+            "collector_name": row[9].strip() if row[9] else "未知采集人"
+        }
+
+    @staticmethod
+    def _archived_history_rows(records, chunk_size=2000):
+        """
+        冷数据归档记录 (ID, Mon_Date, Mon_ID, Mon_value, Collector_ID) → 与 HISTORY_SELECT_SQL 字段顺序相同的元组
+        监测点、传感类型、正常值范围、采集人按块批量查询（走基础数据缓存）
+        """
+        from models.normal_range import NormalRange
+        from models.sensor_type import SensorType
+        from models.staff import Staff
+
+        records = iter(records)
+        while True:
+            chunk = list(itertools.islice(records, chunk_size))
+            if not chunk:
+                break
+            points = MonitorPoint.get_by_ids(r[2] for r in chunk)
+            ranges = NormalRange.get_by_monitor_ids(r[2] for r in chunk)
+            sensors = SensorType.get_by_ids(p.sense_type for p in points.values())
+            collectors = Staff.get_by_ids(r[4] for r in chunk)
+            for data_id, mon_date, mon_id, mon_value, collector_id in chunk:
+                point = points.get(mon_id)
+                sensor = sensors.get(point.sense_type) if point else None
+                normal_range = ranges.get(mon_id)
+                min_val = normal_range.min_val if normal_range else None
+                max_val = normal_range.max_val if normal_range else None
+                collector = collectors.get(collector_id)
+                yield (
+                    data_id, mon_date,
+                    point.name if point else None,
+                    sensor.name if sensor else None,
+                    mon_value,
+                    point.unit if point else None,
+                    f"{'' if min_val is None else min_val}-{'' if max_val is None else max_val}",
+                    min_val, max_val,
+                    collector.name if collector else None,
+                    True if min_val is None or max_val is None else min_val <= mon_value <= max_val
+                )
+
+    @staticmethod
+    def _merge_archived(rows, start_dt, end_dt, mon_id, key=None, descending=True):
+        """
+        数据库结果与冷数据归档按 (Mon_Date, ID) 合并，两边都须按同一方向排好序
+        归档过程中同一条记录可能短暂同时存在于两边，只保留一次
+        归档数据都早于 archived_until()：倒序时晚于该时间的数据库记录直接产出，
+        只有翻到该时间之前（或数据库结果取完）才开始读取归档，最新几页的查询不读归档文件
+        """
+        from services.archive_service import cold_archive
+
+        archived_until = cold_archive.archived_until()
+        if archived_until is None:
+            yield from rows
+            return
+        if descending:
+            rows = iter(rows)
+            for row in rows:
+                if row[1] < archived_until:
+                    rows = itertools.chain([row], rows)
+                    break
+                yield row
+            else:
+                rows = iter(())
+        archived = DataService._archived_history_rows(
+            cold_archive.iter_rows(start_dt, end_dt, mon_id, key=key, descending=descending))
+        last = None
+        for row in heapq.merge(rows, archived, key=lambda r: (r[1], r[0]), reverse=descending):
+            if (row[1], row[0]) == last:
+                continue
+            last = (row[1], row[0])
+            yield row
+
+    @staticmethod
+    def encode_history_cursor(mon_date, data_id):
+        """分页游标：采集时间（微秒精度）+ 记录ID，如 20240101103000000000_123"""
+        return f"{mon_date.strftime('%Y%m%d%H%M%S%f')}_{data_id}"
+
+    @staticmethod
+    def decode_history_cursor(cursor):
+        """解析分页游标，格式错误返回None"""
+        try:
+            date_part, id_part = cursor.split('_', 1)
+            return datetime.strptime(date_part, '%Y%m%d%H%M%S%f'), int(id_part)
+        except (AttributeError, ValueError):
+            return None
+
+    @staticmethod
+    def _count_history_rows(cursor, filter_sql, params, start_dt=None, end_dt=None, mon_id=None):
+        """
+        统计符合条件的记录数：先取执行计划的预估行数，
+        预估值较小时再执行精确 COUNT(*)，返回 (数量, 是否为预估值)；冷数据归档的记录数另行累加
+        """
+        from services.archive_service import cold_archive
+
+        archived = cold_archive.count(start_dt, end_dt, mon_id)
+        count_sql = "SELECT 1 FROM DEV.Dev_Moni_Data d WHERE 1=1" + filter_sql
+        cursor.execute("EXPLAIN (FORMAT JSON) " + count_sql, params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate >= DataService.HISTORY_EXACT_COUNT_LIMIT:
+            return estimate + archived, True
+
+        cursor.execute("SELECT COUNT(*) FROM DEV.Dev_Moni_Data d WHERE 1=1" + filter_sql, params)
+        return cursor.fetchone()[0] + archived, False
+
+    @staticmethod
+    def get_history_page(start_date, end_date, mon_id, cursor=None, direction='next', page_size=10):
+        """
+        历史数据键集分页（按 (Mon_Date, ID) 倒序，只取一页数据）
+        :param cursor: 分页游标（encode_history_cursor生成），None表示第一页
+        :param direction: next=向更早的数据翻页，prev=向更新的数据翻页
+        :return: dict - rows/next_cursor/prev_cursor/total_count/total_is_estimate
+        """
+        page = {'rows': [], 'next_cursor': None, 'prev_cursor': None,
+                'total_count': 0, 'total_is_estimate': False}
+        try:
+            start_dt, end_dt = DataService._parse_history_dates(start_date, end_date)
+        except ValueError as e:
+            logger.error(f"日期格式错误：{str(e)} | start={start_date} | end={end_date}")
+            return page
+
+        key = DataService.decode_history_cursor(cursor) if cursor else None
+        backward = key is not None and direction == 'prev'
+
+        conn = None
+        db_cursor = None
+        try:
+            conn = get_db_connection()
+            db_cursor = conn.cursor()
+
+            filter_sql, params = DataService._build_history_filters(start_dt, end_dt, mon_id)
+            page['total_count'], page['total_is_estimate'] = DataService._count_history_rows(
+                db_cursor, filter_sql, params, start_dt, end_dt, mon_id)
+
+            sql = DataService.HISTORY_SELECT_SQL + filter_sql
+            page_params = list(params)
+            if key:
+                # 冗余的 Mon_Date 范围条件让 IDX_MoniData_MonID_Date 能够限定扫描范围，
+                # 行比较再处理同一时间点的多条记录
+                if backward:
+                    sql += " AND d.Mon_Date >= ? AND (d.Mon_Date, d.ID) > (?, ?)"
+                else:
+                    sql += " AND d.Mon_Date <= ? AND (d.Mon_Date, d.ID) < (?, ?)"
+                page_params.extend([key[0], key[0], key[1]])
+            if backward:
+                sql += " ORDER BY d.Mon_Date ASC, d.ID ASC LIMIT ?"
+            else:
+                sql += " ORDER BY d.Mon_Date DESC, d.ID DESC LIMIT ?"
+            # 多取一条用于判断是否还有下一页
+            page_params.append(page_size + 1)
+
+            logger.debug(f"执行分页查询SQL：{sql} | 参数：{page_params}")
+            db_cursor.execute(sql, page_params)
+            # 冷数据归档同样按键集取一页，合并后再截取
+            rows = list(itertools.islice(
+                DataService._merge_archived(db_cursor.fetchall(), start_dt, end_dt, mon_id,
+                                            key=key, descending=not backward),
+                page_size + 1))
+
+            has_more = len(rows) > page_size
+            if backward and not has_more:
+                # 已回到最新的数据：释放连接后重新查询完整的第一页
+                rows = None
+            else:
+                rows = rows[:page_size]
+                if backward:
+                    rows.reverse()
+
+                if rows:
+                    first_key = DataService.encode_history_cursor(rows[0][1], rows[0][0])
+                    last_key = DataService.encode_history_cursor(rows[-1][1], rows[-1][0])
+                    if backward:
+                        page['prev_cursor'] = first_key
+                        page['next_cursor'] = last_key
+                    else:
+                        page['prev_cursor'] = first_key if key else None
+                        page['next_cursor'] = last_key if has_more else None
+
+                page['rows'] = [DataService._format_history_row(row) for row in rows]
+                return page
+
+        except Exception as e:
+            logger.error(f"分页查询失败：{str(e)}", exc_info=True)
+            return page
+        finally:
+            try:
+                if db_cursor:
+                    db_cursor.close()
+            except:
+                pass
+            try:
+                if conn:
+                    conn.close()
+            except:
+                pass
+
+        return DataService.get_history_page(start_date, end_date, mon_id, page_size=page_size)
+
+    @staticmethod
+    def count_history_rows(start_date, end_date, mon_id):
+        """统计符合条件的历史数据条数，返回 (数量, 是否为预估值)；日期格式错误返回 (0, False)"""
+        try:
+            start_dt, end_dt = DataService._parse_history_dates(start_date, end_date)
+        except ValueError:
+            return 0, False
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            filter_sql, params = DataService._build_history_filters(start_dt, end_dt, mon_id)
+            return DataService._count_history_rows(cursor, filter_sql, params, start_dt, end_dt, mon_id)
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def iter_history_data(start_date, end_date, mon_id, chunk_size=2000):
+        """
+        逐条产出历史数据（导出用）：使用服务端命名游标分批读取，内存占用与总行数无关；
+        冷数据归档按月逐个读取，与数据库结果按时间合并
+        :param chunk_size: 每次从数据库拉取的行数
+        :return: 生成器，元素格式与 get_history_data 相同
+        """
+        try:
+            start_dt, end_dt = DataService._parse_history_dates(start_date, end_date)
+        except ValueError as e:
+            logger.error(f"日期格式错误：{str(e)} | start={start_date} | end={end_date}")
+            return
+
+        rows = DataService._iter_history_rows(start_dt, end_dt, mon_id, chunk_size)
+        for row in DataService._merge_archived(rows, start_dt, end_dt, mon_id):
+            yield DataService._format_history_row(row)
+
+    @staticmethod
+    def _iter_history_rows(start_dt, end_dt, mon_id, chunk_size):
+        """数据库中的历史数据原始行（按 (Mon_Date, ID) 倒序）"""
+        conn = get_db_connection()
+        # 命名游标即 PostgreSQL 服务端游标，结果集保留在数据库端
+        cursor = conn.cursor(name='history_export')
+        cursor.itersize = chunk_size
+        try:
+            filter_sql, params = DataService._build_history_filters(start_dt, end_dt, mon_id)
+            sql = DataService.HISTORY_SELECT_SQL + filter_sql + " ORDER BY d.Mon_Date DESC, d.ID DESC"
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            try:
+                cursor.close()
+            except:
+                pass
+            # 归还连接池时会回滚命名游标所在的只读事务
+            conn.close()
+
     @staticmethod
     def get_history_data(start_date, end_date, mon_id):
         """
-        修复元组解析错误：适配游标返回元组的情况
+        查询全部符合条件的历史数据（导出用，页面分页请使用 get_history_page）
         """
         # 1. 参数校验与预处理
-        start_dt = None
-        end_dt = None
         try:
-            if start_date and start_date.strip():
-                start_dt = datetime.strptime(start_date.strip(), "%Y-%m-%d")
-                start_dt = start_dt.replace(hour=0, minute=0, second=0)
-            if end_date and end_date.strip():
-                end_dt = datetime.strptime(end_date.strip(), "%Y-%m-%d")
-                end_dt = end_dt.replace(hour=23, minute=59, second=59)
+            start_dt, end_dt = DataService._parse_history_dates(start_date, end_date)
         except ValueError as e:
             logger.error(f"日期格式错误：{str(e)} | start={start_date} | end={end_date}")
             return []
@@ -323,90 +644,16 @@ class DataService:
             conn = get_db_connection()
             cursor = conn.cursor()  # 普通游标，返回元组
 
-            # 核心SQL（保持不变）
-            sql = """
-                SELECT 
-                    d.ID AS data_id,
-                    d.Mon_Date AS mon_date,
-                    mp.Name AS mon_name,
-                    st.name AS sense_name,
-                    d.Mon_value AS mon_value,
-                    mp.unit AS unit,
-                    CONCAT(nv.Min_Val, '-', nv.Max_Val) AS normal_range,
-                    nv.Min_Val AS min_val,
-                    nv.Max_Val AS max_val,
-                    p.Name AS collector_name
-                FROM DEV.Dev_Moni_Data d
-                LEFT JOIN DEV.Dev_Moni_Point mp ON d.Mon_ID = mp.ID
-                LEFT JOIN DEV.Dev_Sense_Type st ON mp.Sense_Type = st.ID
-                LEFT JOIN DEV.Dev_Normal_Val nv ON d.Mon_ID = nv.Mon_ID
-                LEFT JOIN DEV.Dev_Person p ON d.Collector_ID = p.ID
-                WHERE 1=1
-            """
-            params = []
-
-            # 添加时间/监测点条件
-            if start_dt:
-                sql += " AND d.Mon_Date >= ?"
-                params.append(start_dt)
-            if end_dt:
-                sql += " AND d.Mon_Date <= ?"
-                params.append(end_dt)
-            if mon_id and mon_id.strip() != "":
-                sql += " AND d.Mon_ID = ?"
-                params.append(mon_id.strip())
-
-            sql += " ORDER BY d.Mon_Date DESC"
-            logger.info(f"执行查询SQL：{sql} | 参数：{params}")
+            filter_sql, params = DataService._build_history_filters(start_dt, end_dt, mon_id)
+            sql = DataService.HISTORY_SELECT_SQL + filter_sql + " ORDER BY d.Mon_Date DESC, d.ID DESC"
             cursor.execute(sql, params)
             rows = cursor.fetchall()  # 返回元组列表
 
-            # 3. 格式化结果（适配元组格式，按字段顺序取值）
-            history_data = []
-            for row in rows:
-                # === 关键修复：按SQL查询的字段顺序解析元组 ===
-                # row索引对应SQL的SELECT顺序：
-                # 0:data_id, 1:mon_date, 2:mon_name, 3:sense_name, 4:mon_value,
-                # 5:unit, 6:normal_range, 7:min_val, 8:max_val, 9:collector_name
-
-                # 处理采集时间
-                mon_date_str = ""
-                if row[1]:  # row[1] 对应 mon_date
-                    try:
-                        if isinstance(row[1], datetime):
-                            mon_date_str = row[1].strftime("%Y-%m-%d %H:%M:%S")
-                        elif isinstance(row[1], str):
-                            mon_date_str = row[1][:19]
-                    except:
-                        mon_date_str = str(row[1])[:20]
-
-                # 判断是否正常
-                is_normal = True
-                mon_value = row[4]
-                min_val = row[7]
-                max_val = row[8]
-                if mon_value is not None and min_val is not None and max_val is not None:
-                    try:
-                        mon_value_num = float(mon_value)
-                        min_val_num = float(min_val)
-                        max_val_num = float(max_val)
-                        is_normal = min_val_num <= mon_value_num <= max_val_num
-                    except:
-                        is_normal = False
-
-                # 组装数据（元组索引取值）
-                history_data.append({
-                    "mon_date": mon_date_str,
-                    "mon_name": row[2].strip() if row[2] else "未知监测点",
-                    "sense_name": row[3].strip() if row[3] else "未知传感类型",
-                    "mon_value": row[4] or "",
-                    "unit": row[5].strip() if row[5] else "",
-                    "normal_range": row[6].strip() if row[6] else "未配置正常范围",
-                    "is_normal": is_normal,
-                    "collector_name": row[9].strip() if row[9] else "未知采集人"
-                })
-
-            logger.info(f"查询完成：共{len(history_data)}条数据")
+            # 3. 格式化结果（合并冷数据归档）
+            history_data = [DataService._format_history_row(row)
+                            for row in DataService._merge_archived(rows, start_dt, end_dt, mon_id)]
+
+            logger.debug(f"查询完成：共{len(history_data)}条数据")
             return history_data
 
         except Exception as e:
@@ -422,4 +669,72 @@ class DataService:
                 if conn:
                     conn.close()
             except:
-                pass
\ No newline at end of file
+                pass
+
+    @staticmethod
+    def get_trend(mon_id, start_dt, end_dt, max_points=None, resolution=None):
+        """
+        趋势数据（按时间段聚合的 min/max/avg/count/last）
+        查询计划：所需分辨率 = 时间跨度 / max_points（或直接指定 resolution 秒），
+        选择不超过该分辨率的最粗汇总表；分辨率小于1分钟时聚合原始数据
+        :return: dict - source（'1m'/'1h'/'1d'/'raw'）、step（每个点的秒数）、points
+        """
+        import math
+        from services.rollup_service import RollupService, GRANULARITIES
+
+        if not mon_id:
+            raise ValueError('监测点不能为空')
+        if end_dt <= start_dt:
+            raise ValueError('结束时间必须晚于开始时间')
+        max_points = max(1, int(max_points or ROLLUP_CONFIG['max_points']))
+        span = (end_dt - start_dt).total_seconds()
+        resolution = max(1, int(resolution or math.ceil(span / max_points)))
+
+        plan = RollupService.choose_granularity(start_dt, resolution)
+        if plan:
+            source, table = plan
+            bucket_seconds = next(g[1] for g in GRANULARITIES if g[0] == source)
+            # 每个点包含整数个汇总时间段，避免一个时间段跨两个点
+            step = math.ceil(resolution / bucket_seconds) * bucket_seconds
+            # 起点对齐到时间段边界，包含起点所在的时间段
+            offset = (start_dt - datetime(1970, 1, 1)).total_seconds() % bucket_seconds
+            start_param = start_dt - timedelta(seconds=offset)
+            sql = f"""
+                SELECT to_timestamp(floor(extract(epoch FROM Bucket_Start) / ?) * ?) AT TIME ZONE 'UTC' AS slot,
+                       MIN(Min_Val), MAX(Max_Val), SUM(Sum_Val) / SUM(Cnt), SUM(Cnt),
+                       (array_agg(Last_Val ORDER BY Last_Date DESC))[1]
+                FROM {table}
+                WHERE Mon_ID = ? AND Bucket_Start >= ? AND Bucket_Start <= ?
+                GROUP BY slot
+                ORDER BY slot
+            """
+        else:
+            source = 'raw'
+            step = resolution
+            start_param = start_dt
+            sql = """
+                SELECT to_timestamp(floor(extract(epoch FROM Mon_Date) / ?) * ?) AT TIME ZONE 'UTC' AS slot,
+                       MIN(Mon_value), MAX(Mon_value), AVG(Mon_value), COUNT(*),
+                       (array_agg(Mon_value ORDER BY Mon_Date DESC, ID DESC))[1]
+                FROM DEV.Dev_Moni_Data
+                WHERE Mon_ID = ? AND Mon_Date >= ? AND Mon_Date <= ?
+                GROUP BY slot
+                ORDER BY slot
+            """
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql, (step, step, mon_id, start_param, end_dt))
+            points = [{
+                'time': row[0].strftime('%Y-%m-%d %H:%M:%S'),
+                'min': float(row[1]),
+                'max': float(row[2]),
+                'avg': round(float(row[3]), 4),
+                'count': int(row[4]),
+                'last': float(row[5])
+            } for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+        return {'source': source, 'step': step, 'points': points}
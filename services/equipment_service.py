@@ -1,7 +1,11 @@
+import hashlib
+import time
 from datetime import datetime
 from models.equipment import Equipment
 from models.workshop import Workshop
 from models.equipment_part import EquipmentPart
+from services.heartbeat_service import heartbeat_tracker
+from utils.db import get_db_connection
 from utils.logger import logger
 from config import HEARTBEAT_TIMEOUT
 from werkzeug.exceptions import BadRequest
@@ -23,13 +27,29 @@ class EquipmentService:
 
     @staticmethod
     def update_equipment_heartbeat(equipment_id):
-        """更新设备心跳（标记在线）"""
-        return Equipment.update_heartbeat(equipment_id)
+        """记录设备心跳（写入内存心跳表，由 flush_heartbeats 定期批量写库）"""
+        heartbeat_tracker.record(int(equipment_id))
+        return True
 
     @staticmethod
-    def check_equipment_online_status():
-        """检查设备在线状态（超时标记离线）"""
-        return Equipment.check_online_status()
+    def update_equipment_heartbeats(equipment_ids):
+        """批量记录设备心跳，返回由离线变为在线的设备ID列表"""
+        return heartbeat_tracker.record_many([int(equipment_id) for equipment_id in equipment_ids])
+
+    @staticmethod
+    def flush_heartbeats():
+        """把内存中的心跳批量写入数据库"""
+        return heartbeat_tracker.flush()
+
+    @staticmethod
+    def start_online_monitor(on_status_change=None):
+        """
+        启动设备在线状态监测：心跳超时即判定离线（按设备到期时间触发，不周期扫描）
+        :param on_status_change: 状态变化回调 fn(设备ID, 在线状态, 最后心跳时间)
+        """
+        if on_status_change is not None:
+            heartbeat_tracker.add_listener(on_status_change)
+        heartbeat_tracker.start()
 
     @staticmethod
     def get_equipment_parts(equipment_id):
@@ -40,4 +60,124 @@ class EquipmentService:
     @staticmethod
     def get_all_workshops():
         """获取所有车间"""
-        return Workshop.get_all()
\ No newline at end of file
+        return Workshop.get_all()
+
+    # 设备层级包含的基础数据（缓存命名空间），任一失效即视为层级变化
+    TREE_NAMESPACES = ('workshop', 'staff', 'sensor_type', 'equipment', 'part', 'monitor_point', 'normal_range')
+
+    @staticmethod
+    def equipment_tree_etag(equipment_ids=None):
+        """
+        设备层级的 ETag，不查询数据库：由请求的设备ID、基础数据缓存各命名空间的失效次数、
+        最新值版本号、心跳表版本号组成；再加上缓存有效期的时间段，其他进程修改的基础数据最迟一个有效期后体现
+        """
+        from services.latest_service import latest_store
+        from utils.cache import reference_cache
+
+        parts = [
+            ','.join(str(i) for i in sorted(set(equipment_ids))) if equipment_ids is not None else '*',
+            '.'.join(str(reference_cache.generation(ns)) for ns in EquipmentService.TREE_NAMESPACES),
+            str(latest_store.version()),
+            str(heartbeat_tracker.version()),
+            str(int(time.time() // reference_cache.ttl))
+        ]
+        return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_equipment_tree(equipment_ids=None):
+        """
+        设备 → 部件 → 监测点（含名称、正常范围、最新采集值）的完整层级
+        固定3条集合查询：设备（JOIN车间/负责人）、部件、监测点（JOIN传感类型/管理员/正常范围/最新值），
+        与设备、部件、监测点的数量无关
+        :param equipment_ids: 设备ID列表，None 表示全部设备
+        :return: list[dict]
+        """
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            sql = """
+                SELECT e.ID, e.Equip_Code, e.Name, e.Use_State, e.Last_Heartbeat,
+                       e.Pos_ID, w.name, e.Person_ID, p.Name
+                FROM DEV.Dev_Main_Dev e
+                LEFT JOIN DEV.Dev_Place w ON e.Pos_ID = w.ID
+                LEFT JOIN DEV.Dev_Person p ON e.Person_ID = p.ID
+            """
+            params = []
+            if equipment_ids is not None:
+                sql += " WHERE e.ID = ANY(?)"
+                params.append(list(equipment_ids))
+            cursor.execute(sql + " ORDER BY e.ID", params)
+            equipments = {}
+            for row in cursor.fetchall():
+                # 内存中的心跳可能尚未写库
+                last_heartbeat = heartbeat_tracker.last_heartbeat(row[0]) or row[4]
+                equipments[row[0]] = {
+                    'id': row[0],
+                    'equip_code': row[1].strip() if row[1] else '',
+                    'name': row[2].strip() if row[2] else '',
+                    'use_state': row[3].strip() if row[3] else '',
+                    'online_status': '在线' if heartbeat_tracker.is_online(row[0]) else '离线',
+                    'last_heartbeat': last_heartbeat.strftime('%Y-%m-%d %H:%M:%S') if last_heartbeat else None,
+                    'workshop_id': row[5],
+                    'workshop_name': row[6].strip() if row[6] else '',
+                    'person_id': row[7],
+                    'person_name': row[8].strip() if row[8] else '',
+                    'parts': []
+                }
+            if not equipments:
+                return []
+            ids = list(equipments)
+
+            cursor.execute(
+                "SELECT ID, MID, Part_Name, Description FROM DEV.Dev_Part WHERE MID = ANY(?) ORDER BY ID",
+                (ids,)
+            )
+            parts = {}
+            for row in cursor.fetchall():
+                part = {
+                    'id': row[0],
+                    'part_name': row[2].strip() if row[2] else '',
+                    'description': row[3].strip() if row[3] else '',
+                    'monitor_points': []
+                }
+                parts[row[0]] = part
+                equipments[row[1]]['parts'].append(part)
+
+            cursor.execute("""
+                SELECT mp.ID, mp.PART_ID, mp.Name, mp.unit, st.name, s.Name,
+                       nv.Min_Val, nv.Max_Val, l.Mon_Date, l.Mon_value
+                FROM DEV.Dev_Moni_Point mp
+                JOIN DEV.Dev_Part pt ON mp.PART_ID = pt.ID
+                LEFT JOIN DEV.Dev_Sense_Type st ON mp.Sense_Type = st.ID
+                LEFT JOIN DEV.Dev_Person s ON mp.Admin_Peron = s.ID
+                LEFT JOIN (
+                    -- 同一监测点有多条正常范围时取ID最大的一条，避免监测点重复
+                    SELECT DISTINCT ON (Mon_ID) Mon_ID, Min_Val, Max_Val
+                    FROM DEV.Dev_Normal_Val
+                    ORDER BY Mon_ID, ID DESC
+                ) nv ON nv.Mon_ID = mp.ID
+                LEFT JOIN DEV.Dev_Moni_Latest l ON l.Mon_ID = mp.ID
+                WHERE pt.MID = ANY(?)
+                ORDER BY mp.ID
+            """, (ids,))
+            for row in cursor.fetchall():
+                min_val = float(row[6]) if row[6] is not None else None
+                max_val = float(row[7]) if row[7] is not None else None
+                value = float(row[9]) if row[9] is not None else None
+                parts[row[1]]['monitor_points'].append({
+                    'id': row[0],
+                    'name': row[2].strip() if row[2] else '',
+                    'unit': row[3].strip() if row[3] else '',
+                    'sense_name': row[4].strip() if row[4] else '',
+                    'admin_name': row[5].strip() if row[5] else '',
+                    'min_val': min_val,
+                    'max_val': max_val,
+                    'latest_value': value,
+                    'latest_time': row[8].strftime('%Y-%m-%d %H:%M:%S') if row[8] else None,
+                    'is_normal': None if value is None or min_val is None or max_val is None
+                    else min_val <= value <= max_val
+                })
+        finally:
+            cursor.close()
+            conn.close()
+        return list(equipments.values())
@@ -0,0 +1,201 @@
+# services/export_job_service.py
+import gzip
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from services.data_service import DataService
+from services.export_service import ExportService
+from utils.logger import logger
+from config import EXPORT_CONFIG
+
+# 导出格式：(文件扩展名, MIME类型)；xlsx 本身为 deflate 压缩的 zip，csv 写为 gzip
+EXPORT_FORMATS = {
+    'xlsx': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('.csv.gz', 'application/gzip')
+}
+
+
+def export_room(job_id):
+    """导出任务进度推送的 Socket.IO 房间名"""
+    return f'export:{job_id}'
+
+
+class ExportJobQueue:
+    """
+    历史数据异步导出
+    - submit() 只登记任务并返回任务ID，文件由 workers 个后台线程依次生成，不占用请求线程
+    - 文件先写入暂存目录的 .part 文件，完成后改名，下载时不会读到未写完的文件
+    - 生成过程中按 progress_interval 向 export:<任务ID> 房间推送 export_progress
+    - 完成的文件保留 ttl 秒，cleanup() 删除过期任务和文件
+    注意：eventlet.monkey_patch() 后线程为绿色线程，生成过程中每批数据主动让出一次
+    """
+
+    def __init__(self, spool_dir='exports', workers=2, ttl=3600, progress_interval=1):
+        self.spool_dir = os.path.abspath(spool_dir)
+        self.ttl = ttl
+        self.progress_interval = progress_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export')
+        self._lock = threading.Lock()
+        self._jobs = {}  # 任务ID -> 任务信息dict
+        self._socketio = None
+
+    def start(self, socketio):
+        """绑定 SocketIO 用于推送进度，并清理上次运行遗留的文件"""
+        self._socketio = socketio
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self.cleanup()
+
+    # ---------- 提交与查询 ----------
+    def submit(self, start_date, end_date, mon_id, export_format='xlsx', owner=None):
+        """
+        登记导出任务，返回任务ID
+        :raises ValueError: 导出格式不支持
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f'不支持的导出格式：{export_format}')
+        os.makedirs(self.spool_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        extension = EXPORT_FORMATS[export_format][0]
+        job = {
+            'id': job_id,
+            'owner': owner,
+            'format': export_format,
+            'filters': {'start_date': start_date, 'end_date': end_date, 'mon_id': mon_id},
+            'status': 'queued',
+            'rows': 0,
+            'total': None,
+            'total_is_estimate': False,
+            'filename': f"历史数据_{datetime.now().strftime('%Y%m%d_%H%M%S')}{extension}",
+            'path': os.path.join(self.spool_dir, job_id + extension),
+            'size': None,
+            'error': None,
+            'created_at': time.time(),
+            'finished_at': None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        self._executor.submit(self._run, job_id)
+        logger.info(f"导出任务已提交：{job_id}（{export_format}），提交人：{owner}")
+        return job_id
+
+    def get(self, job_id):
+        """任务信息副本，不存在返回 None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    @staticmethod
+    def to_public(job):
+        """返回给前端的任务状态（不含文件路径）"""
+        return {
+            'job_id': job['id'],
+            'status': job['status'],
+            'format': job['format'],
+            'rows': job['rows'],
+            'total': job['total'],
+            'total_is_estimate': job['total_is_estimate'],
+            'filename': job['filename'],
+            'size': job['size'],
+            'error': job['error']
+        }
+
+    # ---------- 生成文件 ----------
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields)
+            return dict(job)
+
+    def _emit(self, job):
+        if self._socketio is None or job is None:
+            return
+        try:
+            self._socketio.emit('export_progress', self.to_public(job), to=export_room(job['id']))
+        except Exception as e:
+            logger.error(f"导出进度推送失败：{str(e)}")
+
+    def _track(self, job_id, rows, chunk_rows=1000):
+        """包装历史数据生成器：统计已写入行数，按间隔推送进度，每批让出一次"""
+        last_emit = time.monotonic()
+        count = 0
+        for item in rows:
+            yield item
+            count += 1
+            if count % chunk_rows == 0:
+                now = time.monotonic()
+                if now - last_emit >= self.progress_interval:
+                    last_emit = now
+                    self._emit(self._update(job_id, rows=count))
+                time.sleep(0)
+        self._update(job_id, rows=count)
+
+    def _run(self, job_id):
+        job = self._update(job_id, status='running')
+        if job is None:
+            return
+        filters = job['filters']
+        part_path = job['path'] + '.part'
+        try:
+            total, is_estimate = DataService.count_history_rows(
+                filters['start_date'], filters['end_date'], filters['mon_id'])
+            self._emit(self._update(job_id, total=total, total_is_estimate=is_estimate))
+
+            rows = self._track(job_id, DataService.iter_history_data(
+                filters['start_date'], filters['end_date'], filters['mon_id']))
+            if job['format'] == 'csv':
+                with gzip.open(part_path, 'wt', encoding='utf-8', newline='') as f:
+                    for chunk in ExportService.iter_csv(rows):
+                        f.write(chunk)
+            else:
+                ExportService.write_xlsx(rows, part_path)
+            os.replace(part_path, job['path'])
+            job = self._update(job_id, status='done', size=os.path.getsize(job['path']),
+                               finished_at=time.time())
+            logger.info(f"导出任务完成：{job_id}，{job['rows']}行，{job['size']}字节")
+        except Exception as e:
+            logger.error(f"导出任务失败：{job_id}，{str(e)}")
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            job = self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+        self._emit(job)
+
+    # ---------- 清理 ----------
+    def cleanup(self, now=None):
+        """删除过期的任务记录和文件，以及暂存目录中无主的过期文件，返回删除的文件数"""
+        now = now or time.time()
+        removed = 0
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job['finished_at'] is not None and now - job['finished_at'] > self.ttl]
+            for job in expired:
+                del self._jobs[job['id']]
+            known = {os.path.basename(job['path']) for job in self._jobs.values()}
+        for job in expired:
+            if os.path.exists(job['path']):
+                os.remove(job['path'])
+                removed += 1
+        if os.path.isdir(self.spool_dir):
+            for name in os.listdir(self.spool_dir):
+                path = os.path.join(self.spool_dir, name)
+                if name.split('.part')[0] in known or not os.path.isfile(path):
+                    continue
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+                    removed += 1
+        if removed:
+            logger.info(f"清理过期导出文件：{removed}个")
+        return removed
+
+
+# 全局导出任务队列（进程内单例）
+export_jobs = ExportJobQueue(
+    spool_dir=EXPORT_CONFIG['spool_dir'],
+    workers=EXPORT_CONFIG['workers'],
+    ttl=EXPORT_CONFIG['ttl'],
+    progress_interval=EXPORT_CONFIG['progress_interval']
+)
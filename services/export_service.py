@@ -0,0 +1,100 @@
+# services/export_service.py
+import csv
+import io
+import os
+import tempfile
+
+# 导出列：(历史数据字段, 表头)，表头与导入模板保持一致，导出文件可直接再导入
+EXPORT_COLUMNS = [
+    ('mon_date', '监测时间'),
+    ('mon_name', '监测点名称'),
+    ('sense_name', '传感器类型'),
+    ('mon_value', '监测值'),
+    ('unit', '单位'),
+    ('normal_range', '正常范围'),
+    ('collector_name', '采集人'),
+    ('is_normal', '状态')
+]
+
+
+class ExportService:
+    @staticmethod
+    def _to_cells(item):
+        """历史数据字典 → 单元格列表"""
+        cells = []
+        for field, _ in EXPORT_COLUMNS:
+            value = item.get(field)
+            if field == 'is_normal':
+                value = '正常' if value else '异常'
+            cells.append(value)
+        return cells
+
+    @staticmethod
+    def iter_csv(rows, chunk_rows=1000):
+        """
+        按块产出CSV文本（UTF-8 BOM开头，Excel可直接打开中文）
+        :param rows: 历史数据字典的可迭代对象（可为生成器）
+        :param chunk_rows: 每次产出的行数
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        buffer.write('\ufeff')
+        writer.writerow([title for _, title in EXPORT_COLUMNS])
+
+        count = 0
+        for item in rows:
+            writer.writerow(ExportService._to_cells(item))
+            count += 1
+            if count % chunk_rows == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+
+    @staticmethod
+    def write_xlsx(rows, fileobj, sheet_name='历史数据'):
+        """
+        以 openpyxl 只写模式写出Excel：逐行写入磁盘，不在内存中保留整张表
+        :param fileobj: 文件路径或可写的二进制文件对象
+        :return: 写入的数据行数
+        """
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet(title=sheet_name)
+        sheet.append([title for _, title in EXPORT_COLUMNS])
+        count = 0
+        for item in rows:
+            sheet.append(ExportService._to_cells(item))
+            count += 1
+        workbook.save(fileobj)
+        return count
+
+    @staticmethod
+    def iter_xlsx(rows, chunk_size=64 * 1024):
+        """
+        生成Excel临时文件后分块读出（xlsx为zip格式，必须写完才能输出），
+        文件读完或客户端断开后删除临时文件
+        :return: (生成器, 文件字节数)
+        """
+        fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='export_')
+        os.close(fd)
+        try:
+            ExportService.write_xlsx(rows, path)
+            size = os.path.getsize(path)
+        except Exception:
+            os.remove(path)
+            raise
+
+        def generate():
+            try:
+                with open(path, 'rb') as f:
+                    while True:
+                        chunk = f.read(chunk_size)
+                        if not chunk:
+                            break
+                        yield chunk
+            finally:
+                os.remove(path)
+
+        return generate(), size
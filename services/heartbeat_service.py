@@ -0,0 +1,283 @@
+# services/heartbeat_service.py
+import threading
+import time
+from datetime import datetime, timedelta
+from models.equipment import Equipment
+from utils.cache import reference_cache
+from utils.deadline_tracker import DeadlineTracker
+from utils.logger import logger
+from config import HEARTBEAT_TIMEOUT
+
+
+class HeartbeatTracker:
+    """
+    进程内设备心跳表
+    - 心跳只写入内存（设备ID → 最后心跳时间），不访问数据库
+    - flush() 按固定间隔把期间收到的心跳用一条 UPDATE 批量写入 Dev_Main_Dev
+    - 在线/离线状态在内存中判定，只有状态变化的设备才写离线标记
+    - 每台在线设备在 DeadlineTracker 中登记到期时间，心跳超时的瞬间即判定离线，
+      并通知监听者（如 Socket.IO 推送），不再周期扫描全部设备
+    - 其他进程（如独立运行的 auto_heartbeat_sender.py）直接写库的心跳不经过本进程内存，
+      flush() 每次先从库中读回最近 timeout 秒内的 Last_Heartbeat 并续期，避免把这些设备误判离线
+    - 只接受 Dev_Main_Dev 中存在的设备ID；设备增删（equipment 缓存失效）后或收到未知ID时重新读取设备列表
+    """
+
+    def __init__(self, timeout=HEARTBEAT_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._last_seen = {}  # 设备ID -> 最后心跳的 time.monotonic()
+        self._last_heartbeat = {}  # 设备ID -> 最后心跳时间（datetime，用于推送显示）
+        self._online = set()  # 内存中判定为在线的设备ID
+        self._pending = {}  # 待写库的心跳：设备ID -> 最后心跳时间（datetime）
+        self._pending_offline = set()  # 待写库的离线设备ID
+        self._known = set()  # Dev_Main_Dev 中存在的设备ID
+        self._known_at = 0.0  # 上次读取设备列表的 time.monotonic()
+        self._devices_stale = False
+        self._reconciled = 0  # 从库中读回的外部心跳次数
+        self._dropped = 0  # 丢弃的未知设备心跳次数
+        self._version = 0  # 心跳时间或在线状态每次变化加一（设备层级接口的 ETag 使用）
+        self._loaded = False
+        self._listeners = []  # 状态变化回调 fn(设备ID, '在线'/'离线', 最后心跳时间)
+        self._deadlines = DeadlineTracker(self._on_deadline, name='heartbeat-deadlines')
+
+    def load(self):
+        """从 Dev_Main_Dev 读入已有的心跳时间和在线状态（首次使用时调用）"""
+        rows = Equipment.get_heartbeat_states()
+        now = datetime.now()
+        mono_now = time.monotonic()
+        with self._lock:
+            self._known = {row[0] for row in rows}
+            self._known_at = mono_now
+            for equipment_id, last_heartbeat, online_status in rows:
+                if equipment_id in self._last_seen:
+                    continue  # 加载期间已收到新心跳
+                if last_heartbeat is not None:
+                    self._last_seen[equipment_id] = mono_now - (now - last_heartbeat).total_seconds()
+                    self._last_heartbeat[equipment_id] = last_heartbeat
+                if online_status and online_status.strip() == '在线':
+                    self._online.add(equipment_id)
+                    # 没有心跳时间的在线设备立即到期
+                    last_seen = self._last_seen.get(equipment_id, mono_now - self.timeout)
+                    self._deadlines.set_deadline(equipment_id, last_seen + self.timeout)
+            self._loaded = True
+            self._version += 1
+        logger.info(f"心跳表加载完成：{len(rows)}台设备，{len(self._online)}台在线")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def invalidate_devices(self):
+        """设备增删后调用：下次收到心跳时重新读取设备列表"""
+        self._devices_stale = True
+
+    def _refresh_devices(self):
+        """重新读取设备列表，已删除设备的心跳状态一并清除"""
+        self._devices_stale = False
+        ids = {row[0] for row in Equipment.get_heartbeat_states()}
+        with self._lock:
+            removed = self._known - ids
+            self._known = ids
+            self._known_at = time.monotonic()
+            for equipment_id in removed:
+                self._last_seen.pop(equipment_id, None)
+                self._last_heartbeat.pop(equipment_id, None)
+                self._pending.pop(equipment_id, None)
+                self._pending_offline.discard(equipment_id)
+                self._online.discard(equipment_id)
+                self._deadlines.cancel(equipment_id)
+            self._version += 1
+        if removed:
+            logger.info(f"设备列表已更新：移除{len(removed)}台已删除设备的心跳状态")
+
+    def _filter_known(self, equipment_ids):
+        """
+        过滤掉不存在的设备ID
+        未知ID可能是其他进程新增的设备：距上次读取超过 timeout 秒才重新读取，避免伪造ID反复触发查询
+        """
+        if self._devices_stale:
+            self._refresh_devices()
+        with self._lock:
+            unknown = [equipment_id for equipment_id in equipment_ids if equipment_id not in self._known]
+            refresh = bool(unknown) and time.monotonic() - self._known_at >= self.timeout
+        if refresh:
+            self._refresh_devices()
+        if not unknown:
+            return list(equipment_ids)
+        with self._lock:
+            known = [equipment_id for equipment_id in equipment_ids if equipment_id in self._known]
+            dropped = len(equipment_ids) - len(known)
+            self._dropped += dropped
+        if dropped:
+            logger.warning(f"丢弃{dropped}条未知设备的心跳")
+        return known
+
+    def record(self, equipment_id, heartbeat_time=None):
+        """
+        记录一次心跳（仅内存操作）
+        :return: True 表示设备由离线变为在线
+        """
+        return bool(self.record_many([equipment_id], heartbeat_time))
+
+    def record_many(self, equipment_ids, heartbeat_time=None):
+        """
+        批量记录心跳
+        :return: 由离线变为在线的设备ID列表
+        """
+        self._ensure_loaded()
+        equipment_ids = self._filter_known(equipment_ids)
+        if not equipment_ids:
+            return []
+        heartbeat_time = heartbeat_time or datetime.now()
+        mono_now = time.monotonic()
+        came_online = []
+        with self._lock:
+            for equipment_id in equipment_ids:
+                self._last_seen[equipment_id] = mono_now
+                self._last_heartbeat[equipment_id] = heartbeat_time
+                self._pending[equipment_id] = heartbeat_time
+                self._pending_offline.discard(equipment_id)
+                self._deadlines.set_deadline(equipment_id, mono_now + self.timeout)
+                if equipment_id not in self._online:
+                    self._online.add(equipment_id)
+                    came_online.append(equipment_id)
+            self._version += 1
+        for equipment_id in came_online:
+            self._notify(equipment_id, '在线', heartbeat_time)
+        return came_online
+
+    def start(self):
+        """加载心跳表并启动到期判定线程"""
+        self._ensure_loaded()
+        self._deadlines.start()
+
+    def add_listener(self, callback):
+        """注册状态变化回调 callback(设备ID, 在线状态, 最后心跳时间)"""
+        self._listeners.append(callback)
+
+    def _on_deadline(self, equipment_id):
+        """DeadlineTracker 到期回调：心跳超时，标记离线（写库在 flush 中进行）"""
+        with self._lock:
+            last_seen = self._last_seen.get(equipment_id)
+            if last_seen is not None and last_seen + self.timeout > time.monotonic():
+                return  # 到期判定与新心跳并发，已续期
+            if equipment_id not in self._online:
+                return
+            self._online.discard(equipment_id)
+            self._pending_offline.add(equipment_id)
+            self._version += 1
+            last_heartbeat = self._last_heartbeat.get(equipment_id)
+        logger.info(f"设备{equipment_id}心跳超时，标记离线")
+        self._notify(equipment_id, '离线', last_heartbeat)
+
+    def _notify(self, equipment_id, online_status, last_heartbeat):
+        for callback in self._listeners:
+            try:
+                callback(equipment_id, online_status, last_heartbeat)
+            except Exception as e:
+                logger.error(f"设备状态变化通知失败：{str(e)}")
+
+    def reconcile(self):
+        """
+        从库中读回最近 timeout 秒内的心跳（一条查询），比内存新的按外部心跳处理：续期，离线设备恢复在线
+        外部心跳已在库中，不再加入待写队列
+        :return: 恢复在线的设备ID列表
+        """
+        self._ensure_loaded()
+        now = datetime.now()
+        rows = Equipment.get_recent_heartbeats(now - timedelta(seconds=self.timeout))
+        mono_now = time.monotonic()
+        came_online = []
+        with self._lock:
+            for equipment_id, last_heartbeat in rows:
+                if equipment_id not in self._known:
+                    continue
+                current = self._last_heartbeat.get(equipment_id)
+                if current is not None and current >= last_heartbeat:
+                    continue  # 本进程的心跳（或更新的心跳）
+                last_seen = mono_now - (now - last_heartbeat).total_seconds()
+                self._last_seen[equipment_id] = last_seen
+                self._last_heartbeat[equipment_id] = last_heartbeat
+                self._pending_offline.discard(equipment_id)
+                self._deadlines.set_deadline(equipment_id, last_seen + self.timeout)
+                self._reconciled += 1
+                self._version += 1
+                if equipment_id not in self._online:
+                    self._online.add(equipment_id)
+                    came_online.append((equipment_id, last_heartbeat))
+        for equipment_id, last_heartbeat in came_online:
+            self._notify(equipment_id, '在线', last_heartbeat)
+        return [equipment_id for equipment_id, _ in came_online]
+
+    def flush(self):
+        """
+        先从库中读回其他进程写入的心跳（见 reconcile），再把累积的心跳和离线标记写入数据库
+        （心跳一条UPDATE，离线一条UPDATE）；读回在前，已被外部心跳续期的设备不会被写成离线
+        :return: (写入心跳的设备数, 标记离线的设备数)
+        """
+        try:
+            self.reconcile()
+        except Exception as e:
+            logger.error(f"读回数据库心跳失败：{str(e)}")
+        with self._lock:
+            heartbeats = self._pending
+            offline = self._pending_offline
+            self._pending = {}
+            self._pending_offline = set()
+        if not heartbeats and not offline:
+            return 0, 0
+
+        try:
+            # 先写心跳再写离线：同一周期内先在线后超时的设备最终为离线
+            Equipment.bulk_update_heartbeats(heartbeats)
+            Equipment.bulk_set_offline(offline)
+        except Exception as e:
+            logger.error(f"心跳批量写入失败：{str(e)}")
+            # 放回待写队列，下个周期重试（期间的新心跳优先）
+            with self._lock:
+                for equipment_id, heartbeat_time in heartbeats.items():
+                    self._pending.setdefault(equipment_id, heartbeat_time)
+                self._pending_offline |= offline - self._online
+            return 0, 0
+        logger.debug(f"心跳批量写入：{len(heartbeats)}台设备，离线{len(offline)}台")
+        return len(heartbeats), len(offline)
+
+    def is_online(self, equipment_id):
+        self._ensure_loaded()
+        with self._lock:
+            return equipment_id in self._online
+
+    def last_heartbeat(self, equipment_id):
+        """内存中的最后心跳时间（可能尚未写库），未收到过心跳返回 None"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._last_heartbeat.get(equipment_id)
+
+    def version(self):
+        """心跳表版本号：心跳时间或在线状态变化时改变"""
+        return self._version
+
+    def online_count(self):
+        """内存中判定为在线的设备数"""
+        self._ensure_loaded()
+        with self._lock:
+            return len(self._online)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'known': len(self._known),
+                'tracked': len(self._last_seen),
+                'online': len(self._online),
+                'pending': len(self._pending),
+                'pending_offline': len(self._pending_offline),
+                'reconciled': self._reconciled,
+                'dropped': self._dropped
+            }
+
+
+# 全局心跳表（进程内单例）
+heartbeat_tracker = HeartbeatTracker()
+
+# 设备增删时重新读取设备列表
+reference_cache.add_listener('equipment', heartbeat_tracker.invalidate_devices)
@@ -0,0 +1,103 @@
+# services/import_service.py
+from utils.db import get_db_connection
+from utils.logger import logger
+from services.ingest_service import IngestService, MAX_MON_VALUE
+
+# 导入文件必须包含的列（与下载模板一致）
+REQUIRED_COLUMNS = ['监测时间', '监测点名称', '传感器类型', '监测值', '单位', '正常范围', '采集人']
+
+# 视为"无采集人"的取值（导出文件中的占位文本）
+EMPTY_COLLECTOR_NAMES = {'', 'nan', '系统自动采集', '未知采集人'}
+
+
+class ImportService:
+    @staticmethod
+    def read_file(file):
+        """读取上传的Excel/CSV文件为DataFrame（只读取需要的列）"""
+        import pandas as pd
+
+        filename = (getattr(file, 'filename', '') or '').lower()
+        if filename.endswith('.csv'):
+            return pd.read_csv(file, encoding='utf-8-sig', dtype={'监测点名称': str, '采集人': str})
+        return pd.read_excel(file, dtype={'监测点名称': str, '采集人': str})
+
+    @staticmethod
+    def _lookup_ids(table, names):
+        """按名称批量查询ID（一次查询），返回 ({名称: ID}, {重名的名称})"""
+        if not names:
+            return {}, set()
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"SELECT ID, Name FROM DEV.{table} WHERE Name = ANY(?)", (list(names),))
+            mapping = {}
+            duplicated = set()
+            for row in cursor.fetchall():
+                name = row[1].strip() if row[1] else ''
+                if name in mapping:
+                    duplicated.add(name)
+                mapping[name] = row[0]
+            return mapping, duplicated
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def import_dataframe(df):
+        """
+        校验并导入历史数据（按列向量化校验，合法行通过 COPY 批量写入）
+        :return: dict - success（导入条数）、skipped（跳过条数）、errors（[{'row': Excel行号, 'reason'}]）
+        """
+        import pandas as pd
+
+        missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f'Excel文件缺少必要的列：{"、".join(missing)}')
+
+        # Excel行号 = 数据序号 + 2（第1行为表头）
+        excel_rows = pd.Series(range(2, len(df) + 2), index=df.index)
+        reasons = pd.Series('', index=df.index)
+
+        def reject(mask, reason):
+            # 每行只记录第一个错误
+            target = mask & (reasons == '')
+            reasons[target] = reason
+
+        # 1. 时间、数值按列解析
+        mon_dates = pd.to_datetime(df['监测时间'], errors='coerce')
+        reject(mon_dates.isna(), '监测时间格式错误')
+        values = pd.to_numeric(df['监测值'], errors='coerce')
+        reject(values.isna(), '监测值不是有效数字')
+        reject(values.abs() >= MAX_MON_VALUE, '监测值超出范围')
+
+        # 2. 监测点名称 → ID（一次查询）
+        point_names = df['监测点名称'].fillna('').astype(str).str.strip()
+        point_map, point_dups = ImportService._lookup_ids('Dev_Moni_Point', set(point_names) - {''})
+        point_ids = point_names.map(point_map)
+        reject(point_names == '', '监测点名称不能为空')
+        reject(point_names.isin(point_dups), '监测点名称重复，无法确定监测点')
+        reject(point_ids.isna(), '监测点不存在')
+
+        # 3. 采集人 → ID（一次查询），为空表示系统自动采集
+        collector_names = df['采集人'].fillna('').astype(str).str.strip()
+        no_collector = collector_names.isin(EMPTY_COLLECTOR_NAMES)
+        collector_map, collector_dups = ImportService._lookup_ids(
+            'Dev_Person', set(collector_names[~no_collector]))
+        collector_ids = collector_names.map(collector_map)
+        reject(~no_collector & collector_names.isin(collector_dups), '采集人重名，无法确定采集人')
+        reject(~no_collector & collector_ids.isna(), '采集人不存在')
+
+        # 4. 合法行批量写入
+        valid = reasons == ''
+        rows = list(zip(
+            point_ids[valid].astype('int64').tolist(),
+            mon_dates[valid].dt.to_pydatetime(),
+            values[valid].astype(float).tolist(),
+            [None if pd.isna(c) else int(c) for c in collector_ids[valid]]
+        ))
+        inserted = IngestService.bulk_insert(rows)
+
+        errors = [{'row': int(row), 'reason': reason}
+                  for row, reason in zip(excel_rows[~valid], reasons[~valid])]
+        logger.info(f"导入历史数据：成功{len(inserted)}条，跳过{len(errors)}条")
+        return {'success': len(inserted), 'skipped': len(errors), 'errors': errors}
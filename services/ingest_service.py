@@ -0,0 +1,244 @@
+# services/ingest_service.py
+import io
+import json
+import math
+from datetime import datetime
+from utils.db import get_db_connection, copy_supported
+from utils.id_allocator import id_allocator
+from utils.logger import logger
+from config import INGEST_MAX_BATCH
+
+# DECIMAL(10,4) 能表示的最大绝对值
+MAX_MON_VALUE = 10 ** 6
+
+
+class IngestService:
+    @staticmethod
+    def parse_payload(body, content_type=''):
+        """
+        解析网关推送的数据
+        - application/x-ndjson：每行一个JSON对象
+        - application/json：JSON数组，或 {"readings": [...]}
+        :return: (readings列表, 解析失败的行[{'index', 'reason'}])
+        """
+        text = body.decode('utf-8-sig') if isinstance(body, bytes) else body
+        readings = []
+        rejects = []
+
+        if 'ndjson' in (content_type or ''):
+            index = 0
+            for line in text.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    readings.append(json.loads(line))
+                except ValueError as e:
+                    readings.append(None)
+                    rejects.append({'index': index, 'reason': f'JSON格式错误：{str(e)}'})
+                index += 1
+            return readings, rejects
+
+        data = json.loads(text) if text.strip() else []
+        if isinstance(data, dict):
+            data = data.get('readings', [])
+        if not isinstance(data, list):
+            raise ValueError('数据格式错误：需为JSON数组或 {"readings": [...]}')
+        return data, rejects
+
+    @staticmethod
+    def _parse_mon_date(value):
+        """解析采集时间：ISO 8601 字符串或 Unix 时间戳（秒），带时区的转换为本地时间"""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            try:
+                return datetime.fromtimestamp(value)
+            except (OverflowError, OSError, ValueError):
+                raise ValueError(f'采集时间超出范围：{value}')
+        if isinstance(value, str) and value.strip():
+            text = value.strip()
+            if text.endswith('Z'):
+                text = text[:-1] + '+00:00'
+            dt = datetime.fromisoformat(text)
+            if dt.tzinfo is not None:
+                dt = dt.astimezone().replace(tzinfo=None)
+            return dt
+        raise ValueError('采集时间不能为空')
+
+    @staticmethod
+    def _parse_id(value, label):
+        """解析ID：整数或整数字符串，带小数的数值不截断，直接拒绝"""
+        if isinstance(value, bool):
+            raise ValueError(f'{label}格式错误：{value}')
+        if isinstance(value, float):
+            if not value.is_integer():
+                raise ValueError(f'{label}必须为整数：{value}')
+            return int(value)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{label}必须为整数：{value}')
+
+    @staticmethod
+    def _pick(reading, *names):
+        for name in names:
+            if name in reading:
+                return reading[name]
+        return None
+
+    @staticmethod
+    def validate(readings):
+        """
+        逐行校验采集数据（监测点/采集人是否存在各用一次查询）
+        :param readings: dict列表，字段 mon_id、mon_date、value（或 mon_value），可选 collector_id
+        :return: (合法行[(mon_id, mon_date, mon_value, collector_id, 原始序号)], 拒绝行[{'index', 'reason'}])
+        """
+        parsed = []
+        rejects = []
+        for index, reading in enumerate(readings):
+            if reading is None:
+                continue  # 解析阶段已记录错误
+            if not isinstance(reading, dict):
+                rejects.append({'index': index, 'reason': '记录格式错误：需为JSON对象'})
+                continue
+            try:
+                mon_id = IngestService._pick(reading, 'mon_id', 'Mon_ID')
+                if mon_id in (None, ''):
+                    raise ValueError('监测点ID不能为空')
+                mon_id = IngestService._parse_id(mon_id, '监测点ID')
+                mon_date = IngestService._parse_mon_date(IngestService._pick(reading, 'mon_date', 'Mon_Date'))
+                raw_value = IngestService._pick(reading, 'value', 'mon_value', 'Mon_value')
+                if raw_value is None or isinstance(raw_value, bool):
+                    raise ValueError('采集值不能为空')
+                mon_value = float(raw_value)
+                if not math.isfinite(mon_value) or abs(mon_value) >= MAX_MON_VALUE:
+                    raise ValueError(f'采集值超出范围：{raw_value}')
+                collector_id = IngestService._pick(reading, 'collector_id', 'Collector_ID')
+                collector_id = (IngestService._parse_id(collector_id, '采集人ID')
+                                if collector_id not in (None, '') else None)
+            except (TypeError, ValueError, OverflowError, OSError) as e:
+                rejects.append({'index': index, 'reason': str(e) or '字段格式错误'})
+                continue
+            parsed.append((mon_id, mon_date, mon_value, collector_id, index))
+
+        if not parsed:
+            return [], rejects
+
+        # 监测点、采集人存在性校验：各一次 ANY 查询
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT ID FROM DEV.Dev_Moni_Point WHERE ID = ANY(?)",
+                           (list({row[0] for row in parsed}),))
+            point_ids = {row[0] for row in cursor.fetchall()}
+            collector_ids = list({row[3] for row in parsed if row[3] is not None})
+            person_ids = set()
+            if collector_ids:
+                cursor.execute("SELECT ID FROM DEV.Dev_Person WHERE ID = ANY(?)", (collector_ids,))
+                person_ids = {row[0] for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+        valid = []
+        for row in parsed:
+            if row[0] not in point_ids:
+                rejects.append({'index': row[4], 'reason': f'监测点不存在：{row[0]}'})
+            elif row[3] is not None and row[3] not in person_ids:
+                rejects.append({'index': row[4], 'reason': f'采集人不存在：{row[3]}'})
+            else:
+                valid.append(row)
+        rejects.sort(key=lambda r: r['index'])
+        return valid, rejects
+
+    @staticmethod
+    def bulk_insert(rows):
+        """
+        在一个事务内批量写入已校验的采集数据（COPY FROM STDIN，不支持 COPY 时用多行 INSERT）
+        :param rows: [(mon_id, mon_date, mon_value, collector_id, ...)]
+        :return: 写入的记录 [(ID, mon_id, mon_date, mon_value, collector_id)]
+        """
+        from psycopg2.extras import execute_values
+
+        if not rows:
+            return []
+
+        # 补建批次中缺少的月份分区（补录的历史数据可能落在未创建的月份）
+        from services.partition_service import partition_manager
+        partition_manager.ensure_months(row[1] for row in rows)
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            # 整批ID从序列分段分配（通常不访问数据库），并发写入不再锁表
+            ids = id_allocator.reserve('Dev_Moni_Data', len(rows), cursor)
+            inserted = [(data_id, row[0], row[1], row[2], row[3]) for data_id, row in zip(ids, rows)]
+            if copy_supported():
+                buffer = io.StringIO()
+                for data_id, mon_id, mon_date, mon_value, collector_id in inserted:
+                    buffer.write(f"{data_id},{mon_date.isoformat(sep=' ')},{mon_id},{mon_value!r},"
+                                 f"{'' if collector_id is None else collector_id}\n")
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY DEV.Dev_Moni_Data (ID, Mon_Date, Mon_ID, Mon_value, Collector_ID) FROM STDIN WITH (FORMAT csv)",
+                    buffer
+                )
+            else:
+                # 启用 eventlet 等待回调后不支持 COPY，改为多行 INSERT
+                execute_values(
+                    cursor,
+                    "INSERT INTO DEV.Dev_Moni_Data (ID, Mon_Date, Mon_ID, Mon_value, Collector_ID) VALUES %s",
+                    [(row[0], row[2], row[1], row[3], row[4]) for row in inserted],
+                    page_size=1000
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+        IngestService.after_insert(inserted)
+        return inserted
+
+    @staticmethod
+    def after_insert(inserted):
+        """
+        新数据写入后的处理（监测点最新值、汇总表增量更新、阈值报警判定、实时看板推送），
+        失败只记录日志，不影响已写入的数据
+        :param inserted: [(ID, mon_id, mon_date, mon_value, collector_id)]
+        """
+        from services.latest_service import latest_store
+        from services.rollup_service import RollupService
+        from services.threshold_service import threshold_engine
+        from services.dashboard_service import dashboard_publisher
+        readings = [(row[1], row[2], row[3]) for row in inserted]
+        try:
+            latest_store.update(inserted)
+        except Exception as e:
+            logger.error(f"监测点最新值更新失败：{str(e)}")
+        try:
+            RollupService.apply(readings)
+        except Exception as e:
+            logger.error(f"汇总数据更新失败（可用 rollup_cli.py rebuild 重算）：{str(e)}")
+        try:
+            threshold_engine.evaluate(readings)
+        except Exception as e:
+            logger.error(f"阈值报警判定失败：{str(e)}")
+        dashboard_publisher.publish_readings(readings)
+
+    @staticmethod
+    def ingest(readings, parse_rejects=None):
+        """
+        校验并批量写入采集数据
+        :param parse_rejects: parse_payload 阶段已拒绝的行（对应 readings 中的 None）
+        :return: dict - accepted（写入条数）、rejected（拒绝行及原因）
+        """
+        if len(readings) > INGEST_MAX_BATCH:
+            raise ValueError(f"单次最多写入{INGEST_MAX_BATCH}条数据，本次{len(readings)}条")
+
+        valid, rejects = IngestService.validate(readings)
+        if parse_rejects:
+            rejects = sorted(parse_rejects + rejects, key=lambda r: r['index'])
+        inserted = IngestService.bulk_insert(valid)
+        logger.info(f"批量写入采集数据：成功{len(inserted)}条，拒绝{len(rejects)}条")
+        return {'accepted': len(inserted), 'rejected': rejects}
@@ -0,0 +1,159 @@
+# services/latest_service.py
+import threading
+from utils.cache import reference_cache
+from utils.db import get_db_connection
+from utils.logger import logger
+
+
+class LatestValueStore:
+    """
+    监测点最新采集值
+    - 内存中保存 监测点ID → (记录ID, 采集时间, 采集值, 采集人ID)，同时持久化到 Dev_Moni_Latest 表
+    - 采集数据写入后由 IngestService.after_insert 调用 update()，只保留每个监测点时间最新的一条
+    - warm() 用一条 DISTINCT ON (Mon_ID) 查询从原始数据重建（同时回写 Dev_Moni_Latest），启动时由定时任务调度器执行
+    - get_by_equipment() 按设备取全部监测点的最新值，只查内存
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._values = {}  # 监测点ID -> (记录ID, 采集时间, 采集值, 采集人ID)
+        self._equipment_points = None  # 设备ID -> [监测点ID]
+        self._loaded = False
+        self._version = 0  # 最新值每次写入数据库后加一（设备层级接口的 ETag 使用）
+
+    def _merge(self, mon_id, value):
+        """调用方持有锁：只接受时间不早于当前值的记录"""
+        current = self._values.get(mon_id)
+        if current is None or value[1] >= current[1]:
+            self._values[mon_id] = value
+
+    def warm(self, force=True):
+        """从 Dev_Moni_Data 重建最新值（每个监测点取 Mon_Date 最大的一条），并同步到 Dev_Moni_Latest"""
+        with self._load_lock:
+            if not force and self._loaded:
+                return
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.execute("""
+                    INSERT INTO DEV.Dev_Moni_Latest AS t (Mon_ID, Data_ID, Mon_Date, Mon_value, Collector_ID)
+                    SELECT DISTINCT ON (Mon_ID) Mon_ID, ID, Mon_Date, Mon_value, Collector_ID
+                    FROM DEV.Dev_Moni_Data
+                    ORDER BY Mon_ID, Mon_Date DESC, ID DESC
+                    ON CONFLICT (Mon_ID) DO UPDATE SET
+                        Data_ID = EXCLUDED.Data_ID,
+                        Mon_Date = EXCLUDED.Mon_Date,
+                        Mon_value = EXCLUDED.Mon_value,
+                        Collector_ID = EXCLUDED.Collector_ID
+                    WHERE EXCLUDED.Mon_Date >= t.Mon_Date
+                """)
+                cursor.execute("SELECT Mon_ID, Data_ID, Mon_Date, Mon_value, Collector_ID FROM DEV.Dev_Moni_Latest")
+                rows = cursor.fetchall()
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+                conn.close()
+            with self._lock:
+                # 加载期间 update() 写入的更新记录不会被覆盖
+                for row in rows:
+                    self._merge(row[0], tuple(row[1:]))
+                self._loaded = True
+                self._version += 1
+        logger.info(f"监测点最新值加载完成：{len(rows)}个监测点")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.warm(force=False)
+
+    def update(self, inserted):
+        """
+        新写入的采集数据 [(ID, mon_id, mon_date, mon_value, collector_id)]
+        每个监测点只取本批最新的一条，更新内存并写入 Dev_Moni_Latest
+        """
+        from psycopg2.extras import execute_values
+
+        newest = {}
+        for data_id, mon_id, mon_date, mon_value, collector_id in inserted:
+            current = newest.get(mon_id)
+            if current is None or mon_date >= current[1]:
+                newest[mon_id] = (data_id, mon_date, mon_value, collector_id)
+        if not newest:
+            return
+        with self._lock:
+            for mon_id, value in newest.items():
+                self._merge(mon_id, value)
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            execute_values(
+                cursor,
+                """
+                INSERT INTO DEV.Dev_Moni_Latest AS t (Mon_ID, Data_ID, Mon_Date, Mon_value, Collector_ID)
+                VALUES %s
+                ON CONFLICT (Mon_ID) DO UPDATE SET
+                    Data_ID = EXCLUDED.Data_ID,
+                    Mon_Date = EXCLUDED.Mon_Date,
+                    Mon_value = EXCLUDED.Mon_value,
+                    Collector_ID = EXCLUDED.Collector_ID
+                WHERE EXCLUDED.Mon_Date >= t.Mon_Date
+                """,
+                # 按主键排序写入，避免并发批次死锁
+                sorted((mon_id,) + value for mon_id, value in newest.items())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        # 提交后才加版本号：读到新版本号的请求一定能查到新值
+        with self._lock:
+            self._version += 1
+
+    def version(self):
+        """最新值版本号"""
+        return self._version
+
+    def get(self, mon_id):
+        """单个监测点的最新值，无数据返回 None"""
+        self._ensure_loaded()
+        with self._lock:
+            return self._values.get(mon_id)
+
+    def get_many(self, mon_ids):
+        """{监测点ID: 最新值}（不含无数据的监测点）"""
+        self._ensure_loaded()
+        with self._lock:
+            return {mon_id: self._values[mon_id] for mon_id in mon_ids if mon_id in self._values}
+
+    def get_by_equipment(self, equipment_id):
+        """设备下全部监测点的最新值 {监测点ID: 最新值}"""
+        points = self._equipment_points
+        if points is None:
+            from models.monitor_point import MonitorPoint
+            points = {}
+            for mon_id, (eq_id, _, _) in MonitorPoint.get_equipment_map().items():
+                points.setdefault(eq_id, []).append(mon_id)
+            self._equipment_points = points
+        return self.get_many(points.get(int(equipment_id), []))
+
+    def reset_points(self):
+        """监测点变更后调用：下次查询时重新加载设备→监测点映射"""
+        self._equipment_points = None
+
+    def stats(self):
+        with self._lock:
+            return {'loaded': self._loaded, 'points': len(self._values), 'version': self._version}
+
+
+# 全局最新值存储（进程内单例）
+latest_store = LatestValueStore()
+
+# 监测点变更时重新加载设备→监测点映射
+reference_cache.add_listener('monitor_point', latest_store.reset_points)
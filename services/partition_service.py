@@ -0,0 +1,269 @@
+# services/partition_service.py
+import re
+import threading
+from datetime import datetime, timedelta
+from utils.db import get_db_connection
+from utils.logger import logger
+from config import PARTITION_CONFIG
+
+PARENT_TABLE = 'DEV.Dev_Moni_Data'
+LEGACY_TABLE = 'Dev_Moni_Data_legacy'
+
+# pg_get_expr(relpartbound) 的结果，如 FOR VALUES FROM ('2024-05-01 00:00:00') TO ('2024-06-01 00:00:00')
+_BOUND_RE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def _month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _parse_bound(text):
+    """分区边界值：MINVALUE/MAXVALUE 返回 None，否则返回 datetime"""
+    text = text.strip()
+    if text in ('MINVALUE', 'MAXVALUE'):
+        return None
+    return datetime.strptime(text.strip("'")[:19], '%Y-%m-%d %H:%M:%S')
+
+
+class PartitionManager:
+    """
+    采集数据表（Dev_Moni_Data）按月范围分区管理
+    - 每月一个分区 Dev_Moni_Data_pYYYYMM，按 Mon_Date 划分 [月初, 下月初)
+    - maintain() 提前创建未来 months_ahead 个月的分区，并按 retention_months 删除过期分区
+      （先 DETACH 再 DROP，代替按行 DELETE）
+    - ensure_months() 在写入前为批次中的月份补建分区（已存在的月份只查内存，不访问数据库）
+    - migrate() 把原有的普通表在线转换为分区表：原表整体挂载为最早的一个分区
+    带日期条件的查询（Mon_Date >= ? AND Mon_Date <= ?）由数据库按分区裁剪
+    """
+
+    def __init__(self, months_ahead=3, retention_months=None):
+        self.months_ahead = months_ahead
+        self.retention_months = retention_months
+        self._lock = threading.Lock()
+        self._partitioned = None  # None 表示尚未检查
+        self._ranges = []  # [(分区名, 下界, 上界)]，None 表示无界
+
+    # ---------- 分区信息 ----------
+    def refresh(self, cursor=None):
+        """从系统表重新读取分区列表"""
+        own_cursor = cursor is None
+        conn = None
+        if own_cursor:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT to_regclass('dev.dev_moni_data') IN (SELECT partrelid FROM pg_partitioned_table)")
+            partitioned = bool(cursor.fetchone()[0])
+            ranges = []
+            if partitioned:
+                cursor.execute("""
+                    SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+                    FROM pg_inherits i
+                    JOIN pg_class c ON c.oid = i.inhrelid
+                    WHERE i.inhparent = 'dev.dev_moni_data'::regclass
+                """)
+                for name, bound in cursor.fetchall():
+                    match = _BOUND_RE.search(bound or '')
+                    if match:
+                        ranges.append((name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+                ranges.sort(key=lambda r: r[1] or datetime.min)
+        finally:
+            if own_cursor:
+                cursor.close()
+                conn.close()
+        with self._lock:
+            self._partitioned = partitioned
+            self._ranges = ranges
+        return ranges
+
+    def is_partitioned(self):
+        if self._partitioned is None:
+            self.refresh()
+        return self._partitioned
+
+    def list_partitions(self):
+        """[(分区名, 下界, 上界)]"""
+        self.refresh()
+        return list(self._ranges)
+
+    def _covered(self, month):
+        for _, lower, upper in self._ranges:
+            if (lower is None or lower <= month) and (upper is None or month < upper):
+                return True
+        return False
+
+    # ---------- 创建分区 ----------
+    @staticmethod
+    def partition_name(month):
+        return f"Dev_Moni_Data_p{month.strftime('%Y%m')}"
+
+    def _create_partition(self, cursor, month):
+        name = self.partition_name(month)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS DEV.{name} PARTITION OF {PARENT_TABLE} "
+            f"FOR VALUES FROM (?) TO (?)",
+            (month, _add_months(month, 1))
+        )
+        return name
+
+    def ensure_months(self, months):
+        """
+        确保给定月份（任意日期，按所在月计算）都有分区，返回新建的分区名
+        未转换为分区表时不做任何事
+        """
+        if not self.is_partitioned():
+            return []
+        with self._lock:
+            missing = sorted({_month_start(m) for m in months})
+            missing = [m for m in missing if not self._covered(m)]
+        if not missing:
+            return []
+
+        created = []
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            for month in missing:
+                created.append(self._create_partition(cursor, month))
+            conn.commit()
+            self.refresh(cursor)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        logger.info(f"新建采集数据分区：{created}")
+        return created
+
+    # ---------- 保留策略 ----------
+    def apply_retention(self, now=None):
+        """
+        删除整月都早于保留期的分区，返回删除的分区名
+        PostgreSQL 14 及以上使用 DETACH PARTITION CONCURRENTLY，分离期间不阻塞写入
+        """
+        if not self.retention_months or not self.is_partitioned():
+            return []
+        cutoff = _add_months(_month_start(now or datetime.now()), -self.retention_months)
+        expired = [name for name, _, upper in self.refresh() if upper is not None and upper <= cutoff]
+        if not expired:
+            return []
+
+        dropped = []
+        conn = get_db_connection()
+        raw = conn.raw
+        cursor = conn.cursor()
+        try:
+            concurrently = ' CONCURRENTLY' if raw.server_version >= 140000 else ''
+            # DETACH ... CONCURRENTLY 不能在事务块中执行
+            conn.rollback()
+            raw.autocommit = True
+            for name in expired:
+                try:
+                    cursor.execute(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION DEV.{name}{concurrently}")
+                    cursor.execute(f"DROP TABLE DEV.{name}")
+                    dropped.append(name)
+                except Exception as e:
+                    logger.error(f"删除过期分区 {name} 失败：{str(e)}")
+        finally:
+            raw.autocommit = False
+            cursor.close()
+            conn.close()
+        self.refresh()
+        logger.info(f"删除过期采集数据分区（早于{cutoff:%Y-%m}）：{dropped}")
+        return dropped
+
+    def maintain(self, now=None):
+        """定时任务：提前创建未来分区，删除过期分区"""
+        if not self.is_partitioned():
+            return {'created': [], 'dropped': []}
+        current = _month_start(now or datetime.now())
+        created = self.ensure_months(_add_months(current, i) for i in range(self.months_ahead + 1))
+        dropped = self.apply_retention(now)
+        return {'created': created, 'dropped': dropped}
+
+    # ---------- 在线迁移 ----------
+    def migrate(self, now=None):
+        """
+        把普通表 Dev_Moni_Data 在线转换为按月分区表
+        1. 并发建立 (ID, Mon_Date) 唯一索引、添加并校验范围 CHECK 约束（均不阻塞读写）
+        2. 一个短事务内：原表改名为 Dev_Moni_Data_legacy，新建同名分区表，
+           原表作为 [MINVALUE, 切换月份) 分区挂载（有已校验的 CHECK 约束，挂载时不再全表扫描），
+           再创建切换月份起的按月分区
+        原有数据不复制；legacy 分区整体过期后由保留策略删除
+        """
+        if self.is_partitioned():
+            logger.info("采集数据表已是分区表，无需迁移")
+            return False
+
+        now = now or datetime.now()
+        # 切换月份：下个月初（距月底不足1天时再推后一个月，避免迁移期间写入跨过边界）
+        next_month = _add_months(_month_start(now), 1)
+        switch = next_month if next_month - now > timedelta(days=1) else _add_months(next_month, 1)
+        conn = get_db_connection()
+        raw = conn.raw
+        cursor = conn.cursor()
+        try:
+            conn.rollback()
+            raw.autocommit = True
+            cursor.execute(
+                "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS UQ_MoniData_ID_Date "
+                f"ON {PARENT_TABLE} (ID, Mon_Date)"
+            )
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} DROP CONSTRAINT IF EXISTS CK_MoniData_Legacy_Range")
+            cursor.execute(
+                f"ALTER TABLE {PARENT_TABLE} ADD CONSTRAINT CK_MoniData_Legacy_Range "
+                "CHECK (Mon_Date IS NOT NULL AND Mon_Date < ?) NOT VALID",
+                (switch,)
+            )
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} VALIDATE CONSTRAINT CK_MoniData_Legacy_Range")
+            raw.autocommit = False
+
+            cursor.execute(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(f"ALTER TABLE {PARENT_TABLE} RENAME TO {LEGACY_TABLE}")
+            cursor.execute(f"""
+                CREATE TABLE {PARENT_TABLE} (
+                    ID BIGINT NOT NULL,
+                    Mon_Date TIMESTAMP NOT NULL,
+                    Mon_ID BIGINT NOT NULL,
+                    Mon_value DECIMAL(10,4) NOT NULL,
+                    Collector_ID BIGINT NULL,
+                    CONSTRAINT PK_MoniData PRIMARY KEY (ID, Mon_Date),
+                    CONSTRAINT FK_Data_MoniPoint_P FOREIGN KEY (Mon_ID) REFERENCES DEV.Dev_Moni_Point(ID),
+                    CONSTRAINT FK_Data_Person_P FOREIGN KEY (Collector_ID) REFERENCES DEV.Dev_Person(ID)
+                ) PARTITION BY RANGE (Mon_Date)
+            """)
+            cursor.execute(f"CREATE INDEX IDX_MoniDataP_MonID_Date ON {PARENT_TABLE} (Mon_ID, Mon_Date)")
+            # 新表沿用ID序列默认值（已执行 id_sequence_cli.py migrate 时）
+            from utils.id_allocator import IdAllocator
+            IdAllocator.attach(cursor, 'Dev_Moni_Data')
+            cursor.execute(
+                f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION DEV.{LEGACY_TABLE} FOR VALUES FROM (MINVALUE) TO (?)",
+                (switch,)
+            )
+            for i in range(self.months_ahead + 1):
+                self._create_partition(cursor, _add_months(switch, i))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            raw.autocommit = False
+            cursor.close()
+            conn.close()
+
+        self.refresh()
+        logger.info(f"采集数据表已转换为按月分区表，{switch:%Y-%m} 之前的数据位于 {LEGACY_TABLE} 分区")
+        return True
+
+
+# 全局分区管理器（进程内单例）
+partition_manager = PartitionManager(
+    months_ahead=PARTITION_CONFIG['months_ahead'],
+    retention_months=PARTITION_CONFIG['retention_months']
+)
@@ -0,0 +1,409 @@
+# services/provision_service.py
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from utils.db import get_db_connection
+from utils.id_allocator import id_allocator
+from utils.cache import invalidate
+from utils.logger import logger
+
+# CSV 列名（每行一个监测点；设备、部件列在各行重复填写，不填部件名称/监测点名称的行只新增设备/部件）
+CSV_COLUMNS = {
+    '车间': 'workshop',
+    '设备编码': 'equip_code',
+    '设备名称': 'equip_name',
+    '负责人ID': 'person_id',
+    '购买日期': 'pur_date',
+    '投用日期': 'first_time',
+    '使用状态': 'use_state',
+    '部件名称': 'part_name',
+    '部件描述': 'description',
+    '监测点名称': 'point_name',
+    '传感类型': 'sense_type',
+    '采样周期': 'sample_period',
+    '采样频率': 'sample_freq',
+    '采样时长': 'sample_long',
+    '单位': 'unit',
+    '管理员ID': 'admin_id',
+    '正常最小值': 'min_val',
+    '正常最大值': 'max_val',
+    '备注': 'note'
+}
+REQUIRED_CSV_COLUMNS = ['车间', '设备编码', '设备名称', '负责人ID', '购买日期', '投用日期']
+
+USE_STATES = ('在用', '在库', '停用')
+MAX_ERRORS = 200
+# Dev_Normal_Val.Min_Val/Max_Val 为 DECIMAL(10,4)
+MAX_RANGE_VALUE = Decimal('1000000')
+
+
+def _text(value):
+    return '' if value is None else str(value).strip()
+
+
+class _Plan:
+    """校验通过后待写入的记录（下标即同表内的顺序，写入前统一分配ID）"""
+
+    def __init__(self):
+        self.workshops = []  # [名称]
+        self.equipment = []  # [(车间名称, 设备编码, 名称, 负责人ID, 购买日期, 投用日期, 使用状态)]
+        self.parts = []  # [(设备下标, 部件名称, 描述)]
+        self.points = []  # [(部件下标, 名称, 传感类型ID, 采样周期, 采样频率, 采样时长, 单位, 管理员ID)]
+        self.ranges = []  # [(监测点下标, 最小值, 最大值, 备注)]
+
+    def counts(self):
+        return {
+            'workshops': len(self.workshops),
+            'equipment': len(self.equipment),
+            'parts': len(self.parts),
+            'monitor_points': len(self.points),
+            'normal_ranges': len(self.ranges)
+        }
+
+
+class ProvisionService:
+    """
+    基础信息批量导入：车间 → 设备 → 部件 → 监测点 → 正常值范围
+    - 先整体校验（车间、负责人、传感类型取自基础数据缓存，设备编码一次查询查重），有错误时一条都不写入
+    - 校验通过后按表一次性分配ID（utils.id_allocator），在一个事务内用多行 INSERT 批量写入
+    - 写入后清空基础数据缓存，阈值报警、最新值、看板等监听者随之重新加载监测点
+    树形结构（JSON）：
+      {"workshops": [{"name": "车间", "equipment": [{"equip_code", "name", "person_id", "pur_date", "first_time",
+        "use_state", "parts": [{"part_name", "description", "monitor_points": [{"name", "sense_type", "sample_period",
+        "sample_freq", "sample_long", "unit", "admin_id", "normal_range": {"min_val", "max_val", "note"}}]}]}]}]}
+    CSV 文件按 CSV_COLUMNS 每行一个监测点，读取后转换为同样的树形结构
+    """
+
+    # ---------- 读取 ----------
+    @staticmethod
+    def read_file(file):
+        """读取上传的 JSON/CSV 文件为树形结构"""
+        filename = (getattr(file, 'filename', None) or getattr(file, 'name', '') or '').lower()
+        data = file.read()
+        if isinstance(data, bytes):
+            data = data.decode('utf-8-sig')
+        if filename.endswith('.csv'):
+            return ProvisionService.parse_csv(data)
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            raise ValueError(f'JSON格式错误：{str(e)}')
+
+    @staticmethod
+    def parse_csv(text):
+        """CSV（每行一个监测点）转换为树形结构，同一车间/设备编码/部件名称的行合并"""
+        reader = csv.DictReader(io.StringIO(text))
+        missing = [col for col in REQUIRED_CSV_COLUMNS if col not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f'CSV文件缺少必要的列：{"、".join(missing)}')
+
+        workshops = {}
+        equipment = {}
+        parts = {}
+        for row in reader:
+            row = {key: _text(row.get(col)) for col, key in CSV_COLUMNS.items()}
+            if not any(row.values()):
+                continue
+            workshop = workshops.get(row['workshop'])
+            if workshop is None:
+                workshop = workshops[row['workshop']] = {'name': row['workshop'], 'equipment': []}
+            # 设备信息以该设备编码的第一行为准
+            equip = equipment.get(row['equip_code'])
+            if equip is None:
+                equip = equipment[row['equip_code']] = {
+                    'equip_code': row['equip_code'],
+                    'name': row['equip_name'],
+                    'person_id': row['person_id'],
+                    'pur_date': row['pur_date'],
+                    'first_time': row['first_time'],
+                    'use_state': row['use_state'],
+                    'parts': []
+                }
+                workshop['equipment'].append(equip)
+            if not row['part_name']:
+                continue
+            part_key = (row['equip_code'], row['part_name'])
+            part = parts.get(part_key)
+            if part is None:
+                part = parts[part_key] = {'part_name': row['part_name'], 'description': row['description'],
+                                          'monitor_points': []}
+                equip['parts'].append(part)
+            if not row['point_name']:
+                continue
+            point = {key: row[key] for key in ('sense_type', 'sample_period', 'sample_freq', 'sample_long',
+                                               'unit', 'admin_id')}
+            point['name'] = row['point_name']
+            if row['min_val'] or row['max_val']:
+                point['normal_range'] = {'min_val': row['min_val'], 'max_val': row['max_val'], 'note': row['note']}
+            part['monitor_points'].append(point)
+        return {'workshops': list(workshops.values())}
+
+    # ---------- 校验 ----------
+    @staticmethod
+    def _existing_equip_codes(codes):
+        """已存在的设备编码（一次查询）"""
+        if not codes:
+            return set()
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT Equip_Code FROM DEV.Dev_Main_Dev WHERE Equip_Code = ANY(?)", (list(codes),))
+            return {_text(row[0]) for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def validate(tree):
+        """
+        整体校验树形结构
+        :return: (_Plan, errors) - errors 为 [{'path': 位置, 'reason': 原因}]，最多 MAX_ERRORS 条
+        """
+        from models.workshop import Workshop
+        from models.staff import Staff
+        from models.sensor_type import SensorType
+
+        if isinstance(tree, list):
+            tree = {'workshops': tree}
+        if not isinstance(tree, dict) or not isinstance(tree.get('workshops'), list):
+            raise ValueError('导入内容必须包含 workshops 列表')
+
+        plan = _Plan()
+        errors = []
+
+        def error(path, reason):
+            if len(errors) < MAX_ERRORS:
+                errors.append({'path': path, 'reason': reason})
+
+        def text(item, key, path, label, max_len, required=True):
+            value = _text(item.get(key))
+            if required and not value:
+                error(path, f'{label}不能为空')
+            elif len(value) > max_len:
+                error(path, f'{label}超过{max_len}个字符')
+            return value
+
+        def positive_int(item, key, path, label):
+            try:
+                value = int(_text(item.get(key)))
+                if value > 0:
+                    return value
+            except ValueError:
+                pass
+            error(path, f'{label}必须为正整数')
+            return None
+
+        def date(item, key, path, label):
+            try:
+                return datetime.strptime(_text(item.get(key)), '%Y-%m-%d').date()
+            except ValueError:
+                error(path, f'{label}格式错误，应为YYYY-MM-DD')
+                return None
+
+        # 基础数据（缓存）
+        workshop_ids = {}
+        for ws in Workshop.get_all():
+            workshop_ids.setdefault(_text(ws.name), ws.id)
+        sensor_ids = {}
+        for sensor in SensorType.get_all():
+            sensor_ids[_text(sensor.name)] = sensor.id
+            sensor_ids[str(sensor.id)] = sensor.id
+
+        staff_refs = set()
+        codes = set()
+        for ws in tree['workshops']:
+            for equip in (ws.get('equipment') or []) if isinstance(ws, dict) else []:
+                if isinstance(equip, dict):
+                    staff_refs.add(_text(equip.get('person_id')))
+                    codes.add(_text(equip.get('equip_code')))
+                    for part in equip.get('parts') or []:
+                        for point in (part.get('monitor_points') or []) if isinstance(part, dict) else []:
+                            if isinstance(point, dict):
+                                staff_refs.add(_text(point.get('admin_id')))
+        staff = Staff.get_by_ids([int(r) for r in staff_refs if r.isdigit()])
+        staff_ids = {str(staff_id) for staff_id, person in staff.items() if person is not None}
+        existing_codes = ProvisionService._existing_equip_codes(codes - {''})
+
+        seen_codes = set()
+        for ws_index, ws in enumerate(tree['workshops']):
+            ws_path = f'车间[{ws_index + 1}]'
+            if not isinstance(ws, dict):
+                error(ws_path, '格式错误')
+                continue
+            ws_name = text(ws, 'name', ws_path, '车间名称', 30)
+            ws_path = f'车间[{ws_name}]'
+            if ws_name and ws_name not in workshop_ids and ws_name not in plan.workshops:
+                plan.workshops.append(ws_name)
+
+            for equip in ws.get('equipment') or []:
+                code = _text(equip.get('equip_code')) if isinstance(equip, dict) else ''
+                eq_path = f'{ws_path}/设备[{code}]'
+                if not isinstance(equip, dict):
+                    error(eq_path, '格式错误')
+                    continue
+                text(equip, 'equip_code', eq_path, '设备编码', 30)
+                if code in existing_codes:
+                    error(eq_path, '设备编码已存在')
+                elif code in seen_codes:
+                    error(eq_path, '设备编码重复')
+                seen_codes.add(code)
+                name = text(equip, 'name', eq_path, '设备名称', 30)
+                person_id = _text(equip.get('person_id'))
+                if person_id not in staff_ids:
+                    error(eq_path, f'负责人不存在：{person_id}')
+                pur_date = date(equip, 'pur_date', eq_path, '购买日期')
+                first_time = date(equip, 'first_time', eq_path, '投用日期')
+                use_state = _text(equip.get('use_state')) or '在用'
+                if use_state not in USE_STATES:
+                    error(eq_path, f'使用状态必须为{"/".join(USE_STATES)}')
+                equip_index = len(plan.equipment)
+                plan.equipment.append((ws_name, code, name, int(person_id) if person_id.isdigit() else None,
+                                       pur_date, first_time, use_state))
+
+                part_names = set()
+                for part in equip.get('parts') or []:
+                    part_name = _text(part.get('part_name')) if isinstance(part, dict) else ''
+                    part_path = f'{eq_path}/部件[{part_name}]'
+                    if not isinstance(part, dict):
+                        error(part_path, '格式错误')
+                        continue
+                    text(part, 'part_name', part_path, '部件名称', 30)
+                    if part_name in part_names:
+                        error(part_path, '同一设备下部件名称重复')
+                    part_names.add(part_name)
+                    description = text(part, 'description', part_path, '部件描述', 30, required=False)
+                    part_index = len(plan.parts)
+                    plan.parts.append((equip_index, part_name, description))
+
+                    point_names = set()
+                    for point in part.get('monitor_points') or []:
+                        point_name = _text(point.get('name')) if isinstance(point, dict) else ''
+                        pt_path = f'{part_path}/监测点[{point_name}]'
+                        if not isinstance(point, dict):
+                            error(pt_path, '格式错误')
+                            continue
+                        text(point, 'name', pt_path, '监测点名称', 30)
+                        if point_name in point_names:
+                            error(pt_path, '同一部件下监测点名称重复')
+                        point_names.add(point_name)
+                        sense_type = sensor_ids.get(_text(point.get('sense_type')))
+                        if sense_type is None:
+                            error(pt_path, f'传感类型不存在：{_text(point.get("sense_type"))}')
+                        admin_id = _text(point.get('admin_id'))
+                        if admin_id not in staff_ids:
+                            error(pt_path, f'管理员不存在：{admin_id}')
+                        point_index = len(plan.points)
+                        plan.points.append((
+                            part_index, point_name, sense_type,
+                            positive_int(point, 'sample_period', pt_path, '采样周期'),
+                            positive_int(point, 'sample_freq', pt_path, '采样频率'),
+                            positive_int(point, 'sample_long', pt_path, '采样时长'),
+                            text(point, 'unit', pt_path, '单位', 10),
+                            int(admin_id) if admin_id.isdigit() else None
+                        ))
+
+                        normal_range = point.get('normal_range')
+                        if not normal_range:
+                            continue
+                        try:
+                            min_val = Decimal(_text(normal_range.get('min_val')))
+                            max_val = Decimal(_text(normal_range.get('max_val')))
+                        except (InvalidOperation, AttributeError):
+                            error(pt_path, '正常值范围必须为数字')
+                            continue
+                        if not (min_val.is_finite() and max_val.is_finite()) or \
+                                max(abs(min_val), abs(max_val)) >= MAX_RANGE_VALUE:
+                            error(pt_path, '正常值范围超出允许值')
+                        elif min_val >= max_val:
+                            error(pt_path, '正常值最小值必须小于最大值')
+                        note = text(normal_range, 'note', pt_path, '备注', 50, required=False)
+                        plan.ranges.append((point_index, min_val, max_val, note or None))
+        return plan, errors
+
+    # ---------- 写入 ----------
+    @staticmethod
+    def _write(plan):
+        """一个事务内按表分配ID并批量写入，返回新增的设备ID列表"""
+        from psycopg2.extras import execute_values
+        from models.workshop import Workshop
+
+        workshop_ids = {}
+        for ws in Workshop.get_all():
+            workshop_ids.setdefault(_text(ws.name), ws.id)
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            ids = {table: id_allocator.reserve(table, count, cursor) for table, count in (
+                ('Dev_Place', len(plan.workshops)),
+                ('Dev_Main_Dev', len(plan.equipment)),
+                ('Dev_Part', len(plan.parts)),
+                ('Dev_Moni_Point', len(plan.points)),
+                ('Dev_Normal_Val', len(plan.ranges))
+            )}
+            workshop_ids.update(zip(plan.workshops, ids['Dev_Place']))
+            equip_ids, part_ids, point_ids = ids['Dev_Main_Dev'], ids['Dev_Part'], ids['Dev_Moni_Point']
+
+            batches = [
+                ("INSERT INTO DEV.Dev_Place (ID, name) VALUES %s",
+                 list(zip(ids['Dev_Place'], plan.workshops))),
+                ("INSERT INTO DEV.Dev_Main_Dev (ID, Equip_Code, Name, Pos_ID, Person_ID, Pur_Date, First_Time, "
+                 "Use_State, Online_Status) VALUES %s",
+                 [(equip_ids[i], code, name, workshop_ids[ws_name], person_id, pur_date, first_time, use_state, '离线')
+                  for i, (ws_name, code, name, person_id, pur_date, first_time, use_state)
+                  in enumerate(plan.equipment)]),
+                ("INSERT INTO DEV.Dev_Part (ID, MID, Part_Name, Description) VALUES %s",
+                 [(part_ids[i], equip_ids[equip_index], name, description)
+                  for i, (equip_index, name, description) in enumerate(plan.parts)]),
+                ("INSERT INTO DEV.Dev_Moni_Point (ID, Name, PART_ID, Sense_Type, Sample_Period, Sample_Freq, "
+                 "Sample_Long, unit, Admin_Peron) VALUES %s",
+                 [(point_ids[i], name, part_ids[part_index]) + tuple(rest)
+                  for i, (part_index, name, *rest) in enumerate(plan.points)]),
+                ("INSERT INTO DEV.Dev_Normal_Val (ID, Mon_ID, Min_Val, Max_Val, Note) VALUES %s",
+                 [(ids['Dev_Normal_Val'][i], point_ids[point_index], min_val, max_val, note)
+                  for i, (point_index, min_val, max_val, note) in enumerate(plan.ranges)])
+            ]
+            for sql, values in batches:
+                if values:
+                    execute_values(cursor, sql, values, page_size=1000)
+            conn.commit()
+            return equip_ids
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def provision(tree, dry_run=False):
+        """
+        校验并导入树形结构
+        :param dry_run: 只校验不写入
+        :return: dict - success（是否写入）、counts（各表新增数）、errors（校验错误）、equipment_ids
+        """
+        plan, errors = ProvisionService.validate(tree)
+        result = {'success': False, 'counts': plan.counts(), 'errors': errors, 'equipment_ids': []}
+        if errors or dry_run or not plan.equipment and not plan.workshops:
+            return result
+
+        result['equipment_ids'] = ProvisionService._write(plan)
+        result['success'] = True
+
+        # 基础数据缓存失效：车间监听者重新统计数量，监测点/正常值范围监听者重新加载阈值、最新值、看板
+        from services.counter_service import counters
+        if plan.workshops:
+            invalidate('workshop')
+        if plan.equipment:
+            invalidate('equipment')
+        if plan.parts:
+            invalidate('part')
+        if plan.points:
+            invalidate('monitor_point')
+        if plan.ranges:
+            invalidate('normal_range')
+        counters.invalidate()
+        logger.info(f"基础信息批量导入完成：{result['counts']}")
+        return result
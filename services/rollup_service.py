@@ -0,0 +1,185 @@
+# services/rollup_service.py
+from datetime import datetime, timedelta
+from utils.db import get_db_connection
+from utils.logger import logger
+from config import ROLLUP_CONFIG
+
+# 汇总粒度：(名称, 时间段秒数, 汇总表, date_trunc 单位)，由细到粗
+GRANULARITIES = [
+    ('1m', 60, 'DEV.Dev_Moni_Rollup_1m', 'minute'),
+    ('1h', 3600, 'DEV.Dev_Moni_Rollup_1h', 'hour'),
+    ('1d', 86400, 'DEV.Dev_Moni_Rollup_1d', 'day'),
+]
+
+
+def _bucket_start(mon_date, granularity):
+    """采集时间按粒度取整到时间段起点"""
+    if granularity == '1m':
+        return mon_date.replace(second=0, microsecond=0)
+    if granularity == '1h':
+        return mon_date.replace(minute=0, second=0, microsecond=0)
+    return mon_date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class RollupService:
+    """
+    采集数据汇总（1分钟/1小时/1天的 min/max/sum/count/last）
+    - 写入采集数据后按批增量合并到三张汇总表（INSERT ... ON CONFLICT DO UPDATE）
+    - rebuild() 从原始数据重算指定时间范围，用于历史数据补算或修复
+    - purge() 按 ROLLUP_CONFIG['retention_days'] 删除过期的汇总数据
+    """
+
+    @staticmethod
+    def aggregate(readings, granularity):
+        """
+        在内存中把一批采集数据聚合到时间段
+        :param readings: [(mon_id, mon_date, mon_value)]
+        :return: [(mon_id, bucket_start, min, max, sum, count, last_date, last_value)]
+        """
+        buckets = {}
+        for mon_id, mon_date, mon_value in readings:
+            value = float(mon_value)
+            key = (mon_id, _bucket_start(mon_date, granularity))
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [value, value, value, 1, mon_date, value]
+                continue
+            bucket[0] = min(bucket[0], value)
+            bucket[1] = max(bucket[1], value)
+            bucket[2] += value
+            bucket[3] += 1
+            if mon_date >= bucket[4]:
+                bucket[4] = mon_date
+                bucket[5] = value
+        return [key + tuple(bucket) for key, bucket in buckets.items()]
+
+    @staticmethod
+    def apply(readings):
+        """
+        把新写入的采集数据合并到各粒度汇总表（一个事务，每张表一条语句）
+        :param readings: [(mon_id, mon_date, mon_value)]
+        """
+        from psycopg2.extras import execute_values
+
+        if not readings:
+            return
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            for granularity, _, table, _ in GRANULARITIES:
+                rows = RollupService.aggregate(readings, granularity)
+                # 按主键排序写入，避免并发批次互相等待行锁时死锁
+                rows.sort(key=lambda r: (r[0], r[1]))
+                execute_values(
+                    cursor,
+                    f"""
+                    INSERT INTO {table} AS t
+                        (Mon_ID, Bucket_Start, Min_Val, Max_Val, Sum_Val, Cnt, Last_Date, Last_Val)
+                    VALUES %s
+                    ON CONFLICT (Mon_ID, Bucket_Start) DO UPDATE SET
+                        Min_Val = LEAST(t.Min_Val, EXCLUDED.Min_Val),
+                        Max_Val = GREATEST(t.Max_Val, EXCLUDED.Max_Val),
+                        Sum_Val = t.Sum_Val + EXCLUDED.Sum_Val,
+                        Cnt = t.Cnt + EXCLUDED.Cnt,
+                        Last_Val = CASE WHEN EXCLUDED.Last_Date >= t.Last_Date
+                                        THEN EXCLUDED.Last_Val ELSE t.Last_Val END,
+                        Last_Date = GREATEST(t.Last_Date, EXCLUDED.Last_Date)
+                    """,
+                    rows
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def rebuild(start, end, mon_id=None):
+        """
+        从原始数据重算 [start, end) 范围内的汇总（范围向外扩展到整天）
+        注意：重算期间同一时间范围内的新写入可能被重复计入，应在写入较少时执行
+        :return: {粒度: 重算后的时间段数}
+        """
+        start = _bucket_start(start, '1d')
+        end_day = _bucket_start(end, '1d')
+        end = end_day if end == end_day else end_day + timedelta(days=1)
+        if end <= start:
+            end = start + timedelta(days=1)
+        filter_sql = "Mon_Date >= ? AND Mon_Date < ?"
+        params = [start, end]
+        bucket_filter = "Bucket_Start >= ? AND Bucket_Start < ?"
+        if mon_id:
+            filter_sql += " AND Mon_ID = ?"
+            bucket_filter += " AND Mon_ID = ?"
+            params.append(mon_id)
+
+        result = {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            for granularity, _, table, unit in GRANULARITIES:
+                cursor.execute(f"DELETE FROM {table} WHERE {bucket_filter}", params)
+                cursor.execute(f"""
+                    INSERT INTO {table}
+                        (Mon_ID, Bucket_Start, Min_Val, Max_Val, Sum_Val, Cnt, Last_Date, Last_Val)
+                    SELECT Mon_ID, date_trunc('{unit}', Mon_Date),
+                           MIN(Mon_value), MAX(Mon_value), SUM(Mon_value), COUNT(*),
+                           MAX(Mon_Date), (array_agg(Mon_value ORDER BY Mon_Date DESC, ID DESC))[1]
+                    FROM DEV.Dev_Moni_Data
+                    WHERE {filter_sql}
+                    GROUP BY Mon_ID, date_trunc('{unit}', Mon_Date)
+                """, params)
+                result[granularity] = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        logger.info(f"重算汇总数据：{start} ~ {end}，监测点={mon_id or '全部'}，结果{result}")
+        return result
+
+    @staticmethod
+    def purge(now=None):
+        """按保留天数删除过期的汇总数据，返回 {粒度: 删除行数}"""
+        now = now or datetime.now()
+        result = {}
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            for granularity, _, table, _ in GRANULARITIES:
+                days = ROLLUP_CONFIG['retention_days'].get(granularity)
+                if not days:
+                    continue
+                cursor.execute(f"DELETE FROM {table} WHERE Bucket_Start < ?", (now - timedelta(days=days),))
+                result[granularity] = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        logger.info(f"清理过期汇总数据：{result}")
+        return result
+
+    @staticmethod
+    def choose_granularity(start, resolution):
+        """
+        查询计划：选择不超过所需分辨率的最粗粒度，且该粒度的数据在保留期内覆盖查询起点
+        :param resolution: 每个返回点代表的秒数
+        :return: (粒度名称, 汇总表) 或 None（需查询原始数据）
+        """
+        now = datetime.now()
+        chosen = None
+        for granularity, seconds, table, _ in GRANULARITIES:
+            if seconds > resolution:
+                break
+            days = ROLLUP_CONFIG['retention_days'].get(granularity)
+            if days and start < now - timedelta(days=days):
+                continue  # 该粒度的数据已被清理，继续尝试更粗的粒度
+            chosen = (granularity, table)
+        return chosen
@@ -0,0 +1,276 @@
+# services/threshold_service.py
+import threading
+from utils.db import get_db_connection
+from utils.id_allocator import id_allocator
+from utils.cache import reference_cache
+from utils.logger import logger
+from config import THRESHOLD_CONFIG
+
+
+class _PointState:
+    """单个监测点的报警状态"""
+    __slots__ = ('out_count', 'in_count', 'active', 'warning_id', 'raising')
+
+    def __init__(self):
+        self.out_count = 0  # 连续越限次数
+        self.in_count = 0  # 预警期间连续回到恢复区间的次数
+        self.active = False  # 是否处于预警状态
+        self.warning_id = None  # 对应的 Dev_Warning.ID
+        self.raising = None  # 已产生、尚未写库的预警（_apply 返回的 raised 元素），写库后换成 warning_id
+
+
+class ThresholdEngine:
+    """
+    进程内阈值报警引擎
+    - 内存中保存所有监测点的 Min_Val/Max_Val，新数据写入时逐条判定，不扫描数据表
+    - 去抖：连续 debounce_count 次越限才产生预警
+    - 回差：预警期间连续 clear_count 次回到 [Min+h, Max-h] 才解除
+    - 同一批数据产生的预警/解除在一个事务内批量写入 Dev_Warning
+    - 写库在锁外进行：预警写库期间其他批次判定解除的，记录在该预警上，写库后立即再解除
+    """
+
+    def __init__(self, debounce_count=3, clear_count=3, hysteresis_ratio=0.05):
+        self.debounce_count = max(1, debounce_count)
+        self.clear_count = max(1, clear_count)
+        self.hysteresis_ratio = hysteresis_ratio
+        self._lock = threading.RLock()
+        self._ranges = None  # mon_id -> (min, max, 监测点名称, 单位)
+        self._states = {}  # mon_id -> _PointState
+
+    def load(self):
+        """加载正常值范围和未处理的预警（每个监测点一次性读入内存）"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT nv.Mon_ID, nv.Min_Val, nv.Max_Val, mp.Name, mp.unit
+                FROM DEV.Dev_Normal_Val nv
+                LEFT JOIN DEV.Dev_Moni_Point mp ON nv.Mon_ID = mp.ID
+            """)
+            ranges = {}
+            for row in cursor.fetchall():
+                ranges[row[0]] = (float(row[1]), float(row[2]),
+                                  row[3].strip() if row[3] else '', row[4].strip() if row[4] else '')
+
+            # 已存在的待处理预警视为报警中，避免重启后重复报警
+            # （ID按进程分段分配，不代表先后顺序，取发生时间最晚的一条）
+            cursor.execute("""
+                SELECT DISTINCT ON (Mon_ID) Mon_ID, ID FROM DEV.DEV_WARNING
+                WHERE Msg_State = '待处理'
+                ORDER BY Mon_ID, Happen_Time DESC, ID DESC
+            """)
+            states = {}
+            for row in cursor.fetchall():
+                state = _PointState()
+                state.active = True
+                state.warning_id = row[1]
+                states[row[0]] = state
+        finally:
+            cursor.close()
+            conn.close()
+
+        with self._lock:
+            self._ranges = ranges
+            self._states = states
+        logger.info(f"阈值报警引擎加载完成：{len(ranges)}个监测点配置了正常范围，{len(states)}个监测点报警中")
+
+    def reload(self):
+        """正常值范围变更后调用：下次判定时重新加载"""
+        with self._lock:
+            self._ranges = None
+
+    def evaluate(self, readings):
+        """
+        判定新写入的采集数据，并批量写入预警变化
+        :param readings: 可迭代对象，元素为 (mon_id, mon_date, mon_value)
+        :return: (新增预警数, 解除预警数)
+        """
+        with self._lock:
+            if self._ranges is None:
+                self.load()
+            raised, cleared = self._apply(sorted(readings, key=lambda r: (r[0], r[1])))
+
+        if not raised and not cleared:
+            return 0, 0
+        try:
+            self._write(raised, cleared)
+        except Exception as e:
+            logger.error(f"写入预警失败：{str(e)}")
+            with self._lock:
+                # 新增预警写库失败：重置这些监测点的状态，后续数据重新判定（状态已被后续批次改变的除外）
+                for entry in raised:
+                    state = self._states.get(entry[0])
+                    if state is not None and state.raising is entry:
+                        self._states.pop(entry[0])
+            self._restore_cleared(cleared)
+            return 0, 0
+        return len(raised), len(cleared) + sum(1 for r in raised if r[4] is not None)
+
+    def _restore_cleared(self, cleared):
+        """解除预警写库失败：恢复报警中状态，数据库中的预警仍为"待处理"，后续数据再次解除"""
+        with self._lock:
+            for mon_id, warning_id, _ in cleared:
+                state = self._states.get(mon_id)
+                if state is None:
+                    state = self._states[mon_id] = _PointState()
+                if not state.active:
+                    state.active = True
+                    state.out_count = 0
+                    state.in_count = 0
+                    state.warning_id = warning_id
+                    state.raising = None
+
+    def _apply(self, readings):
+        """
+        更新内存状态
+        :return: (待新增预警[[mon_id, 时间, 值, 范围, 解除时间, 写库后解除时间]], 待解除预警[(mon_id, warning_id, 时间)])
+                 同一批内产生又恢复的预警，解除时间不为 None，直接以"已处理"写入；
+                 其他批次的预警尚未写库（没有 warning_id）时恢复的，记入该预警的"写库后解除时间"
+        """
+        raised = []
+        cleared = []
+        pending = {}  # 本批新增、尚未写库的预警 {mon_id: raised中的元素}
+        for mon_id, mon_date, mon_value in readings:
+            limits = self._ranges.get(mon_id)
+            if limits is None or mon_value is None:
+                continue
+            min_val, max_val = limits[0], limits[1]
+            value = float(mon_value)
+            state = self._states.get(mon_id)
+            if state is None:
+                state = self._states[mon_id] = _PointState()
+
+            if not state.active:
+                if value < min_val or value > max_val:
+                    state.out_count += 1
+                    if state.out_count >= self.debounce_count:
+                        state.active = True
+                        state.out_count = 0
+                        state.in_count = 0
+                        state.warning_id = None
+                        entry = [mon_id, mon_date, value, limits, None, None]
+                        state.raising = entry
+                        raised.append(entry)
+                        pending[mon_id] = entry
+                else:
+                    state.out_count = 0
+            else:
+                band = (max_val - min_val) * self.hysteresis_ratio
+                if min_val + band <= value <= max_val - band:
+                    state.in_count += 1
+                    if state.in_count >= self.clear_count:
+                        if state.warning_id is not None:
+                            cleared.append((mon_id, state.warning_id, mon_date))
+                        elif mon_id in pending:
+                            pending.pop(mon_id)[4] = mon_date
+                        elif state.raising is not None:
+                            state.raising[5] = mon_date
+                        state.active = False
+                        state.in_count = 0
+                        state.warning_id = None
+                        state.raising = None
+                else:
+                    state.in_count = 0
+        return raised, cleared
+
+    def _write(self, raised, cleared):
+        """一个事务内批量新增/解除预警"""
+        from psycopg2.extras import execute_values
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            inserted = []  # [(raised中的元素, 预警ID)]，仅"待处理"的预警
+            if raised:
+                ids = id_allocator.reserve('Dev_Warning', len(raised), cursor)
+                values = []
+                for warning_id, entry in zip(ids, raised):
+                    mon_id, mon_date, value, limits, handle_time = entry[:5]
+                    min_val, max_val, name, unit = limits
+                    msg_text = f"{name}{value:g}{unit}，超出正常范围{min_val:g}-{max_val:g}{unit}"
+                    if handle_time is None:
+                        values.append((warning_id, mon_id, msg_text[:500], '待处理', mon_date, None))
+                        inserted.append((entry, warning_id))
+                    else:
+                        # 同一批内已恢复正常：直接写入已解除的预警
+                        values.append((warning_id, mon_id, (msg_text + ' | 数值已恢复正常，自动解除')[:500],
+                                       '已处理', mon_date, handle_time))
+                execute_values(
+                    cursor,
+                    "INSERT INTO DEV.DEV_WARNING (ID, Mon_ID, Msg_Text, Msg_State, Happen_Time, Handle_Time) VALUES %s",
+                    values,
+                    page_size=len(values)
+                )
+
+            cleared_count = 0
+            if cleared:
+                # 仅自动解除仍为"待处理"的预警，已被人工处理的保持原状
+                cleared_count = len(execute_values(
+                    cursor,
+                    """
+                    UPDATE DEV.DEV_WARNING w
+                    SET Msg_State = '已处理', Handle_Time = v.handle_time,
+                        Msg_Text = LEFT(w.Msg_Text || ' | 数值已恢复正常，自动解除', 500)
+                    FROM (VALUES %s) AS v(id, handle_time)
+                    WHERE w.ID = v.id AND w.Msg_State = '待处理'
+                    RETURNING w.ID
+                    """,
+                    [(warning_id, handle_time) for _, warning_id, handle_time in cleared],
+                    page_size=len(cleared),
+                    fetch=True
+                ))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+        deferred = self._attach_warning_ids(inserted)
+        if raised or cleared:
+            from services.counter_service import counters
+            from services.dashboard_service import dashboard_publisher
+            resolved = len(raised) - len(inserted)
+            counters.adjust_warnings(None, '待处理', len(inserted))
+            counters.adjust_warnings(None, '已处理', resolved)
+            counters.adjust_warnings('待处理', '已处理', cleared_count)
+            dashboard_publisher.mark_warnings_changed()
+            logger.info(f"阈值报警：新增预警{len(raised)}条（其中同批恢复{resolved}条），自动解除{len(cleared)}条")
+        if deferred:
+            # 写库期间已被其他批次判定恢复的预警
+            try:
+                self._write([], deferred)
+            except Exception as e:
+                logger.error(f"解除预警失败：{str(e)}")
+                self._restore_cleared(deferred)
+
+    def _attach_warning_ids(self, inserted):
+        """
+        新增预警写库后：仍在报警中的监测点记下 warning_id；写库期间已被判定恢复的返回待解除列表
+        :param inserted: [(raised中的元素, 预警ID)]
+        :return: 待解除预警[(mon_id, warning_id, 时间)]
+        """
+        deferred = []
+        with self._lock:
+            for entry, warning_id in inserted:
+                if entry[5] is not None:
+                    deferred.append((entry[0], warning_id, entry[5]))
+                    continue
+                state = self._states.get(entry[0])
+                if state is not None and state.raising is entry:
+                    state.warning_id = warning_id
+                    state.raising = None
+        return deferred
+
+
+# 全局报警引擎（进程内单例）
+threshold_engine = ThresholdEngine(
+    debounce_count=THRESHOLD_CONFIG['debounce_count'],
+    clear_count=THRESHOLD_CONFIG['clear_count'],
+    hysteresis_ratio=THRESHOLD_CONFIG['hysteresis_ratio']
+)
+
+# 正常值范围、监测点名称/单位变更时重新加载
+reference_cache.add_listener('normal_range', threshold_engine.reload)
+reference_cache.add_listener('monitor_point', threshold_engine.reload)
@@ -65,6 +65,146 @@ class WarningService:
             cursor.close()
             conn.close()
 
+    # 预警列表（键集分页），名称由 JOIN 一并取回
+    PAGE_SELECT_SQL = """
+        SELECT w.ID, w.Mon_ID, w.Msg_Text, w.Per_ID, w.Msg_State, w.Happen_Time, w.Handle_Time,
+               mp.Name, p.Name
+        FROM DEV.DEV_WARNING w
+        LEFT JOIN DEV.Dev_Moni_Point mp ON mp.ID = w.Mon_ID
+        LEFT JOIN DEV.Dev_Person p ON p.ID = w.Per_ID
+        WHERE 1=1"""
+
+    @staticmethod
+    def _build_filters(msg_state=None, start_time=None, end_time=None):
+        """筛选条件（别名 w），返回 (SQL片段, 参数列表)"""
+        sql = ""
+        params = []
+        if msg_state:
+            sql += " AND w.Msg_State = ?"
+            params.append(msg_state)
+        if start_time:
+            sql += " AND w.Happen_Time >= ?"
+            params.append(start_time)
+        if end_time:
+            sql += " AND w.Happen_Time <= ?"
+            params.append(end_time)
+        return sql, params
+
+    @staticmethod
+    def count_by_state(msg_state=None, start_time=None, end_time=None):
+        """
+        各状态预警数 {状态: 数量}：无筛选条件时读取 counters 的缓存计数，
+        否则一次 GROUP BY Msg_State 查询
+        """
+        if not (msg_state or start_time or end_time):
+            from services.counter_service import counters
+            return counters.summary()['warnings_by_state']
+
+        filter_sql, params = WarningService._build_filters(msg_state, start_time, end_time)
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT w.Msg_State, COUNT(*) FROM DEV.DEV_WARNING w WHERE 1=1" + filter_sql + " GROUP BY w.Msg_State",
+                params
+            )
+            counts = {}
+            for state, count in cursor.fetchall():
+                key = state.strip() if state else ''
+                counts[key] = counts.get(key, 0) + count
+            return counts
+        finally:
+            cursor.close()
+            conn.close()
+
+    @staticmethod
+    def get_warning_page(msg_state=None, start_time=None, end_time=None, cursor=None, direction='next',
+                         page_size=20):
+        """
+        预警键集分页（按 (Happen_Time, ID) 倒序，只取一页）
+        :param cursor: 分页游标（格式同 DataService.encode_history_cursor），None表示第一页
+        :param direction: next=向更早的预警翻页，prev=向更新的预警翻页
+        :return: dict - warnings（已填充监测点/处理人名称的 EarlyWarning 列表）、next_cursor、prev_cursor
+        """
+        from services.data_service import DataService
+
+        key = DataService.decode_history_cursor(cursor) if cursor else None
+        backward = key is not None and direction == 'prev'
+
+        filter_sql, params = WarningService._build_filters(msg_state, start_time, end_time)
+        sql = WarningService.PAGE_SELECT_SQL + filter_sql
+        if key:
+            if backward:
+                sql += " AND (w.Happen_Time, w.ID) > (?, ?)"
+            else:
+                sql += " AND (w.Happen_Time, w.ID) < (?, ?)"
+            params.extend([key[0], key[1]])
+        order = "ASC" if backward else "DESC"
+        sql += f" ORDER BY w.Happen_Time {order}, w.ID {order} LIMIT ?"
+        # 多取一条用于判断是否还有下一页
+        params.append(page_size + 1)
+
+        conn = get_db_connection()
+        db_cursor = conn.cursor()
+        try:
+            db_cursor.execute(sql, params)
+            rows = db_cursor.fetchall()
+        finally:
+            db_cursor.close()
+            conn.close()
+
+        has_more = len(rows) > page_size
+        if backward and not has_more:
+            # 已回到最新的预警，返回完整的第一页
+            return WarningService.get_warning_page(msg_state, start_time, end_time, page_size=page_size)
+        rows = rows[:page_size]
+        if backward:
+            rows.reverse()
+
+        warnings = []
+        for row in rows:
+            warning = EarlyWarning(
+                id=row[0],
+                mon_id=row[1],
+                msg_text=row[2],
+                per_id=row[3],
+                msg_state=row[4],
+                happen_time=row[5],
+                handle_time=row[6]
+            )
+            warning.mon_name = row[7].strip() if row[7] else ''
+            warning.handler_name = row[8].strip() if row[8] else '未分配'
+            warnings.append(warning)
+
+        page = {'warnings': warnings, 'next_cursor': None, 'prev_cursor': None}
+        if rows:
+            first_key = DataService.encode_history_cursor(rows[0][5], rows[0][0])
+            last_key = DataService.encode_history_cursor(rows[-1][5], rows[-1][0])
+            page['prev_cursor'] = first_key if key else None
+            page['next_cursor'] = last_key if (has_more or backward) else None
+        return page
+
+    @staticmethod
+    def count_warnings(msg_state=None):
+        """统计预警数量（读取 counters 中按状态分组的缓存计数，不加载预警明细）"""
+        from services.counter_service import counters
+        return counters.warning_count(msg_state)
+
+    @staticmethod
+    def count_warnings_exact(msg_state=None):
+        """精确统计预警数量（COUNT查询）"""
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            if msg_state:
+                cursor.execute("SELECT COUNT(*) FROM DEV.DEV_WARNING WHERE Msg_State = ?", (msg_state,))
+            else:
+                cursor.execute("SELECT COUNT(*) FROM DEV.DEV_WARNING")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+            conn.close()
+
     # 可选：补充其他预警相关方法（如更新状态、删除预警）
     @staticmethod
     def update_warning_state(warning_id, new_state, handle_remark=None, handler_id=None, handle_time=None):
@@ -83,12 +223,13 @@ class WarningService:
 
         try:
             # 先获取原预警内容
-            cursor.execute("SELECT Msg_Text FROM DEV.DEV_WARNING WHERE ID = ?", (warning_id,))
+            cursor.execute("SELECT Msg_Text, Msg_State FROM DEV.DEV_WARNING WHERE ID = ?", (warning_id,))
             row = cursor.fetchone()
             if not row:
                 return False
             
             msg_text = row[0]
+            old_state = row[1].strip() if row[1] else ''
     
             # 如果有处理备注，追加到预警内容中
             if handle_remark:
@@ -124,7 +265,13 @@ class WarningService:
             # 执行更新
             cursor.execute(sql, params)
             conn.commit()
-         
+
+            if cursor.rowcount > 0:
+                from services.counter_service import counters
+                from services.dashboard_service import dashboard_publisher
+                if old_state != new_state:
+                    counters.adjust_warnings(old_state, new_state)
+                dashboard_publisher.mark_warnings_changed()
             return cursor.rowcount > 0
         except Exception as e:
             print(f"更新预警状态失败：{str(e)}")
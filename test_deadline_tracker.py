@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+到期跟踪器测试（不需要数据库）
+运行：python -m pytest -q test_deadline_tracker.py
+"""
+
+import sys
+import os
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.deadline_tracker import DeadlineTracker
+
+
+def make_tracker():
+    return DeadlineTracker(lambda key: None, name='test-deadlines')
+
+
+def test_pop_expired_in_deadline_order():
+    tracker = make_tracker()
+    tracker.set_deadline('c', 30)
+    tracker.set_deadline('a', 10)
+    tracker.set_deadline('b', 20)
+
+    assert tracker.pop_expired(now=5) == []
+    assert tracker.pop_expired(now=25) == ['a', 'b']
+    assert len(tracker) == 1
+    assert tracker.pop_expired(now=100) == ['c']
+    assert len(tracker) == 0
+
+
+def test_extend_replaces_previous_deadline():
+    tracker = make_tracker()
+    tracker.set_deadline('a', 10)
+    tracker.set_deadline('a', 50)  # 旧的堆项保留，弹出时丢弃
+
+    assert tracker.deadline_of('a') == 50
+    assert tracker.pop_expired(now=20) == []
+    assert tracker.pop_expired(now=50) == ['a']
+    assert tracker.pop_expired(now=100) == []
+
+
+def test_shorten_deadline():
+    tracker = make_tracker()
+    tracker.set_deadline('a', 50)
+    tracker.set_deadline('a', 10)
+
+    assert tracker.pop_expired(now=10) == ['a']
+    assert tracker.pop_expired(now=100) == []
+
+
+def test_cancel():
+    tracker = make_tracker()
+    tracker.set_deadline('a', 10)
+    tracker.set_deadline('b', 10)
+    tracker.cancel('a')
+    tracker.cancel('missing')
+
+    assert tracker.deadline_of('a') is None
+    assert tracker.pop_expired(now=10) == ['b']
+
+
+def test_touch_is_relative_to_now():
+    tracker = make_tracker()
+    before = time.monotonic()
+    tracker.touch('a', 60)
+
+    assert before + 60 <= tracker.deadline_of('a') <= time.monotonic() + 60
+    assert tracker.pop_expired() == []
+
+
+def test_compaction_drops_stale_entries():
+    tracker = make_tracker()
+    for i in range(3000):
+        tracker.set_deadline('a', i)
+
+    assert len(tracker._heap) <= 2 * len(tracker) + 1024
+    assert tracker.pop_expired(now=2998) == []
+    assert tracker.pop_expired(now=2999) == ['a']
+
+
+def test_background_thread_fires_in_order():
+    fired = []
+    done = threading.Event()
+
+    def on_expire(key):
+        fired.append(key)
+        if len(fired) == 2:
+            done.set()
+
+    tracker = DeadlineTracker(on_expire, name='test-deadlines')
+    tracker.start()
+    try:
+        tracker.touch('late', 0.2)
+        tracker.touch('early', 0.05)
+        tracker.touch('cancelled', 0.1)
+        tracker.cancel('cancelled')
+        assert done.wait(2)
+        time.sleep(0.15)
+        assert fired == ['early', 'late']
+    finally:
+        tracker.stop()
+
+
+def test_background_thread_respects_extension():
+    fired = threading.Event()
+    tracker = DeadlineTracker(lambda key: fired.set(), name='test-deadlines')
+    tracker.start()
+    try:
+        tracker.touch('a', 0.1)
+        tracker.touch('a', 0.4)
+        assert not fired.wait(0.25)
+        assert fired.wait(2)
+    finally:
+        tracker.stop()
+
+
+def test_callback_error_does_not_stop_thread():
+    fired = []
+    done = threading.Event()
+
+    def on_expire(key):
+        if key == 'bad':
+            raise RuntimeError('boom')
+        fired.append(key)
+        done.set()
+
+    tracker = DeadlineTracker(on_expire, name='test-deadlines')
+    tracker.start()
+    try:
+        tracker.touch('bad', 0.01)
+        tracker.touch('good', 0.05)
+        assert done.wait(2)
+        assert fired == ['good']
+    finally:
+        tracker.stop()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main(['-q', __file__]))
@@ -24,6 +24,7 @@ def test_heartbeat_logic():
         # 调用心跳更新函数
         logger.info(f"更新设备 {test_equipment_id} 的心跳")
         result = EquipmentService.update_equipment_heartbeat(test_equipment_id)
+        EquipmentService.flush_heartbeats()
         logger.info(f"心跳更新结果: {result}")
         
         # 检查设备在线状态
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基础数据缓存测试（纯内存，不需要数据库）
+运行：python -m pytest -q test_reference_cache.py
+"""
+
+import sys
+import os
+
+import pytest
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils.cache as cache_module
+from utils.cache import ReferenceCache, cached, cached_many
+
+
+class FakeClock:
+    """替换 utils.cache 中的 time，手动推进 monotonic()"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module, 'time', fake)
+    return fake
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    """装饰器使用的全局缓存替换为新实例"""
+    fresh = ReferenceCache(max_size=100, ttl=60)
+    monkeypatch.setattr(cache_module, 'reference_cache', fresh)
+    return fresh
+
+
+class Loader:
+    """记录调用次数的查询函数"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hit_after_miss(clock):
+    cache = ReferenceCache(max_size=10, ttl=60)
+    loader = Loader('车间A')
+
+    assert cache.get('workshop', 1, loader) == '车间A'
+    assert cache.get('workshop', 1, loader) == '车间A'
+    assert loader.calls == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+
+
+def test_ttl_expiry(clock):
+    cache = ReferenceCache(max_size=10, ttl=60)
+    loader = Loader('车间A')
+    cache.get('workshop', 1, loader)
+
+    clock.now += 59
+    cache.get('workshop', 1, loader)
+    assert loader.calls == 1
+
+    clock.now += 1
+    cache.get('workshop', 1, loader)
+    assert loader.calls == 2
+
+
+def test_lru_eviction(clock):
+    cache = ReferenceCache(max_size=2, ttl=60)
+    loaders = {key: Loader(key) for key in 'abc'}
+    cache.get('staff', 'a', loaders['a'])
+    cache.get('staff', 'b', loaders['b'])
+    cache.get('staff', 'a', loaders['a'])  # a 变为最近使用
+    cache.get('staff', 'c', loaders['c'])  # 淘汰 b
+
+    cache.get('staff', 'a', loaders['a'])
+    cache.get('staff', 'b', loaders['b'])
+    assert loaders['a'].calls == 1
+    assert loaders['b'].calls == 2
+    assert cache.stats()['evictions'] == 2
+
+
+def test_none_is_cached(clock):
+    cache = ReferenceCache(max_size=10, ttl=60)
+    loader = Loader(None)
+
+    assert cache.get('staff', 404, loader) is None
+    assert cache.get('staff', 404, loader) is None
+    assert loader.calls == 1
+
+
+def test_invalidate_clears_namespace_and_notifies(clock):
+    cache = ReferenceCache(max_size=10, ttl=60)
+    notified = []
+    cache.add_listener('workshop', lambda: notified.append('workshop'))
+    workshop = Loader('车间A')
+    staff = Loader('张三')
+    cache.get('workshop', 1, workshop)
+    cache.get('staff', 1, staff)
+
+    cache.invalidate('workshop')
+    cache.get('workshop', 1, workshop)
+    cache.get('staff', 1, staff)
+    assert workshop.calls == 2
+    assert staff.calls == 1
+    assert notified == ['workshop']
+    assert cache.generation('workshop') == 1
+    assert cache.generation('staff') == 0
+
+
+def test_listener_error_does_not_break_invalidate(clock):
+    cache = ReferenceCache(max_size=10, ttl=60)
+    calls = []
+
+    def bad():
+        raise RuntimeError('boom')
+
+    cache.add_listener('workshop', bad)
+    cache.add_listener('workshop', lambda: calls.append(1))
+    cache.invalidate('workshop')
+    assert calls == [1]
+
+
+def test_result_loaded_during_invalidate_is_not_stored(clock):
+    cache = ReferenceCache(max_size=10, ttl=60)
+
+    def stale_loader():
+        # 查询期间数据被修改：旧结果返回给本次调用，但不写入缓存
+        cache.invalidate('workshop')
+        return '旧名称'
+
+    assert cache.get('workshop', 1, stale_loader) == '旧名称'
+    assert cache.get('workshop', 1, Loader('新名称')) == '新名称'
+
+
+def test_get_many_loads_only_missing_and_caches_absent_keys(clock):
+    cache = ReferenceCache(max_size=10, ttl=60)
+    requested = []
+
+    def loader(keys):
+        requested.append(sorted(keys))
+        return {key: f'点{key}' for key in keys if key != 3}
+
+    assert cache.get_many('monitor_point', [1, 2, 3], loader) == {1: '点1', 2: '点2'}
+    assert cache.get_many('monitor_point', [1, 2, 3, 4], loader) == {1: '点1', 2: '点2', 4: '点4'}
+    assert requested == [[1, 2, 3], [4]]
+
+
+def test_get_many_discards_results_after_invalidate(clock):
+    cache = ReferenceCache(max_size=10, ttl=60)
+
+    def stale_loader(keys):
+        cache.invalidate('monitor_point')
+        return {key: '旧' for key in keys}
+
+    assert cache.get_many('monitor_point', [1], stale_loader) == {1: '旧'}
+    assert cache.get_many('monitor_point', [1], lambda keys: {1: '新'}) == {1: '新'}
+
+
+def test_cached_decorator_returns_copy_of_lists(cache):
+    calls = []
+
+    @cached('workshop')
+    def get_all(page=1):
+        calls.append(page)
+        return ['车间A', '车间B']
+
+    first = get_all(page=1)
+    first.append('被调用方修改')
+    assert get_all(page=1) == ['车间A', '车间B']
+    get_all(page=2)
+    assert calls == [1, 2]
+
+
+def test_cached_many_shares_entries_with_single_lookup(cache):
+    single_calls = []
+    many_calls = []
+
+    @cached('staff')
+    def get_by_id(staff_id):
+        single_calls.append(staff_id)
+        return f'人员{staff_id}'
+
+    @cached_many('staff', 'get_by_id')
+    def get_by_ids(ids):
+        many_calls.append(sorted(ids))
+        return {staff_id: f'人员{staff_id}' for staff_id in ids if staff_id != 9}
+
+    assert get_by_id(1) == '人员1'
+    assert get_by_ids([1, 2, 9, None]) == {1: '人员1', 2: '人员2'}
+    assert many_calls == [[2, 9]]
+    assert get_by_id(2) == '人员2'
+    assert get_by_id(9) is None
+    assert single_calls == [1]
+    assert get_by_ids([]) == {}
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main(['-q', __file__]))
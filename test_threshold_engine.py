@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阈值报警引擎判定逻辑测试（只测试内存状态，不访问数据库）
+运行：python -m pytest -q test_threshold_engine.py
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.threshold_service import ThresholdEngine
+
+MON_ID = 1
+BASE_TIME = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def make_engine():
+    """正常范围 0-10，连续3次越限报警，连续3次回到 [0.5, 9.5] 解除"""
+    engine = ThresholdEngine(debounce_count=3, clear_count=3, hysteresis_ratio=0.05)
+    engine._ranges = {MON_ID: (0.0, 10.0, '温度', '℃')}
+    return engine
+
+
+def readings(values, start=0):
+    return [(MON_ID, BASE_TIME + timedelta(seconds=start + i), value) for i, value in enumerate(values)]
+
+
+def test_debounce_requires_consecutive_out_of_range():
+    engine = make_engine()
+    raised, cleared = engine._apply(readings([11, 11, 5, 11, 11]))
+    assert raised == [] and cleared == []
+
+    raised, cleared = engine._apply(readings([11], start=5))
+    assert len(raised) == 1 and cleared == []
+    mon_id, mon_date, value, _, handle_time, deferred = raised[0]
+    assert (mon_id, mon_date, value) == (MON_ID, BASE_TIME + timedelta(seconds=5), 11.0)
+    assert handle_time is None and deferred is None
+    assert engine._states[MON_ID].active
+
+
+def test_hysteresis_band_does_not_clear():
+    engine = make_engine()
+    engine._apply(readings([11, 11, 11]))
+    engine._attach_warning_ids([(engine._states[MON_ID].raising, 100)])
+
+    # 9.8 在正常范围内，但未回到 [0.5, 9.5]，不计入解除次数
+    raised, cleared = engine._apply(readings([9.8, 9.8, 9.8, 5, 5, 9.8], start=3))
+    assert raised == [] and cleared == []
+    assert engine._states[MON_ID].active
+
+    raised, cleared = engine._apply(readings([5, 5, 5], start=9))
+    assert raised == []
+    assert cleared == [(MON_ID, 100, BASE_TIME + timedelta(seconds=11))]
+    assert not engine._states[MON_ID].active
+
+
+def test_same_batch_raise_and_clear():
+    engine = make_engine()
+    raised, cleared = engine._apply(readings([11, 11, 11, 5, 5, 5]))
+    assert cleared == []
+    assert len(raised) == 1
+    assert raised[0][4] == BASE_TIME + timedelta(seconds=5)
+    state = engine._states[MON_ID]
+    assert not state.active and state.raising is None
+
+
+def test_clear_while_raise_is_being_written():
+    engine = make_engine()
+    raised, _ = engine._apply(readings([11, 11, 11]))
+    entry = raised[0]
+
+    # 第一批的预警尚未写库（没有 warning_id），第二批判定恢复
+    raised2, cleared2 = engine._apply(readings([5, 5, 5], start=3))
+    assert raised2 == [] and cleared2 == []
+    assert entry[5] == BASE_TIME + timedelta(seconds=5)
+    assert not engine._states[MON_ID].active
+
+    # 第一批写库完成后立即解除
+    deferred = engine._attach_warning_ids([(entry, 100)])
+    assert deferred == [(MON_ID, 100, BASE_TIME + timedelta(seconds=5))]
+    assert engine._states[MON_ID].warning_id is None
+
+
+def test_write_failure_of_deferred_clear_restores_active_state():
+    engine = make_engine()
+    raised, _ = engine._apply(readings([11, 11, 11]))
+    engine._apply(readings([5, 5, 5], start=3))
+    deferred = engine._attach_warning_ids([(raised[0], 100)])
+
+    engine._restore_cleared(deferred)
+    state = engine._states[MON_ID]
+    assert state.active and state.warning_id == 100
+
+    _, cleared = engine._apply(readings([5, 5, 5], start=6))
+    assert cleared == [(MON_ID, 100, BASE_TIME + timedelta(seconds=8))]
+
+
+def test_warning_id_attached_only_to_current_raise():
+    engine = make_engine()
+    raised, _ = engine._apply(readings([11, 11, 11]))
+    assert engine._attach_warning_ids([(raised[0], 100)]) == []
+    state = engine._states[MON_ID]
+    assert state.active and state.warning_id == 100 and state.raising is None
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main(['-q', __file__]))
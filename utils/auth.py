@@ -1,6 +1,8 @@
-from flask import session, redirect, url_for, flash
+from flask import session, redirect, url_for, flash, request, jsonify
 from functools import wraps
+import hmac
 import logging
+from config import INGEST_API_TOKEN
 
 # 配置日志
 logger = logging.getLogger('utils.logger')
@@ -9,25 +11,35 @@ def login_required(f):
     """登录校验：未登录跳转到登录页"""
     @wraps(f)
     def wrapper(*args, **kwargs):
-        # 调试信息
-        logger.info(f"===== login_required装饰器调用 =====")
-        logger.info(f"当前session内容: {dict(session)}")
-        logger.info(f"请求路径: {f.__name__}")
-        
         if 'user_id' not in session:
-            logger.info("未登录用户，重定向到登录页")
+            logger.debug(f"未登录用户访问 {f.__name__}，重定向到登录页")
             flash('请先登录系统！', 'error')
             return redirect(url_for('auth.login'))
-        logger.info(f"已登录用户: {session.get('username')}, 角色: {session.get('role')}")
         return f(*args, **kwargs)
     return wrapper
 
+def is_admin():
+    """当前登录用户是否为管理员（session 中的 role 由登录时写入）"""
+    return session.get('role') == '管理员'
+
 def admin_required(f):
     """管理员权限校验：非管理员无权限"""
     @wraps(f)
     def wrapper(*args, **kwargs):
-        if session.get('role') != '管理员':
+        if not is_admin():
             flash('仅管理员可执行此操作！', 'error')
             return redirect(url_for('monitor.realtime'))
         return f(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def api_token_required(f):
+    """接口校验：已登录用户，或请求头 X-Api-Token 与配置的 INGEST_API_TOKEN 一致（供数据网关调用）"""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if 'user_id' in session:
+            return f(*args, **kwargs)
+        token = request.headers.get('X-Api-Token', '')
+        if INGEST_API_TOKEN and token and hmac.compare_digest(token, INGEST_API_TOKEN):
+            return f(*args, **kwargs)
+        return jsonify({'code': 401, 'msg': '未登录或令牌无效'}), 401
+    return wrapper
@@ -0,0 +1,191 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+from utils.logger import logger
+from config import REFERENCE_CACHE_CONFIG
+
+_MISSING = object()
+
+
+class ReferenceCache:
+    """
+    进程内基础数据缓存（读穿透）
+    - 按命名空间（workshop/staff/sensor_type/monitor_point/normal_range）分组；equipment/part 命名空间只用于增删改的失效通知
+    - 条目超过 ttl 秒过期；总条目数超过 max_size 时淘汰最久未使用的条目
+    - 查询结果为空（None）也会缓存，避免反复查询不存在的ID
+    - models 中的 add/update/delete 调用 invalidate() 清空对应命名空间，并通知注册的监听者
+    注意：缓存的对象被多个请求共享，调用方不要修改返回的对象
+    """
+
+    def __init__(self, max_size=4096, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (命名空间, 键) -> (过期时间, 值)
+        self._listeners = {}  # 命名空间 -> [回调]
+        self._generations = {}  # 命名空间 -> 失效次数，查询期间发生失效的结果不写入缓存
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def _lookup(self, full_key, now):
+        """调用方持有锁；返回缓存值或 _MISSING"""
+        entry = self._entries.get(full_key)
+        if entry is None:
+            return _MISSING
+        if entry[0] <= now:
+            del self._entries[full_key]
+            return _MISSING
+        self._entries.move_to_end(full_key)
+        return entry[1]
+
+    def _store(self, full_key, value, now):
+        """调用方持有锁"""
+        self._entries[full_key] = (now + self.ttl, value)
+        self._entries.move_to_end(full_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, namespace, key, loader):
+        """读取缓存，未命中时调用 loader() 查询并写入缓存"""
+        full_key = (namespace, key)
+        with self._lock:
+            value = self._lookup(full_key, time.monotonic())
+            if value is not _MISSING:
+                self._hits += 1
+                return value
+            self._misses += 1
+            generation = self._generations.get(namespace, 0)
+        value = loader()
+        with self._lock:
+            if self._generations.get(namespace, 0) == generation:
+                self._store(full_key, value, time.monotonic())
+        return value
+
+    def get_many(self, namespace, keys, loader):
+        """
+        批量读取，未命中的键用一次 loader(未命中的键列表) 查询
+        :param loader: 返回 {键: 值} 的函数，结果中不存在的键按 None 缓存
+        :return: {键: 值}（不含值为 None 的键）
+        """
+        result = {}
+        missing = []
+        with self._lock:
+            now = time.monotonic()
+            for key in keys:
+                value = self._lookup((namespace, key), now)
+                if value is _MISSING:
+                    missing.append(key)
+                elif value is not None:
+                    result[key] = value
+            self._hits += len(keys) - len(missing)
+            self._misses += len(missing)
+            generation = self._generations.get(namespace, 0)
+        if missing:
+            loaded = loader(missing)
+            with self._lock:
+                if self._generations.get(namespace, 0) == generation:
+                    now = time.monotonic()
+                    for key in missing:
+                        self._store((namespace, key), loaded.get(key), now)
+            result.update((key, value) for key, value in loaded.items() if value is not None)
+        return result
+
+    def invalidate(self, namespace):
+        """清空命名空间内的所有条目，并调用该命名空间的监听者"""
+        with self._lock:
+            for full_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[full_key]
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self._invalidations += 1
+            listeners = list(self._listeners.get(namespace, []))
+        for callback in listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"缓存失效回调执行失败（{namespace}）：{str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def generation(self, namespace):
+        """命名空间的失效次数（每次 invalidate 加一），可用于拼接 ETag 等版本号"""
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def add_listener(self, namespace, callback):
+        """注册失效回调：命名空间被 invalidate 时调用 callback()"""
+        with self._lock:
+            self._listeners.setdefault(namespace, []).append(callback)
+
+    def stats(self):
+        """缓存指标"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 4) if total else 0,
+                'evictions': self._evictions,
+                'invalidations': self._invalidations
+            }
+
+
+# 全局基础数据缓存（进程内单例）
+reference_cache = ReferenceCache(
+    max_size=REFERENCE_CACHE_CONFIG['max_size'],
+    ttl=REFERENCE_CACHE_CONFIG['ttl']
+)
+
+
+def cached(namespace):
+    """
+    装饰模型的查询方法：按 (方法名, 参数) 缓存结果
+    返回列表时给调用方一份浅拷贝，避免修改缓存中的列表
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            value = reference_cache.get(namespace, key, lambda: func(*args, **kwargs))
+            return list(value) if isinstance(value, list) else value
+        return wrapper
+    return decorator
+
+
+def cached_many(namespace, single_name):
+    """
+    装饰按ID批量查询的方法 fn(ids) -> {ID: 对象}：
+    每个ID与单条查询方法 single_name(ID) 共用缓存条目，只查询未命中的ID
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(ids):
+            ids = [i for i in set(ids) if i is not None]
+            if not ids:
+                return {}
+
+            def load(missing_keys):
+                loaded = func([key[1][0] for key in missing_keys])
+                return {(single_name, (item_id,), ()): value for item_id, value in loaded.items()}
+
+            found = reference_cache.get_many(namespace, [(single_name, (i,), ()) for i in ids], load)
+            return {key[1][0]: value for key, value in found.items()}
+        return wrapper
+    return decorator
+
+
+def invalidate(namespace):
+    """models 中数据变更后调用，清空对应命名空间的缓存"""
+    reference_cache.invalidate(namespace)
+
+
+def get_cache_stats():
+    return reference_cache.stats()
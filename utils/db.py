@@ -1,44 +1,368 @@
 import logging
 import os
+import threading
+import time
+from collections import deque
 import psycopg2
-from config import PG_CONFIG
+from psycopg2 import extensions
+from config import PG_CONFIG, DB_POOL_CONFIG, PROFILING_CONFIG
+from utils import profiler
 
 logger = logging.getLogger(__name__)
 
 # 数据库类型固定为postgresql
 DB_TYPE = 'postgresql'
 
-def get_db_connection():
-    """获取PostgreSQL数据库连接"""
+
+class PoolTimeoutError(Exception):
+    """连接池已满且在等待时间内没有可用连接"""
+
+
+class PooledConnection:
+    """
+    连接池借出的连接代理
+    - 其余属性/方法全部透传给底层 psycopg2 连接
+    - close() 不断开连接，而是归还连接池（兼容原有 conn.close() 的写法）
+    - 支持 with 语句：与 psycopg2 的 with conn 一致，正常退出时提交事务，发生异常时回滚，之后归还连接
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    @property
+    def raw(self):
+        """底层 psycopg2 连接"""
+        return self._raw
+
+    def close(self):
+        """归还连接（重复调用无副作用）"""
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                # 提交失败时异常照常抛出，事务由归还连接池时回滚
+                self._raw.commit()
+            elif not self._raw.closed:
+                try:
+                    self._raw.rollback()
+                except Exception:
+                    pass
+        finally:
+            self.close()
+        return False
+
+
+class ConnectionPool:
+    """
+    有界 PostgreSQL 连接池
+    - 空闲连接后进先出，优先复用最近用过的热连接
+    - 空闲超过 health_check_idle 秒的连接在借出前执行 SELECT 1 检查
+    - 归还时回滚未结束的事务；已断开/超过 max_lifetime 的连接直接丢弃
+    注意：锁在连接池首次创建时才生成，app.py 中 eventlet.monkey_patch() 之后
+    创建的 threading.Condition 会被替换为绿色线程版本，等待连接时只挂起当前协程。
+    """
+
+    def __init__(self, connect, min_size=2, max_size=10, acquire_timeout=10,
+                 health_check_idle=30, max_lifetime=1800):
+        if max_size < 1:
+            raise ValueError("连接池 max_size 必须大于0")
+        self._connect = connect
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_idle = health_check_idle
+        self.max_lifetime = max_lifetime
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (连接, 创建时间, 最后归还时间)
+        self._created_at = {}  # id(连接) -> 创建时间
+        self._size = 0  # 当前存活（空闲+借出+正在创建）的连接数
+
+        # 统计指标
+        self._borrowed = 0
+        self._waiting = 0
+        self._created = 0
+        self._discarded = 0
+        self._borrow_total = 0
+        self._timeouts = 0
+
+    def prefill(self):
+        """预建 min_size 个连接"""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                raw = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            now = time.monotonic()
+            with self._cond:
+                self._idle.append((raw, self._created_at[id(raw)], now))
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """借用连接，返回 PooledConnection"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(f"获取数据库连接超时（{timeout}秒），连接池已满：{self.max_size}")
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if entry is None:
+                try:
+                    raw = self._new_connection()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            else:
+                raw, created_at, last_used = entry
+                if not self._is_usable(raw, created_at, last_used):
+                    self._discard(raw)
+                    continue
+
+            with self._cond:
+                self._borrowed += 1
+                self._borrow_total += 1
+            return PooledConnection(self, raw)
+
+    def release(self, raw):
+        """归还连接：回滚未提交事务，不可用的连接直接丢弃"""
+        with self._cond:
+            self._borrowed -= 1
+
+        reusable = not raw.closed
+        if reusable:
+            try:
+                status = raw.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    reusable = False
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    raw.rollback()
+            except Exception as e:
+                logger.warning(f"归还连接时回滚失败，丢弃该连接：{str(e)}")
+                reusable = False
+
+        created_at = self._created_at.get(id(raw), 0)
+        if reusable and self.max_lifetime and time.monotonic() - created_at > self.max_lifetime:
+            reusable = False
+
+        if not reusable:
+            self._discard(raw)
+            return
+
+        with self._cond:
+            self._idle.append((raw, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        """关闭所有空闲连接（借出中的连接归还时正常处理）"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        """连接池指标"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'borrowed': self._borrowed,
+                'waiting': self._waiting,
+                'created': self._created,
+                'discarded': self._discarded,
+                'borrow_total': self._borrow_total,
+                'timeouts': self._timeouts,
+                'min_size': self.min_size,
+                'max_size': self.max_size
+            }
+
+    def _new_connection(self):
+        raw = self._connect()
+        with self._cond:
+            self._created += 1
+            self._created_at[id(raw)] = time.monotonic()
+        return raw
+
+    def _is_usable(self, raw, created_at, last_used):
+        """借出前检查：已断开、超龄的连接不可用；空闲过久的连接执行 SELECT 1"""
+        if raw.closed:
+            return False
+        now = time.monotonic()
+        if self.max_lifetime and now - created_at > self.max_lifetime:
+            return False
+        if self.health_check_idle is not None and now - last_used >= self.health_check_idle:
+            try:
+                cursor = raw.cursor()
+                try:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                finally:
+                    cursor.close()
+                raw.rollback()
+            except Exception as e:
+                logger.warning(f"连接健康检查失败，丢弃该连接：{str(e)}")
+                return False
+        return True
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._created_at.pop(id(raw), None)
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _create_connection():
+    """新建一个物理 PostgreSQL 连接（仅供连接池调用）"""
     try:
-        # PostgreSQL数据库连接
         conn = psycopg2.connect(
             user=PG_CONFIG['user'],
             password=PG_CONFIG['password'],
             host=PG_CONFIG['server'],
             port=PG_CONFIG['port'],
-            database=PG_CONFIG['database']
+            database=PG_CONFIG['database'],
+            # 统计每个请求的查询次数/耗时/行数，记录慢查询
+            cursor_factory=profiler.ProfilingCursor if PROFILING_CONFIG['enabled'] else None
         )
-        logger.info(f"PostgreSQL数据库连接成功：{PG_CONFIG['server']}:{PG_CONFIG['port']}")
+        logger.debug(f"PostgreSQL连接池新建连接：{PG_CONFIG['server']}:{PG_CONFIG['port']}")
         return conn
     except Exception as e:
         logger.error(f"PostgreSQL数据库连接失败：{str(e)}")
         raise
 
+
+def get_pool():
+    """获取全局连接池（首次调用时创建）"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    _create_connection,
+                    min_size=DB_POOL_CONFIG['min_size'],
+                    max_size=DB_POOL_CONFIG['max_size'],
+                    acquire_timeout=DB_POOL_CONFIG['acquire_timeout'],
+                    health_check_idle=DB_POOL_CONFIG['health_check_idle'],
+                    max_lifetime=DB_POOL_CONFIG['max_lifetime']
+                )
+    return _pool
+
+
+def _eventlet_wait_callback(conn, timeout=None):
+    """
+    psycopg2 等待回调：socket 未就绪时通过 eventlet hub 挂起当前协程，
+    而不是在 C 扩展内阻塞整个进程（慢查询期间其他请求、Socket.IO 心跳照常处理）
+    """
+    from eventlet.hubs import trampoline
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            trampoline(conn.fileno(), read=True)
+        elif state == extensions.POLL_WRITE:
+            trampoline(conn.fileno(), write=True)
+        else:
+            raise psycopg2.OperationalError(f"连接 poll() 返回未知状态：{state}")
+
+
+def enable_green_io():
+    """
+    在 eventlet.monkey_patch() 之后、建立连接之前调用
+    注意：设置等待回调后 psycopg2 不支持 COPY，调用方须先检查 copy_supported()
+    """
+    extensions.set_wait_callback(_eventlet_wait_callback)
+    logger.info("数据库连接已启用 eventlet 等待回调")
+
+
+def copy_supported():
+    """当前能否使用 COPY（未设置等待回调时，如命令行工具）"""
+    return extensions.get_wait_callback() is None
+
+
+def get_db_connection():
+    """
+    从连接池借用PostgreSQL数据库连接
+    - 用完调用 conn.close() 归还（未提交的事务会被回滚），
+      或使用 with get_db_connection() as conn:，正常退出时自动提交并归还，异常时回滚
+    """
+    profiler.record_connection()
+    return get_pool().acquire()
+
+
+def get_pool_stats():
+    """连接池指标（借出数、等待数、累计创建/丢弃数等）"""
+    return get_pool().stats()
+
+
+def close_pool():
+    """关闭连接池中的空闲连接"""
+    if _pool is not None:
+        _pool.close_all()
+
+
 def init_db():
-    """初始化数据库（仅验证连接，表已通过 SQL 脚本创建）"""
+    """初始化数据库（预建连接池并验证连接，表已通过 SQL 脚本创建）"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # 执行PostgreSQL测试查询
-        cursor.execute("SELECT 1")
-        cursor.fetchone()
-        conn.close()
-        logger.info(f"PostgreSQL数据库连接成功，初始化完成")
+        pool = get_pool()
+        pool.prefill()
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            # 执行PostgreSQL测试查询
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+        logger.info(f"PostgreSQL数据库连接成功，初始化完成，连接池：{pool.stats()}")
     except Exception as e:
         logger.error(f"PostgreSQL数据库初始化失败：{str(e)}")
         raise
 
 # 全局导出
-__all__ = ['get_db_connection', 'init_db']
+__all__ = ['get_db_connection', 'init_db', 'get_pool', 'get_pool_stats', 'close_pool',
+           'enable_green_io', 'copy_supported',
+           'ConnectionPool', 'PooledConnection', 'PoolTimeoutError']
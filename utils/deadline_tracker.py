@@ -0,0 +1,108 @@
+import heapq
+import threading
+import time
+from utils.logger import logger
+
+
+class DeadlineTracker:
+    """
+    按键计时的到期跟踪器（最小堆 + 惰性删除）
+    - touch(key, timeout) 设置/延后某个键的到期时间，O(log n)
+    - 后台线程只等待堆顶的最近到期时间，到期即回调 on_expire(key)，
+      不按固定周期扫描全部键，判定延迟和开销与键的总数无关
+    - 键被延后时旧的堆项不删除，弹出时与当前到期时间不一致即丢弃；
+      过期项过多时重建堆
+    注意：与连接池相同，锁和后台线程在 eventlet.monkey_patch() 之后创建时为绿色线程版本
+    """
+
+    def __init__(self, on_expire, name='deadline-tracker'):
+        self._on_expire = on_expire
+        self._name = name
+        self._cond = threading.Condition()
+        self._heap = []  # (到期时间, 键)
+        self._deadlines = {}  # 键 -> 当前到期时间（time.monotonic()）
+        self._thread = None
+        self._stopped = False
+
+    def touch(self, key, timeout):
+        """设置键在 timeout 秒后到期（覆盖之前的到期时间）"""
+        self.set_deadline(key, time.monotonic() + timeout)
+
+    def set_deadline(self, key, deadline):
+        """设置键的绝对到期时间（time.monotonic() 时间轴）"""
+        with self._cond:
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+            # 只有新的到期时间早于堆顶时才需要唤醒后台线程重新计算等待时长
+            if self._heap[0][1] == key and self._heap[0][0] == deadline:
+                self._cond.notify()
+            if len(self._heap) > 2 * len(self._deadlines) + 1024:
+                self._compact()
+
+    def cancel(self, key):
+        """取消键的到期（堆中的旧项在弹出时丢弃）"""
+        with self._cond:
+            self._deadlines.pop(key, None)
+
+    def deadline_of(self, key):
+        with self._cond:
+            return self._deadlines.get(key)
+
+    def __len__(self):
+        with self._cond:
+            return len(self._deadlines)
+
+    def start(self):
+        """启动后台到期线程（重复调用无副作用）"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread = None
+
+    def pop_expired(self, now=None):
+        """弹出所有已到期的键（不调用回调）"""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, key = heapq.heappop(self._heap)
+                if self._deadlines.get(key) == deadline:
+                    del self._deadlines[key]
+                    expired.append(key)
+        return expired
+
+    def _compact(self):
+        """丢弃已被覆盖/取消的堆项（调用方持有锁）"""
+        self._heap = [(deadline, key) for key, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    # 丢弃堆顶的过时项
+                    while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    remaining = self._heap[0][0] - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._stopped:
+                    return
+
+            for key in self.pop_expired():
+                try:
+                    self._on_expire(key)
+                except Exception as e:
+                    logger.error(f"到期回调执行失败（{key}）：{str(e)}")
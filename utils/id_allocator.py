@@ -0,0 +1,212 @@
+import logging
+import threading
+from config import ID_ALLOCATOR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# 使用序列分配ID的表（表名 -> 序列名）
+SEQUENCES = {
+    'Dev_Place': 'DEV.SEQ_Dev_Place',
+    'Dev_Person': 'DEV.SEQ_Dev_Person',
+    'Dev_Main_Dev': 'DEV.SEQ_Dev_Main_Dev',
+    'Dev_Part': 'DEV.SEQ_Dev_Part',
+    'Dev_Moni_Point': 'DEV.SEQ_Dev_Moni_Point',
+    'Dev_Normal_Val': 'DEV.SEQ_Dev_Normal_Val',
+    'Dev_Moni_Data': 'DEV.SEQ_Dev_Moni_Data',
+    'Dev_Warning': 'DEV.SEQ_Dev_Warning'
+}
+
+
+class IdAllocator:
+    """
+    基于数据库序列的ID分配（取代 SELECT MAX(ID)+1）
+    - hi/lo 分段：序列的 INCREMENT BY 即段长，每次 nextval 得到段首 hi，[hi, hi+段长) 归本进程独占，
+      段内的ID在内存中依次分配，不再访问数据库
+    - reserve(table, count) 需要多个段时一次查询取回（SELECT nextval(...) FROM generate_series(1, 段数)），
+      批量导入数千条记录只需一次往返；不同段之间的ID可能不连续
+    - 表的 ID 列默认值为 nextval(序列)，不经过本类的 INSERT 同样不会冲突（只是用掉一整段）
+    - 进程重启后内存中未用完的段作废，ID会有空洞，但不会重复
+    - 段长与 nextval 在同一条查询中读取，不在进程内缓存：其他进程执行 migrate 调大段长后立即按新段长分配
+    序列由 migrate() 创建并挂到已有表上（见 sql.txt 第16节）；migrate() 不会调小已有序列的段长，
+    否则仍按旧段长分配的进程会与其他进程的段重叠
+    """
+
+    def __init__(self, block_sizes=None, default_block_size=1):
+        self._block_sizes = dict(block_sizes or {})
+        self._default_block_size = default_block_size
+        self._lock = threading.Lock()
+        self._table_locks = {}
+        self._increments = {}  # 表名 -> 上次读到的 INCREMENT BY（只用于估算需要的段数）
+        self._blocks = {}  # 表名 -> [下一个可用ID, 段尾（不含）]
+        self._round_trips = 0
+        self._allocated = 0
+
+    def _sequence(self, table):
+        sequence = SEQUENCES.get(table)
+        if sequence is None:
+            raise ValueError(f"表{table}未配置ID序列")
+        return sequence
+
+    def block_size(self, table):
+        """配置的段长（migrate 时写入序列的 INCREMENT BY）"""
+        return max(1, int(self._block_sizes.get(table, self._default_block_size)))
+
+    def _table_lock(self, table):
+        with self._lock:
+            lock = self._table_locks.get(table)
+            if lock is None:
+                lock = self._table_locks[table] = threading.Lock()
+            return lock
+
+    def _next_blocks(self, cursor, table, blocks):
+        """
+        取 blocks 个段首，段长随同一条查询从 pg_sequences 读出
+        :return: (段首列表（升序）, 段长)
+        """
+        sequence = self._sequence(table)
+        schema, name = sequence.lower().split('.')
+        cursor.execute(
+            "SELECT nextval(?), p.increment_by FROM generate_series(1, ?), pg_sequences p "
+            "WHERE p.schemaname = ? AND p.sequencename = ?",
+            (sequence, blocks, schema, name)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            raise RuntimeError(f"ID序列{sequence}不存在，请先执行 python id_sequence_cli.py migrate")
+        increment = int(rows[0][1])
+        self._increments[table] = increment
+        return sorted(row[0] for row in rows), increment
+
+    def reserve(self, table, count, cursor=None):
+        """
+        为 table 分配 count 个ID
+        :param cursor: 可选，复用调用方的游标（nextval 不受事务回滚影响，调用方回滚后ID作废）
+        :return: list - 升序的ID列表
+        """
+        if count <= 0:
+            return []
+        self._sequence(table)
+        with self._table_lock(table):
+            ids = []
+            block = self._blocks.get(table)
+            if block is not None and block[0] < block[1]:
+                take = min(count, block[1] - block[0])
+                ids.extend(range(block[0], block[0] + take))
+                block[0] += take
+            remaining = count - len(ids)
+            if remaining:
+                own_cursor = cursor is None
+                conn = None
+                if own_cursor:
+                    from utils.db import get_db_connection
+                    conn = get_db_connection()
+                    cursor = conn.cursor()
+                try:
+                    round_trips = 0
+                    while remaining:
+                        # 按上次的段长估算段数；段长被调小时再取一次
+                        estimate = self._increments.get(table) or self.block_size(table)
+                        his, increment = self._next_blocks(cursor, table, -(-remaining // estimate))
+                        round_trips += 1
+                        for hi in his:
+                            take = min(remaining, increment)
+                            if take:
+                                ids.extend(range(hi, hi + take))
+                                remaining -= take
+                            if take < increment:
+                                # 剩余的ID留给下次分配（段长变大时多取的段只保留最后一段）
+                                self._blocks[table] = [hi + take, hi + increment]
+                    if own_cursor:
+                        conn.commit()
+                finally:
+                    if own_cursor:
+                        cursor.close()
+                        conn.close()
+                with self._lock:
+                    self._round_trips += round_trips
+            with self._lock:
+                self._allocated += count
+            return ids
+
+    def next_id(self, table, cursor=None):
+        """为 table 分配一个ID"""
+        return self.reserve(table, 1, cursor)[0]
+
+    def reset(self):
+        """丢弃内存中的段和序列信息（序列被修改后调用）"""
+        with self._lock:
+            self._increments.clear()
+            self._blocks.clear()
+
+    # ---------- 迁移 ----------
+    @staticmethod
+    def attach(cursor, table):
+        """把序列设为表 ID 列的默认值（序列不存在时跳过），分区表重建后调用"""
+        sequence = SEQUENCES[table]
+        cursor.execute("SELECT to_regclass(?) IS NOT NULL", (sequence,))
+        if not cursor.fetchone()[0]:
+            return False
+        cursor.execute(f"ALTER TABLE DEV.{table} ALTER COLUMN ID SET DEFAULT nextval('{sequence}')")
+        return True
+
+    def migrate(self):
+        """
+        为各表创建序列（已存在则按配置调大段长），起始值为 MAX(ID)+1，并设为 ID 列默认值
+        可重复执行：序列只会向前推进，不会回退
+        配置的段长小于现有段长时保留现有段长：运行中的进程手里的段按旧段长计算，调小会与新分出的段重叠
+        :return: list - [(表名, 序列名, 段长, 下一个值)]
+        """
+        from utils.db import get_db_connection
+
+        result = []
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            for table, sequence in SEQUENCES.items():
+                block_size = self.block_size(table)
+                # 锁表期间没有新的 MAX(ID)+1 写入，起始值不会落在已有ID上
+                cursor.execute(f"LOCK TABLE DEV.{table} IN SHARE ROW EXCLUSIVE MODE")
+                cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence} AS BIGINT INCREMENT BY {block_size} MINVALUE 1")
+                # 已分出的最后一段按原段长计算，调整段长后新段不会与其重叠
+                cursor.execute(
+                    f"SELECT s.last_value + CASE WHEN s.is_called THEN p.increment_by ELSE 0 END, p.increment_by "
+                    f"FROM {sequence} s, pg_sequences p WHERE p.schemaname = ? AND p.sequencename = ?",
+                    tuple(sequence.lower().split('.'))
+                )
+                start, current = cursor.fetchone()
+                if block_size < current:
+                    logger.warning(f"{table}：配置的段长{block_size}小于现有段长{current}，保留现有段长")
+                    block_size = current
+                cursor.execute(f"ALTER SEQUENCE {sequence} INCREMENT BY {block_size}")
+                cursor.execute(f"SELECT COALESCE(MAX(ID), 0) + 1 FROM DEV.{table}")
+                start = max(start, cursor.fetchone()[0])
+                cursor.execute("SELECT setval(?, ?, false)", (sequence, start))
+                self.attach(cursor, table)
+                result.append((table, sequence, block_size, start))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+        self.reset()
+        for table, sequence, block_size, start in result:
+            logger.info(f"{table}：序列{sequence}，段长{block_size}，下一个值{start}")
+        return result
+
+    def stats(self):
+        """分配次数统计：访问数据库次数、已分配ID数、各表剩余的段内ID数"""
+        with self._lock:
+            return {
+                'round_trips': self._round_trips,
+                'allocated': self._allocated,
+                'cached': {table: block[1] - block[0] for table, block in self._blocks.items()}
+            }
+
+
+# 全局ID分配器（进程内单例）
+id_allocator = IdAllocator(
+    block_sizes=ID_ALLOCATOR_CONFIG['block_sizes'],
+    default_block_size=ID_ALLOCATOR_CONFIG['default_block_size']
+)
@@ -0,0 +1,185 @@
+import logging
+import re
+import threading
+import time
+from psycopg2 import extensions
+from config import PROFILING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_totals = {'requests': 0, 'queries': 0, 'slow_queries': 0}
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+class RequestProfile:
+    """一次请求的数据库开销：查询次数、耗时、取回行数、借用连接数"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0  # 秒
+        self.rows = 0
+        self.connections = 0
+        self.slow_queries = 0
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+    def server_timing(self):
+        """Server-Timing 响应头（浏览器开发者工具的 Timing 面板可直接查看）"""
+        return (f'db;dur={self.db_time * 1000:.2f};desc="{self.queries} queries", '
+                f'rows;desc="{self.rows}", conn;desc="{self.connections}", '
+                f'total;dur={self.elapsed_ms():.2f}')
+
+
+def begin(label):
+    """开始记录当前线程（绿色线程）上的请求"""
+    _local.profile = RequestProfile(label)
+    return _local.profile
+
+
+def end():
+    """结束记录，返回本次请求的 RequestProfile（未开始时返回 None）"""
+    profile = getattr(_local, 'profile', None)
+    _local.profile = None
+    if profile is not None:
+        with _stats_lock:
+            _totals['requests'] += 1
+    return profile
+
+
+def current():
+    return getattr(_local, 'profile', None)
+
+
+def record_connection():
+    """get_db_connection() 借用连接时调用"""
+    profile = current()
+    if profile is not None:
+        profile.connections += 1
+
+
+def _shorten(query, limit=1000):
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    query = _WHITESPACE_RE.sub(' ', str(query)).strip()
+    return query if len(query) <= limit else query[:limit] + '...'
+
+
+def _record_query(query, seconds):
+    profile = current()
+    slow = PROFILING_CONFIG['slow_query_ms'] is not None and seconds * 1000 >= PROFILING_CONFIG['slow_query_ms']
+    if profile is not None:
+        profile.queries += 1
+        profile.db_time += seconds
+        if slow:
+            profile.slow_queries += 1
+    with _stats_lock:
+        _totals['queries'] += 1
+        if slow:
+            _totals['slow_queries'] += 1
+    if slow:
+        # 只记录SQL模板，不记录参数值
+        where = f"（{profile.label}）" if profile is not None else ''
+        logger.warning(f"慢查询 {seconds * 1000:.1f}ms{where}：{_shorten(query)}")
+
+
+def _record_rows(count):
+    profile = current()
+    if profile is not None:
+        profile.rows += count
+
+
+class ProfilingCursor(extensions.cursor):
+    """
+    统计耗时和取回行数的游标（作为连接的 cursor_factory，服务端命名游标同样适用）
+    - execute/executemany/callproc/copy_* 计入查询次数和数据库耗时，超过 slow_query_ms 记录慢查询日志
+    - fetchone/fetchmany/fetchall 及逐行迭代计入取回行数
+    """
+
+    def _timed(self, query, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _record_query(query, time.perf_counter() - started)
+
+    def execute(self, query, vars=None):
+        return self._timed(query, super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(query, super().executemany, query, vars_list)
+
+    def callproc(self, procname, parameters=None):
+        return self._timed(procname, super().callproc, procname, parameters)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(sql, super().copy_expert, sql, file, size)
+
+    def copy_from(self, file, table, *args, **kwargs):
+        return self._timed(f'COPY {table} FROM STDIN', super().copy_from, file, table, *args, **kwargs)
+
+    def copy_to(self, file, table, *args, **kwargs):
+        return self._timed(f'COPY {table} TO STDOUT', super().copy_to, file, table, *args, **kwargs)
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            _record_rows(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        _record_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        _record_rows(len(rows))
+        return rows
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
+
+
+def init_app(app):
+    """注册请求钩子：每个请求记录数据库开销，写入 Server-Timing 响应头"""
+    from flask import request
+
+    if not PROFILING_CONFIG['enabled']:
+        return
+
+    @app.before_request
+    def _begin_profile():
+        begin(f'{request.method} {request.path}')
+
+    @app.after_request
+    def _finish_profile(response):
+        profile = end()
+        if profile is None:
+            return response
+        if PROFILING_CONFIG['server_timing']:
+            response.headers['Server-Timing'] = profile.server_timing()
+        logger.debug(f"{profile.label}：{profile.queries}次查询，数据库{profile.db_time * 1000:.1f}ms，"
+                     f"{profile.rows}行，{profile.connections}次借用连接，总计{profile.elapsed_ms():.1f}ms")
+        return response
+
+    @app.teardown_request
+    def _clear_profile(exc=None):
+        _local.profile = None
+
+
+def stats():
+    """累计指标：已记录的请求数、查询数、慢查询数"""
+    with _stats_lock:
+        result = dict(_totals)
+    result['slow_query_ms'] = PROFILING_CONFIG['slow_query_ms']
+    return result
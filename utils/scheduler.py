@@ -0,0 +1,250 @@
+import heapq
+import logging
+import random
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+from config import JOB_SCHEDULER_CONFIG
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """一个定时任务及其运行指标"""
+
+    def __init__(self, name, func, args=(), kwargs=None, interval=None, daily_at=None,
+                 jitter=0, job_class='default'):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.interval = interval  # 间隔秒数
+        self.daily_at = daily_at  # (时, 分)；interval 与 daily_at 都为空表示只执行一次
+        self.jitter = jitter
+        self.job_class = job_class
+        self.next_base = None  # 下一次的计划时间（不含随机推迟），time.time()
+        self.next_run = None  # 下一次的实际派发时间
+        self.running = False
+        self.removed = False
+        # 指标
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started_at = None
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.last_lag = None
+        self.max_lag = 0.0
+        self.last_error = None
+
+    def following(self, base, now):
+        """
+        上一次计划时间为 base 时的下一次计划时间（不含随机推迟），一次性任务返回 None
+        间隔任务按计划时间累加，不因执行耗时漂移；落后超过一个周期时不补跑，从 now 重新计算
+        """
+        if self.interval:
+            following = (base if base is not None else now) + self.interval
+            return following if following > now else now + self.interval
+        if self.daily_at:
+            current = datetime.fromtimestamp(now)
+            target = current.replace(hour=self.daily_at[0], minute=self.daily_at[1], second=0, microsecond=0)
+            if target <= current:
+                target += timedelta(days=1)
+            return target.timestamp()
+        return None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'job_class': self.job_class,
+            'interval': self.interval,
+            'daily_at': f'{self.daily_at[0]:02d}:{self.daily_at[1]:02d}' if self.daily_at else None,
+            'jitter': self.jitter,
+            'running': self.running,
+            'next_run': datetime.fromtimestamp(self.next_run).strftime('%Y-%m-%d %H:%M:%S') if self.next_run else None,
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'last_started_at': (datetime.fromtimestamp(self.last_started_at).strftime('%Y-%m-%d %H:%M:%S')
+                                if self.last_started_at else None),
+            'last_duration_ms': round(self.last_duration * 1000, 1) if self.last_duration is not None else None,
+            'max_duration_ms': round(self.max_duration * 1000, 1),
+            'last_lag_ms': round(self.last_lag * 1000, 1) if self.last_lag is not None else None,
+            'max_lag_ms': round(self.max_lag * 1000, 1),
+            'last_error': self.last_error
+        }
+
+
+class JobScheduler:
+    """
+    进程内定时任务调度器（取代 APScheduler 的 BackgroundScheduler）
+    - 一个调度线程按到期时间堆依次派发，每次执行在独立线程中运行；
+      eventlet.monkey_patch() 后均为绿色线程，数据库等待时让出（见 utils.db.enable_green_io）
+    - 同一任务上次执行未结束时跳过本次（skipped 加1），不会重叠执行
+    - jitter：每次在计划时间后随机推迟 0~jitter 秒，避免多个任务同时启动
+    - 按任务类别限制同时执行数（JOB_SCHEDULER_CONFIG['class_limits']），等待名额的时间计入延迟
+    - stats() 返回每个任务的执行次数、失败次数、跳过次数、上次耗时、启动延迟（实际启动 - 计划时间）
+    注意：纯 CPU 计算的任务不会主动让出，耗时较长时应在循环中调用 time.sleep(0)
+    """
+
+    def __init__(self, class_limits=None):
+        self._class_limits = dict(class_limits or {})
+        self._semaphores = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._jobs = {}  # 任务名 -> Job
+        self._heap = []  # (派发时间, 序号, Job, 是否为计划内派发)
+        self._counter = 0
+        self._thread = None
+        self._stopped = False
+
+    # ---------- 登记任务 ----------
+    def _add(self, job, first_base):
+        with self._lock:
+            old = self._jobs.get(job.name)
+            if old is not None:
+                old.removed = True
+            self._jobs[job.name] = job
+            self._schedule(job, first_base)
+        self._wakeup.set()
+        return job
+
+    def _schedule(self, job, base):
+        """调用方持有锁：登记下一次计划（base 为 None 表示不再执行）"""
+        job.next_base = base
+        if base is None:
+            job.next_run = None
+            return
+        job.next_run = base + (random.uniform(0, job.jitter) if job.jitter else 0)
+        self._push(job.next_run, job, True)
+
+    def _push(self, run_at, job, scheduled):
+        self._counter += 1
+        heapq.heappush(self._heap, (run_at, self._counter, job, scheduled))
+
+    def add_interval(self, name, func, seconds, args=(), kwargs=None, jitter=0,
+                     job_class='default', run_immediately=False):
+        """每隔 seconds 秒执行一次"""
+        job = Job(name, func, args, kwargs, interval=seconds, jitter=jitter, job_class=job_class)
+        now = time.time()
+        return self._add(job, now if run_immediately else now + seconds)
+
+    def add_daily(self, name, func, hour, minute=0, args=(), kwargs=None, jitter=0, job_class='maintenance'):
+        """每天 hour:minute（本地时间）执行一次"""
+        job = Job(name, func, args, kwargs, daily_at=(hour, minute), jitter=jitter, job_class=job_class)
+        return self._add(job, job.following(None, time.time()))
+
+    def add_once(self, name, func, delay=0, args=(), kwargs=None, job_class='default'):
+        """delay 秒后执行一次（如启动预热）"""
+        job = Job(name, func, args, kwargs, job_class=job_class)
+        return self._add(job, time.time() + delay)
+
+    def remove(self, name):
+        with self._lock:
+            job = self._jobs.pop(name, None)
+            if job is not None:
+                job.removed = True
+
+    def run_now(self, name):
+        """立即执行一次（不影响原计划），任务不存在返回 False"""
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is None:
+                return False
+            self._push(time.time(), job, False)
+        self._wakeup.set()
+        return True
+
+    # ---------- 调度 ----------
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopped = False
+        self._thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"定时任务调度器已启动：{len(self._jobs)}个任务")
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def run_forever(self):
+        """启动并阻塞当前线程（独立脚本使用），Ctrl+C 退出"""
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._thread.join(1)
+        except KeyboardInterrupt:
+            self.stop()
+
+    def _semaphore(self, job_class):
+        with self._lock:
+            semaphore = self._semaphores.get(job_class)
+            if semaphore is None:
+                limit = self._class_limits.get(job_class, self._class_limits.get('default', 1))
+                semaphore = self._semaphores[job_class] = threading.BoundedSemaphore(max(1, limit))
+            return semaphore
+
+    def _loop(self):
+        while not self._stopped:
+            # 先清除唤醒标记：此后新增/立即执行的任务都会唤醒下面的等待
+            self._wakeup.clear()
+            due = []
+            with self._lock:
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    run_at, _, job, scheduled = heapq.heappop(self._heap)
+                    if job.removed or (scheduled and run_at != job.next_run):
+                        continue  # 已删除/被同名任务替换
+                    due.append((job, run_at, scheduled))
+            for job, run_at, scheduled in due:
+                self._dispatch(job, run_at, scheduled)
+            with self._lock:
+                timeout = max(0.0, self._heap[0][0] - time.time()) if self._heap else None
+            self._wakeup.wait(timeout)
+
+    def _dispatch(self, job, run_at, scheduled):
+        with self._lock:
+            # 先登记下一次计划；run_now 的临时派发不影响原计划
+            if scheduled:
+                self._schedule(job, job.following(job.next_base, time.time()))
+            if job.running:
+                job.skipped += 1
+                logger.warning(f"定时任务 {job.name} 上次执行尚未结束，跳过本次")
+                return
+            job.running = True
+        threading.Thread(target=self._run, args=(job, run_at), name=f'job-{job.name}', daemon=True).start()
+
+    def _run(self, job, run_at):
+        semaphore = self._semaphore(job.job_class)
+        try:
+            with semaphore:
+                started = time.time()
+                job.last_started_at = started
+                job.last_lag = max(0.0, started - run_at)
+                job.max_lag = max(job.max_lag, job.last_lag)
+                clock = time.perf_counter()
+                try:
+                    job.func(*job.args, **job.kwargs)
+                    job.last_error = None
+                except Exception as e:
+                    job.failures += 1
+                    job.last_error = f'{type(e).__name__}: {e}'
+                    logger.error(f"定时任务 {job.name} 执行失败：{str(e)}\n{traceback.format_exc()}")
+                finally:
+                    job.runs += 1
+                    job.last_duration = time.perf_counter() - clock
+                    job.max_duration = max(job.max_duration, job.last_duration)
+        finally:
+            job.running = False
+
+    def stats(self):
+        """各任务的运行指标（按任务名排序）"""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j.name)
+            return [job.to_dict() for job in jobs]
+
+
+# 全局定时任务调度器（进程内单例）
+job_scheduler = JobScheduler(class_limits=JOB_SCHEDULER_CONFIG['class_limits'])